@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+#
+#  PyWeather micro-benchmarks
+#
+'''
+Micro-benchmarks for the PyWeather parse path, unit conversions and
+publishers.
+
+Each benchmark reports the best of several timing runs in operations per
+second, and the peak memory allocated by a single call (via tracemalloc).
+Results can be saved as JSON, and compared against a previous result file:
+
+   ./benchmarks/run.py --save before.json
+   ... change code ...
+   ./benchmarks/run.py --compare before.json --threshold 0.10
+
+The full parse() path can be benchmarked against a console capture (see
+weather.stations.capture), replayed as fast as possible:
+
+   ./benchmarks/run.py --replay console.cap
+
+Benchmarks that are slower than the compared result by more than the
+threshold are flagged as regressions, and the script exits with status 1.
+'''
+
+import codecs
+import datetime
+import json
+import optparse
+import os
+import platform
+import struct
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from weather.services import Wunderground
+from weather.services._base import HttpPublisher
+from weather.stations.capture import ReplayPort
+from weather.stations.davis import (ArchiveBStruct, DmpPageStruct,
+                                    LoopStruct, VantagePro, VProCRC)
+from weather.units import pressure, temp, wind
+
+# a valid LOOP packet, as used by the davis unit tests
+LOOP_DATA = codecs.decode(
+    b"4c4f4f14003e032175da0239d10204056301ffffffffffffffffffff"
+    b"ffffffffff4effffffffffffff0000ffff7f0000ffff000000000000000000000000ffff"
+    b"ffffffffff0000000000000000000000000000000000002703064b26023e070a0d1163",
+    'hex')
+
+# number of DMPAFT pages returned by the in-memory console
+DMP_PAGES = 20
+
+
+def _crc(data):
+    return data + struct.pack('>H', VProCRC.get(data))
+
+
+def _archive_record(i):
+    '''
+    Return a packed Rev.B archive record, 'i' archive periods after
+    2021-04-03 00:00.
+    '''
+    when = datetime.datetime(2021, 4, 3) + datetime.timedelta(minutes=5 * i)
+    vals = []
+    for name, fmt in ArchiveBStruct.FMT:
+        if fmt.endswith('s'):
+            vals.append(b'\x00' * int(fmt[:-1]))
+        elif name == 'DateStamp':
+            vals.append(VantagePro.calcDateStamp(when))
+        elif name == 'TimeStamp':
+            vals.append(VantagePro.calcTimeStamp(when))
+        elif name == 'RecType':
+            vals.append(0)
+        elif name == 'TempOut':
+            vals.append(700 + i % 50)
+        else:
+            vals.append(1)
+    return ArchiveBStruct.pack(*vals)
+
+
+def _dmpaft_reply(pages):
+    '''
+    Return the bytes sent by a console in reply to a DMPAFT command.
+    '''
+    reply = [b'\n\r', b'\x06',  # wakeup, DMPAFT command ACK
+             b'\x06',           # time stamp ACK
+             _crc(struct.pack('=HH', pages, 0))]
+    for p in range(pages):
+        records = b''.join(_archive_record(p * 5 + r) for r in range(5))
+        reply.append(_crc(struct.pack('=B260s4B', p % 256, records,
+                                      0, 0, 0, 0)))
+    return b''.join(reply)
+
+
+class MemoryPort(object):
+    '''
+    Serial port replacement, replaying a fixed reply from memory.
+    '''
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.pos = 0
+
+    def rewind(self):
+        self.pos = 0
+
+    def read(self, size):
+        data = self.reply[self.pos:self.pos + size]
+        self.pos += size
+        return data
+
+    def write(self, data):
+        pass
+
+    def close(self):
+        pass
+
+
+def _vantage_pro(port):
+    vp = VantagePro.__new__(VantagePro)
+    vp.port = port
+    vp._archive_time = (0, 0)
+    vp.fields = {}
+    return vp
+
+
+def _replay(file_name):
+    '''
+    Return a function replaying a capture through VantagePro.parse().
+    '''
+    def replay():
+        vp = VantagePro(ReplayPort(file_name))
+        while not vp.port.exhausted:
+            vp.parse()
+        vp.port.close()
+    return replay
+
+
+def benchmarks(replay=None):
+    '''
+    Return the list of (name, callable) benchmarks; 'replay' is the file
+    name of an optional console capture.
+    '''
+    archive_page = DmpPageStruct.unpack(_dmpaft_reply(1)[-267:])['Records']
+    port = MemoryPort(_dmpaft_reply(DMP_PAGES))
+    vp = _vantage_pro(port)
+
+    def dmpaft():
+        port.rewind()
+        vp._dmpaft_cmd((0, 0))
+
+    loop_fields = LoopStruct.unpack(LOOP_DATA)
+
+    def derived():
+        VantagePro._calc_derived_fields(dict(loop_fields))
+
+    wug = Wunderground('SID', 'PASSWORD')
+
+    def query():
+        wug.set(pressure=29.98, dewpoint=64.9, humidity=78, tempf=72.1,
+                rainin=0.0, rainday=0.0, dateutc='2021-04-03 10:00:00',
+                windspeed=5, winddir=355)
+        HttpPublisher._query(wug.args, wug.URI)
+
+    res = [
+        ('crc.get', lambda: VProCRC.get(LOOP_DATA)),
+        ('loop.unpack', lambda: LoopStruct.unpack(LOOP_DATA)),
+        ('archive_b.unpack_from',
+         lambda: ArchiveBStruct.unpack_from(archive_page, 52)),
+        ('davis.dmpaft_%d_pages' % DMP_PAGES, dmpaft),
+        ('davis.calc_derived_fields', derived),
+        ('temp.fahrenheit_to_celsius',
+         lambda: temp.fahrenheit_to_celsius(72.1)),
+        ('temp.calc_dewpoint', lambda: temp.calc_dewpoint(72.1, 78)),
+        ('temp.calc_heat_index', lambda: temp.calc_heat_index(92.1, 78)),
+        ('temp.calc_wind_chill', lambda: temp.calc_wind_chill(20.0, 10, 12)),
+        ('pressure.in32_to_mb', lambda: pressure.in32_to_mb(29.98)),
+        ('wind.mph_to_m_sec', lambda: wind.mph_to_m_sec(12)),
+        ('publisher.query', query),
+    ]
+    if replay:
+        res.append(('davis.replay', _replay(replay)))
+    return res
+
+
+def measure(func, repeat=5):
+    '''
+    Return (operations per second, peak bytes allocated per call).
+    '''
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    tracemalloc.start()
+    func()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return number / best, peak
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, old, threshold):
+    '''
+    Print the change against 'old' results; return the regressed names.
+    '''
+    regressions = []
+    for name, res in results.items():
+        if name not in old:
+            continue
+        ratio = res['ops_per_sec'] / old[name]['ops_per_sec']
+        flag = ''
+        if ratio < 1 - threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print('%-32s %+7.1f%%%s' % (name, (ratio - 1) * 100, flag))
+    return regressions
+
+
+def get_options(parser):
+    parser.add_option('-s', '--save', dest='save', default=None,
+                      help='write results to a JSON file')
+    parser.add_option('-c', '--compare', dest='compare', default=None,
+                      help='compare results with a saved JSON file')
+    parser.add_option('-t', '--threshold', dest='threshold', default=0.10,
+                      type='float',
+                      help='regression threshold, as a fraction [0.10]')
+    parser.add_option('-k', '--filter', dest='filter', default='',
+                      help='only run benchmarks containing this string')
+    parser.add_option('-r', '--repeat', dest='repeat', default=5,
+                      type='int', help='timing runs per benchmark [5]')
+    parser.add_option('--replay', dest='replay', default=None,
+                      help='also benchmark parse() on a console capture')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    opts, args = get_options(optparse.OptionParser())
+
+    results = {}
+    print('%-32s %14s %12s' % ('benchmark', 'ops/sec', 'peak bytes'))
+    for name, func in benchmarks(opts.replay):
+        if opts.filter not in name:
+            continue
+        ops, peak = measure(func, opts.repeat)
+        results[name] = {'ops_per_sec': ops, 'peak_bytes': peak}
+        print('%-32s %14.1f %12d' % (name, ops, peak))
+
+    if opts.save:
+        with open(opts.save, 'w') as fh:
+            json.dump({'revision': _git_revision(),
+                       'python': platform.python_version(),
+                       'date': datetime.datetime.now().isoformat(),
+                       'results': results}, fh, indent=2, sort_keys=True)
+
+    if opts.compare:
+        with open(opts.compare) as fh:
+            old = json.load(fh)
+        print('\ncompared with %s (revision %s)' %
+              (opts.compare, old.get('revision')))
+        if compare(results, old['results'], opts.threshold):
+            sys.exit(1)
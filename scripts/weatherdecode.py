@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+#
+#  PyWeather script for re-decoding stored raw Davis LOOP packets and DMPAFT
+#  pages
+#
+'''
+Decode files of raw hex LOOP packets and DMPAFT pages (one packet per line)
+in parallel, and append the results to CSV / JSON Lines files or a SQLite
+database:
+
+   weatherdecode.py --loop loop.csv --archive archive.csv raw/*.hex
+   weatherdecode.py --sqlite weather.db --station home raw/*.hex
+'''
+
+import logging
+import optparse
+import sys
+
+from weather.stations.redecode import CHUNK_SIZE, redecode
+
+log = logging.getLogger('')
+
+
+def get_options(parser):
+    '''
+    read command line options to configure program behavior.
+    '''
+    parser.add_option(
+        '-l', '--loop', dest='loop', default=None,
+        help='append the LOOP fields to this .csv or .jsonl file')
+    parser.add_option(
+        '-a', '--archive', dest='archive', default=None,
+        help='append the archive records to this .csv or .jsonl file')
+    parser.add_option(
+        '-s', '--sqlite', dest='sqlite', default=None,
+        help='store the readings in this SQLite database')
+    parser.add_option(
+        '--station', dest='station', default='default',
+        help='station name in the SQLite database [default]')
+    parser.add_option(
+        '-j', '--workers', dest='workers', default=None, type='int',
+        help='number of worker processes [number of CPUs]')
+    parser.add_option(
+        '--chunk-size', dest='chunk_size', default=CHUNK_SIZE, type='int',
+        help='bytes of input per work unit [%d]' % CHUNK_SIZE)
+    parser.add_option(
+        '--rev', dest='rev', default=None, choices=('A', 'B'),
+        help='archive record format [detected per record]')
+    parser.add_option(
+        '-d', '--debug', dest='debug', action="store_true",
+        default=False, help='enable verbose debug logging')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(usage='%prog [options] FILE...')
+    opts, args = get_options(parser)
+    if not args:
+        parser.error('no input file')
+    logging.basicConfig(
+        level=logging.DEBUG if opts.debug else logging.WARNING,
+        format='%(name)s %(levelname)s - %(message)s')
+
+    counts = redecode(args, opts.loop, opts.archive, opts.sqlite,
+                      opts.station, opts.workers, opts.chunk_size, opts.rev)
+    print('%d LOOP packets, %d archive records, %d errors' % (
+        counts.pop('loop', 0), counts.pop('archive', 0),
+        sum(counts.values())))
+    sys.exit(1 if counts else 0)
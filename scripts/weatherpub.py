@@ -20,14 +20,16 @@ import configparser
 
 import weather.stations
 import weather.stations.netatmo
+import weather.stations.shm
 import weather.services
+import weather.stats
 
 log = logging.getLogger('')
 
 # Intervals (in minutes) between each archive record generated by the weather
 # station:
 ARCHIVE_INTERVAL = 10
-# Gust 'time to live'; define many minutes should gust be reported:
+# Gust window; define how many minutes a gust should be reported:
 GUST_TTL = 10
 GUST_MPH_MIN = 7   # minimum mph of gust above avg wind speed to report
 
@@ -51,46 +53,44 @@ class NoSensorException(Exception):
     pass
 
 
-class WindGust(object):
-    NO_VALUE = ('NA', 'NA')
-
-    def __init__(self):
-        self.value = self.NO_VALUE
-        self.count = 0
-
-    def get(self, station, interval):
-        '''
-        return gust data, if above threshold value and current time is inside
-        reporting window period
-        '''
-        rec = station.fields['Archive']
-        # process new data
-        if rec:
-            threshold = station.fields['WindSpeed10Min'] + GUST_MPH_MIN
-            if rec['WindHi'] >= threshold:
-                self.value = (rec['WindHi'], rec['WindHiDir'])
-                self.count = GUST_TTL * 60 / interval
-            else:
-                self.value = self.NO_VALUE
-
-        # return gust value, if remaining time is left, and valid
-        if self.count:
-            self.count -= 1
-        else:
-            self.value = self.NO_VALUE
-
-        log.debug('wind gust of {0} mph from {1}'.format(*self.value))
-        return self.value
-
-
-WindGust = WindGust()
+def readings(station, interval, wind_stats, shm=None):
+    '''
+    yield a station reading every 'interval' seconds. VantagePro LOOP packets
+    are read as they arrive (one every 2 seconds) and added to the wind
+    statistics, so gusts don't depend on the polling interval. Every packet
+    is also written to the SharedMemoryWriter 'shm', when given.
+    '''
+    if not isinstance(station, weather.stations.VantagePro):
+        yield from station.stream(interval)
+        return
+    published = None
+    for point in station.stream():
+        wind_stats.update_fields(station.fields)
+        if shm is not None:
+            shm.update(station.fields)
+        now = time.monotonic()
+        if published is None or now - published >= interval:
+            published = now
+            yield point
+
+
+def wind_gust(wind_stats):
+    '''
+    return gust data, if the highest wind speed of the gust window is above
+    the threshold value
+    '''
+    gust = wind_stats.gust_10min
+    value = ('NA', 'NA')
+    if gust is not None and gust >= wind_stats.speed_10min + GUST_MPH_MIN:
+        value = (gust, wind_stats.gust_dir_10min)
+    log.debug('wind gust of {0} mph from {1}'.format(*value))
+    return value
 
 
-def weather_update(station, pub_sites, interval):
+def weather_update(station, point, pub_sites, wind_stats, qc=None):
     '''
-    main execution loop. query weather data and post to online service.
+    main execution loop. post a station reading to online service.
     '''
-    point = station.get_reading()
 
     # santity check weather data
     if point.temperature_f > 200:
@@ -98,11 +98,18 @@ def weather_update(station, pub_sites, interval):
             'Out of range temperature value: %.1f, check sensors' %
             (point.temperature_f,))
 
+    if qc is not None:
+        # suspect values (spikes, steps, stuck sensors) are not published
+        point, suspect = qc.filter_point(point)
+        for field, flags in suspect.items():
+            log.warning('suspect %s value, not published (%s)', field,
+                        ', '.join(weather.stats.flag_names(flags)))
+
     gust = None
     gust_dir = None
     if isinstance(station, weather.stations.VantagePro):
         # Wind is only supported in VantagePro.
-        gust, gust_dir = WindGust.get(station, interval)
+        gust, gust_dir = wind_gust(wind_stats)
 
     # upload data in the following order:
     for ps in pub_sites:
@@ -197,6 +204,21 @@ def get_options(parser):
     parser.add_option(
         '-t', '--tty', dest='tty', default='/dev/ttyS0',
         help='set serial port device [/dev/ttyS0]')
+    parser.add_option(
+        '--capture', dest='capture', default=None,
+        help='record the serial traffic of the console to a capture file')
+    parser.add_option(
+        '--shm', dest='shm', default=None,
+        help='share the latest VantagePro reading in this shared memory '
+        'block')
+    parser.add_option(
+        '--shm-reuse', dest='shm_reuse', action='store_true', default=False,
+        help='take over an existing shared memory block (left over from a '
+        'previous run)')
+    parser.add_option(
+        '--no-qc', dest='qc', action='store_false', default=True,
+        help='disable the spike, step and stuck sensor checks (their '
+        'thresholds assume a 60 second interval)')
     parser.add_option(
         '-n', '--interval', dest='interval', default=60,
         type='int', help='polling/update interval in seconds [60]')
@@ -227,17 +249,40 @@ if __name__ == '__main__':
         station = STATIONS[station_name](**config[station_name])
     else:
         # Only VantagePro is supported without config.
-        station = weather.stations.VantagePro(opts.tty, ARCHIVE_INTERVAL)
+        station = weather.stations.VantagePro(opts.tty, ARCHIVE_INTERVAL,
+                                              capture=opts.capture)
+    # wind averages and gusts, over time windows of every LOOP packet
+    wind_stats = weather.stats.WindStats(gust=GUST_TTL * 60)
+    # spike, step and stuck sensor checks of the published values
+    qc = None
+    if opts.qc:
+        qc = weather.stats.QualityControl()
+        if opts.interval != weather.stats.SAMPLE_INTERVAL:
+            log.warning('the quality control thresholds assume a %d second '
+                        'interval; see --no-qc',
+                        weather.stats.SAMPLE_INTERVAL)
+    # latest reading, for other local processes
+    shm = None
+    if opts.shm:
+        if isinstance(station, weather.stations.VantagePro):
+            shm = weather.stations.shm.SharedMemoryWriter(
+                opts.shm, reuse=opts.shm_reuse)
+        else:
+            log.error('--shm is only supported for the VantagePro station')
 
     while True:
         try:
-            weather_update(station, pub_sites, opts.interval)
+            for point in readings(station, opts.interval, wind_stats, shm):
+                try:
+                    weather_update(station, point, pub_sites, wind_stats,
+                                   qc)
+                except (Exception) as e:
+                    log.exception(e)
+                log.info('sleep')
         except (Exception) as e:
+            # station error; retry with a new stream after the interval
             log.exception(e)
-        # pause until next update time
-        next_update = opts.interval - (time.time() % opts.interval)
-        log.info('sleep')
-        time.sleep(next_update)
+            time.sleep(opts.interval)
 
 
 def calculate_wind_chill(temperature, wind_speed):
@@ -38,10 +38,11 @@ setup(name=name,
           name,
           name + '.services',
           name + '.stations',
+          name + '.stats',
           name + '.units',
       ],
       install_requires=[
         'pyserial==3.5'
       ],
-      scripts=['scripts/weatherpub.py'],
+      scripts=['scripts/weatherpub.py', 'scripts/weatherdecode.py'],
       )
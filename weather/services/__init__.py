@@ -1,3 +1,6 @@
 from .wunderground import *
 from .pws import *
 from .file import *
+from .history import *
+from .sqlite import *
+from .live import *
@@ -3,10 +3,35 @@ Common base classes for PyWeather pulication services.
 '''
 
 
+import datetime
 import logging
+import time
 log = logging.getLogger(__name__)
 
 
+def _to_json(val):
+    '''
+    Fallback JSON encoder for the values found in station records.
+    '''
+    if isinstance(val, (datetime.datetime, datetime.date)):
+        return val.isoformat()
+    if isinstance(val, time.struct_time):
+        return time.strftime('%Y-%m-%dT%H:%M:%S', val)
+    if isinstance(val, bytes):
+        return val.hex()
+    return repr(val)
+
+
+def _json_record(record):
+    '''
+    Return a copy of a record dict, with its struct_time values as ISO
+    strings. struct_time is a tuple, so json would encode it as a list
+    without calling _to_json().
+    '''
+    return {k: _to_json(v) if isinstance(v, time.struct_time) else v
+            for k, v in record.items()}
+
+
 class PublishException(Exception):
     pass
 
@@ -34,12 +59,20 @@ class HttpPublisher(object):
         raise NotImplementedError("abstract method")
 
     @staticmethod
-    def _publish(args, server, uri):
-        from http.client import HTTPConnection, HTTPSConnection
+    def _query(args, uri):
+        '''
+        Return the request URI for 'args', dropping undefined values.
+        '''
         from urllib.parse import urlencode
 
         args = {k: v for k, v in args.items() if v is not None and v != 'NA'}
-        uri = uri + "?" + urlencode(args)
+        return uri + "?" + urlencode(args)
+
+    @staticmethod
+    def _publish(args, server, uri):
+        from http.client import HTTPConnection, HTTPSConnection
+
+        uri = HttpPublisher._query(args, uri)
 
         log.debug('Connect to: https://%s' % server)
         log.debug('GET %s' % uri)
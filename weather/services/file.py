@@ -23,32 +23,70 @@ is up to the user to define all field names using named parameters with the
 with other set() publisher methods, please reference the other classes for
 expected field names.
 
+By default the file is rewritten on every publish() call. The new contents are
+written to a temporary file in the same directory and moved over the old file
+with os.replace(), so readers polling the file never see a partial write.
+
+In 'append' mode, each publish() call adds a single line to the end of the
+file instead, with the 'field value [value ...]' groups separated by a TAB
+character. The 'ring' mode is identical, but only keeps the newest
+'ring_size' lines; the file is compacted (atomically) once it has grown to
+twice that size. The lines already in the file (e.g. before a restart) are
+counted on the first publish() call. In both modes the file is fsync'ed every 'fsync_every'
+publications.
+
 Usage:
 >>> publisher = TextFile( 'file_name' )
 >>> publisher.set( ... )
 >>> publisher.publish()
 
+>>> history = TextFile( 'file_name', mode='ring', ring_size=1440 )
+
 Author: Patrick C. McGinty (pyweather@tuxcoder.com)
 Date: Thursday, July 15 2010
 '''
 
 
 
-import io
+import collections
 import logging
+import os
+import stat
+import tempfile
 log = logging.getLogger(__name__)
 
 from . _base import *
 
 
+# formatters of the common value types, looked up by exact type; anything
+# else uses repr()
+_FORMATTERS = {
+   int: int.__repr__,
+   float: float.__repr__,
+   str: str.__repr__,
+}
+
+
 class TextFile(object):
    '''
    Publishes weather data to a local file. See module
    documentation for additional information and usage idioms.
    '''
-   def __init__(self, file_name):
+   MODES = ('replace', 'append', 'ring')
+
+   def __init__(self, file_name, mode='replace', ring_size=1000,
+                fsync_every=10):
+      if mode not in self.MODES:
+         raise ValueError('unsupported mode: %s' % (mode,))
       self.file_name = file_name
+      self.mode = mode
+      self.ring_size = ring_size
+      self.fsync_every = fsync_every
       self.args = {}
+      self._count = 0
+      self._fh = None
+      self._ring = collections.deque(maxlen=ring_size)
+      self._ring_lines = None
 
    def set( self, **kw):
       '''
@@ -59,28 +97,122 @@ class TextFile(object):
 
 
    @staticmethod
-   def _append_vals( buf, val):
-      if isinstance(val,dict):
-         msg = 'unsupported %s type: %s' % (type(val),repr(val),)
-         log.error(msg)
-      if isinstance(val,(list,tuple)):
-         for i in val:
-           TextFile._append_vals(buf, i)
-      else:
-         buf.write(' ' + repr(val))
+   def _append_vals( parts, val):
+      '''
+      Append the formatted value(s) of a single field to 'parts'. Nested
+      lists/tuples are flattened in order.
+      '''
+      stack = [val]
+      while stack:
+         val = stack.pop()
+         fmt = _FORMATTERS.get(type(val))
+         if fmt is not None:
+            parts.append(fmt(val))
+         elif isinstance(val,(list,tuple)):
+            stack.extend(reversed(val))
+         else:
+            if isinstance(val,dict):
+               msg = 'unsupported %s type: %s' % (type(val),repr(val),)
+               log.error(msg)
+            parts.append(repr(val))
+
+
+   def _format(self, sep):
+      '''
+      Return all fields as a single string, with each field group separated
+      by 'sep'.
+      '''
+      groups = []
+      for k,v in self.args.items():
+         parts = [k]
+         self._append_vals(parts,v)
+         groups.append(' '.join(parts))
+      return sep.join(groups)
 
 
-   def publish(self):
+   def _sync_due(self):
+      self._count += 1
+      return self.fsync_every and self._count % self.fsync_every == 0
+
+
+   def _replace(self, data, sync):
       '''
-      Write output file.
+      Atomically replace the output file with 'data'.
+      '''
+      dir_name = os.path.dirname(os.path.abspath(self.file_name))
+      fd, tmp_name = tempfile.mkstemp(
+            prefix='.' + os.path.basename(self.file_name) + '.', dir=dir_name)
+      try:
+         with os.fdopen(fd, 'w') as fh:
+            fh.write(data)
+            if sync:
+               fh.flush()
+               os.fsync(fh.fileno())
+         # keep the mode of the published file; mkstemp creates it 0600
+         try:
+            mode = stat.S_IMODE(os.stat(self.file_name).st_mode)
+         except FileNotFoundError:
+            mode = 0o644
+         os.chmod(tmp_name, mode)
+         os.replace(tmp_name, self.file_name)
+      except BaseException:
+         os.unlink(tmp_name)
+         raise
+
+
+   def _load_ring(self):
       '''
-      with open( self.file_name, 'w') as fh:
-         for k,v in self.args.items():
-            buf = io.StringIO()
-            buf.write(k)
-            self._append_vals(buf,v)
-            fh.write(buf.getvalue() + '\n')
-            buf.close() # free string buffer
+      Count the lines already in the output file, and keep the newest
+      'ring_size' of them for the next compaction.
+      '''
+      self._ring_lines = 0
+      try:
+         with open(self.file_name) as fh:
+            for line in fh:
+               self._ring.append(line)
+               self._ring_lines += 1
+      except FileNotFoundError:
+         pass
+
 
+   def _append(self, line, sync):
+      if self._fh is None:
+         self._fh = open(self.file_name, 'a')
+      self._fh.write(line)
+      self._fh.flush()
+      if sync:
+         os.fsync(self._fh.fileno())
 
 
+   def publish(self):
+      '''
+      Write output file.
+      '''
+      sync = self._sync_due()
+      if self.mode == 'replace':
+         data = self._format('\n')
+         self._replace(data + '\n' if data else data, sync)
+         return
+
+      line = self._format('\t') + '\n'
+      if self.mode == 'ring':
+         if self._ring_lines is None:
+            self._load_ring()
+         self._ring.append(line)
+         self._ring_lines += 1
+         if self._ring_lines >= 2 * self.ring_size:
+            # compact the file down to the newest 'ring_size' lines
+            self.close()
+            self._replace(''.join(self._ring), sync)
+            self._ring_lines = len(self._ring)
+            return
+      self._append(line, sync)
+
+
+   def close(self):
+      '''
+      Close the output file, when open in 'append' or 'ring' mode.
+      '''
+      if self._fh is not None:
+         self._fh.close()
+         self._fh = None
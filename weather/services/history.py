@@ -0,0 +1,228 @@
+'''
+Local History Publisher
+
+Abstract:
+The class contained within this module allows python programs to keep a
+local history of weather conditions. Unlike TextFile, which overwrites the
+output with the latest values, every record is appended to the file, either
+as JSON Lines (one JSON object per line) or as CSV.
+
+Records are buffered in memory and written once 'flush_bytes' of data is
+pending, or when 'flush_interval' seconds have passed since the last write.
+The output can be rotated by size ('size', see 'max_bytes') or by local
+calendar day ('day'). The day of a record is that of its 'time' value (a
+datetime or struct_time; naive values are UTC, as in WeatherPoint), or the
+time it was added when it has none, so records buffered before midnight
+still go to the file of their own day. Closed segments are renamed with a
+time suffix and are optionally compressed with gzip.
+
+The column order is fixed for the life of the publisher, so every line (and
+every CSV segment) has the same layout. It is taken from the 'columns'
+argument, or from the first record written. Keys missing from a record are
+written as null (JSON) or an empty cell (CSV); keys not in the column list
+are dropped. An existing CSV file with a different header is closed as a
+segment, and a new file is started.
+
+Records can be passed as keyword args to set() (compatible with the other
+publishers), or directly to add() as a WeatherPoint or a dict, such as the
+VantagePro.fields dict.
+
+Usage:
+>>> publisher = HistoryFile( 'history.jsonl', rotate='day', compress=True )
+>>> publisher.set( ... )
+>>> publisher.publish()
+...
+>>> publisher.close()
+'''
+
+__all__ = ['HistoryFile']
+
+import calendar
+import csv
+import datetime
+import gzip
+import io
+import itertools
+import json
+import logging
+import os
+import shutil
+import time
+
+from ._base import _json_record, _to_json
+
+log = logging.getLogger(__name__)
+
+
+class HistoryFile(object):
+    '''
+    Appends weather records to a local JSON Lines or CSV file. See module
+    documentation for additional information and usage idioms.
+    '''
+    FORMATS = ('jsonl', 'csv')
+    ROTATE = (None, 'size', 'day')
+
+    def __init__(self, file_name, format='jsonl', columns=None,
+                 flush_bytes=64 * 1024, flush_interval=60, rotate=None,
+                 max_bytes=64 * 1024 * 1024, compress=False):
+        if format not in self.FORMATS:
+            raise ValueError('unsupported format: %s' % (format,))
+        if rotate not in self.ROTATE:
+            raise ValueError('unsupported rotation: %s' % (rotate,))
+        self.file_name = file_name
+        self.format = format
+        self.columns = tuple(columns) if columns else None
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.rotate = rotate
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.args = {}
+        self._buf = []
+        self._buf_size = 0
+        self._last_flush = time.monotonic()
+        self._day = None
+        self._header_checked = False
+
+    def set(self, **kw):
+        '''
+        Store keyword args to be written as the next record.
+        '''
+        self.args = kw
+        log.debug(self.args)
+
+    def publish(self):
+        '''
+        Append the values stored by set() to the history.
+        '''
+        self.add(self.args)
+
+    def add(self, record):
+        '''
+        Append a single record (a WeatherPoint or a dict) to the history.
+        '''
+        if hasattr(record, 'to_dict'):
+            record = record.to_dict()
+        day = self._record_day(record) if self.rotate == 'day' else None
+        record = _json_record(record)
+        if self.columns is None:
+            self.columns = tuple(record)
+        line = self._format(record)
+        self._buf.append((day, line))
+        self._buf_size += len(line)
+        if (self._buf_size >= self.flush_bytes or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    @staticmethod
+    def _record_day(record):
+        '''
+        Return the local calendar day of a record, from its 'time' value.
+        '''
+        val = record.get('time')
+        if isinstance(val, datetime.datetime):
+            if val.tzinfo is None:
+                val = val.replace(tzinfo=datetime.timezone.utc)
+            timestamp = val.timestamp()
+        elif isinstance(val, time.struct_time):
+            timestamp = calendar.timegm(val)
+        else:
+            timestamp = time.time()
+        return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+    def _format(self, record):
+        values = [record.get(c) for c in self.columns]
+        if self.format == 'jsonl':
+            return json.dumps(dict(zip(self.columns, values)),
+                              default=_to_json, separators=(',', ':')) + '\n'
+        return self._csv_line(self._csv_value(v) for v in values)
+
+    @staticmethod
+    def _csv_value(val):
+        if val is None:
+            return ''
+        if isinstance(val, (str, int, float)):
+            return val
+        if isinstance(val, (list, tuple, dict)):
+            return json.dumps(val, default=_to_json)
+        return _to_json(val)
+
+    @staticmethod
+    def _csv_line(values):
+        out = io.StringIO()
+        csv.writer(out, lineterminator='\n').writerow(values)
+        return out.getvalue()
+
+    def flush(self):
+        '''
+        Write all buffered records to the output file.
+        '''
+        self._last_flush = time.monotonic()
+        if not self._buf:
+            return
+        # records of the same day are written together
+        for day, entries in itertools.groupby(self._buf, lambda e: e[0]):
+            self._rotate_if_due(day)
+            self._write(''.join(line for _, line in entries))
+        self._buf = []
+        self._buf_size = 0
+
+    def _write(self, data):
+        new_file = (not os.path.exists(self.file_name) or
+                    os.path.getsize(self.file_name) == 0)
+        header = self.format == 'csv' and self._csv_line(self.columns)
+        if header and not new_file and not self._header_checked:
+            with open(self.file_name, newline='') as fh:
+                old_header = fh.readline()
+            if old_header != header:
+                log.warning('%s has different columns, starting a new file'
+                            % self.file_name)
+                self._close_segment(time.strftime('%Y%m%d-%H%M%S'))
+                new_file = True
+        self._header_checked = True
+        with open(self.file_name, 'a', newline='') as fh:
+            if new_file and header:
+                fh.write(header)
+            fh.write(data)
+
+    def _rotate_if_due(self, day):
+        if self.rotate == 'day':
+            if self._day is None:
+                self._day = day
+                if os.path.exists(self.file_name):
+                    mtime = time.localtime(os.path.getmtime(self.file_name))
+                    if time.strftime('%Y-%m-%d', mtime) < day:
+                        self._close_segment(time.strftime('%Y-%m-%d', mtime))
+            elif day > self._day:
+                # a late record of an earlier day stays in the active file
+                self._close_segment(self._day)
+                self._day = day
+        elif self.rotate == 'size':
+            if (os.path.exists(self.file_name) and
+                    os.path.getsize(self.file_name) >= self.max_bytes):
+                self._close_segment(time.strftime('%Y%m%d-%H%M%S'))
+
+    def _close_segment(self, suffix):
+        '''
+        Rename the active file with 'suffix', and compress it if requested.
+        '''
+        if not os.path.exists(self.file_name):
+            return
+        seg_name = '%s.%s' % (self.file_name, suffix)
+        i = 1
+        while os.path.exists(seg_name) or os.path.exists(seg_name + '.gz'):
+            seg_name = '%s.%s.%d' % (self.file_name, suffix, i)
+            i += 1
+        os.replace(self.file_name, seg_name)
+        log.info('closed history segment %s' % seg_name)
+        if self.compress:
+            with open(seg_name, 'rb') as src, \
+                    gzip.open(seg_name + '.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.unlink(seg_name)
+
+    def close(self):
+        '''
+        Flush any pending records.
+        '''
+        self.flush()
@@ -0,0 +1,233 @@
+'''
+Local Live-Data HTTP Server
+
+Abstract:
+The class contained within this module serves the latest weather reading as
+JSON over HTTP, so any number of local consumers can read current conditions
+without touching the station itself. The server runs in a background thread,
+using the standard library http.server module.
+
+Resources:
+
+   /          {"seq": N, "point": {...}, "fields": {...}}
+   /point     the latest WeatherPoint (or the publisher set() args)
+   /fields    the latest raw station fields (e.g. VantagePro.fields)
+   /stream    Server-Sent Events; one 'data:' event per new reading
+
+Each reading is serialized at most once per resource, on the first request
+after it arrives; all other requests are served from the cached bytes.
+Responses carry an ETag. A request with a matching 'If-None-Match' header gets
+a '304 Not Modified', unless a 'wait=SECONDS' query arg is given. In that case
+the request is held (long-poll) until a new reading arrives or the timeout
+expires.
+
+Usage:
+>>> server = LiveServer( port=8080 )
+>>> server.start()
+>>> server.update( point=station.get_reading(), fields=station.fields )
+...
+>>> server.stop()
+
+The set()/publish() methods accept any keyword args, which are published as
+the 'point' document, so LiveServer can be used as a publication service.
+'''
+
+__all__ = ['LiveServer']
+
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from ._base import _json_record, _to_json
+
+log = logging.getLogger(__name__)
+
+# seconds between SSE keep-alive comments
+KEEPALIVE = 15
+# upper limit for long-poll 'wait' requests
+MAX_WAIT = 300
+
+
+class _Handler(BaseHTTPRequestHandler):
+    '''
+    HTTP request handler; the LiveServer instance is 'self.server.live'.
+    '''
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        log.debug(fmt % args)
+
+    def do_GET(self):
+        live = self.server.live
+        url = urlsplit(self.path)
+        if url.path == '/stream':
+            return self._stream(live)
+        if url.path not in live.DOCS:
+            return self._send(404, b'{"error":"not found"}')
+
+        etag = self.headers.get('If-None-Match')
+        try:
+            wait = float(parse_qs(url.query).get('wait', ['0'])[0])
+        except ValueError:
+            return self._send(400, b'{"error":"bad wait value"}')
+        if etag and wait > 0:
+            live.wait(etag, min(wait, MAX_WAIT))
+
+        cur_etag, body = live.body(url.path)
+        if etag == cur_etag:
+            return self._send(304, None, cur_etag)
+        self._send(200, body, cur_etag)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        if body is None:
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, live):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        etag = None
+        try:
+            while live.running:
+                cur_etag, body = live.body('/')
+                if cur_etag != etag:
+                    etag = cur_etag
+                    self.wfile.write(b'id: ' + etag.strip('"').encode() +
+                                     b'\ndata: ' + body + b'\n\n')
+                elif not live.wait(etag, KEEPALIVE):
+                    self.wfile.write(b': keep-alive\n\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class LiveServer(object):
+    '''
+    Serves the latest weather reading over HTTP. See module documentation for
+    additional information and usage idioms.
+    '''
+    DOCS = ('/', '/point', '/fields')
+
+    def __init__(self, host='127.0.0.1', port=8080):
+        self.address = (host, port)
+        self.args = {}
+        self.running = False
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._epoch = '%x' % int(time.time())
+        self._point = None
+        self._fields = None
+        self._cache = {}
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self):
+        '''
+        The port the server is bound to (useful when started on port 0).
+        '''
+        return self._server.server_address[1]
+
+    def start(self):
+        '''
+        Start serving requests in a background thread.
+        '''
+        self._server = ThreadingHTTPServer(self.address, _Handler)
+        self._server.daemon_threads = True
+        self._server.live = self
+        self.running = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='LiveServer', daemon=True)
+        self._thread.start()
+        log.info('serving live data on http://%s:%d/' %
+                 (self.address[0], self.port))
+
+    def stop(self):
+        '''
+        Stop the server, and release any waiting clients.
+        '''
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def set(self, **kw):
+        '''
+        Store keyword args to be published as the 'point' document.
+        '''
+        self.args = kw
+        log.debug(self.args)
+
+    def publish(self):
+        '''
+        Publish the values stored by set().
+        '''
+        self.update(point=self.args)
+
+    def update(self, point=None, fields=None):
+        '''
+        Publish a new reading. 'point' can be a WeatherPoint or a dict.
+        '''
+        if hasattr(point, 'to_dict'):
+            point = point.to_dict()
+        if point is not None:
+            point = _json_record(point)
+        if fields is not None:
+            fields = _json_record(fields)
+        with self._cond:
+            self._seq += 1
+            self._point = point
+            self._fields = fields
+            self._cache = {}
+            self._cond.notify_all()
+
+    def _etag(self):
+        return '"%s-%d"' % (self._epoch, self._seq)
+
+    def body(self, path):
+        '''
+        Return (etag, JSON bytes) of the current reading for 'path'. The
+        document is serialized once per reading.
+        '''
+        with self._cond:
+            cached = self._cache.get(path)
+            if cached is None:
+                if path == '/point':
+                    doc = self._point
+                elif path == '/fields':
+                    doc = self._fields
+                else:
+                    doc = {'seq': self._seq, 'point': self._point,
+                           'fields': self._fields}
+                cached = (self._etag(), json.dumps(
+                    doc, default=_to_json, separators=(',', ':')).encode())
+                self._cache[path] = cached
+            return cached
+
+    def wait(self, etag, timeout):
+        '''
+        Block until the current ETag differs from 'etag', or until 'timeout'
+        seconds have passed. Return True if a new reading is available.
+        '''
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._etag() != etag or not self.running, timeout)
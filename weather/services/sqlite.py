@@ -0,0 +1,236 @@
+'''
+SQLite Observation Store
+
+Abstract:
+The class contained within this module allows python programs to store
+weather observations and Davis archive records in a local SQLite database.
+SQLite is part of the Python standard library, so no database server is
+needed.
+
+Two tables are created:
+
+   observations   one row per WeatherPoint
+   archive        one row per archive record, as returned by the DMPAFT
+                  command (see VantagePro._dmpaft_cmd)
+
+Both tables use a (station, time) primary key, so overlapping archive dumps
+(or repeated publications of the same reading) are stored only once. Times
+are stored as 'YYYY-MM-DD HH:MM:SS' strings, which sort in time order.
+Archive record times are the console (local) time.
+
+Rows are buffered and written with a single prepared statement, in one
+transaction per 'batch_size' rows. The database uses WAL journaling, so
+readers are not blocked while a batch is written. Call flush() (or close())
+to write any pending rows.
+
+Usage:
+>>> store = SqliteStore( 'weather.db', station='home' )
+>>> store.add_point( station.get_reading() )
+>>> store.add_archive( records )
+>>> store.flush()
+>>> for point in store.points( start, end ):
+...    print( point )
+
+The set()/publish() methods accept the same keyword args as the other
+publishers (see the Wunderground publisher), so SqliteStore can be used as a
+publication service.
+'''
+
+__all__ = ['SqliteStore']
+
+import datetime
+import logging
+import sqlite3
+import time
+
+log = logging.getLogger(__name__)
+
+TIME_FMT = '%Y-%m-%d %H:%M:%S'
+
+# WeatherPoint fields stored in the 'observations' table
+POINT_COLUMNS = (
+    'temperature_f', 'humidity', 'dew_point_f', 'pressure', 'rain_rate_in',
+    'rain_day_in', 'wind_speed_mph', 'wind_direction',
+)
+
+# scalar archive record fields stored in the 'archive' table
+ARCHIVE_COLUMNS = (
+    'TempOut', 'TempOutHi', 'TempOutLow', 'RainRate', 'RainRateHi',
+    'Barometer', 'SolarRad', 'WindSamps', 'TempIn', 'HumIn', 'HumOut',
+    'WindAvg', 'WindHi', 'WindHiDir', 'WindAvgDir', 'UV', 'ETHour',
+    'SolarRadHi', 'UVHi', 'ForecastRuleNo',
+)
+
+# publisher set() keyword args, mapped to WeatherPoint fields
+SET_ARGS = {
+    'tempf': 'temperature_f',
+    'humidity': 'humidity',
+    'dewpoint': 'dew_point_f',
+    'pressure': 'pressure',
+    'rainin': 'rain_rate_in',
+    'rainday': 'rain_day_in',
+    'windspeed': 'wind_speed_mph',
+    'winddir': 'wind_direction',
+}
+
+
+def _time_str(val):
+    '''
+    Return the database representation of a time value; None and 'NA' are
+    now. Strings must be in TIME_FMT, or ValueError is raised.
+    '''
+    if val is None or val == 'NA':
+        return time.strftime(TIME_FMT, time.gmtime())
+    if isinstance(val, str):
+        datetime.datetime.strptime(val, TIME_FMT)  # validate
+        return val
+    if isinstance(val, time.struct_time):
+        return time.strftime(TIME_FMT, val)
+    return val.strftime(TIME_FMT)
+
+
+def _archive_time_str(rec):
+    return '%04d-%02d-%02d %02d:%02d:00' % (
+        rec['Year'], rec['Month'], rec['Day'], rec['Hour'], rec['Min'])
+
+
+class SqliteStore(object):
+    '''
+    Stores weather observations and archive records in a SQLite database. See
+    module documentation for additional information and usage idioms.
+    '''
+
+    def __init__(self, file_name, station='default', batch_size=500):
+        self.file_name = file_name
+        self.station = station
+        self.batch_size = batch_size
+        self.args = {}
+        self._points = []
+        self._archive = []
+        self.conn = sqlite3.connect(file_name)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_tables()
+        self._insert_point = self._insert_sql('observations', POINT_COLUMNS)
+        self._insert_archive = self._insert_sql('archive', ARCHIVE_COLUMNS)
+
+    def _create_tables(self):
+        with self.conn:
+            for table, cols in (('observations', POINT_COLUMNS),
+                                ('archive', ARCHIVE_COLUMNS)):
+                self.conn.execute(
+                    'CREATE TABLE IF NOT EXISTS %s ('
+                    'station TEXT NOT NULL, time TEXT NOT NULL, %s, '
+                    'PRIMARY KEY (station, time)) WITHOUT ROWID' %
+                    (table, ', '.join('%s REAL' % c for c in cols)))
+
+    @staticmethod
+    def _insert_sql(table, cols):
+        return 'INSERT OR IGNORE INTO %s (station, time, %s) VALUES (%s)' % (
+            table, ', '.join(cols), ', '.join('?' * (len(cols) + 2)))
+
+    def set(self, **kw):
+        '''
+        Store publisher keyword args to be written as the next observation.
+        '''
+        self.args = kw
+        log.debug(self.args)
+
+    def publish(self):
+        '''
+        Add the observation defined by set() to the database.
+        '''
+        vals = {SET_ARGS[k]: v for k, v in self.args.items()
+                if k in SET_ARGS and v != 'NA'}
+        row = [self.station, _time_str(self.args.get('dateutc'))]
+        row.extend(vals.get(c) for c in POINT_COLUMNS)
+        self._add(self._points, row)
+
+    def add_point(self, point):
+        '''
+        Add a single WeatherPoint to the database.
+        '''
+        row = [self.station, _time_str(point.time)]
+        row.extend(getattr(point, c) for c in POINT_COLUMNS)
+        self._add(self._points, row)
+
+    def add_archive(self, records):
+        '''
+        Add a sequence of archive record dicts to the database. Records that
+        are already stored are ignored.
+        '''
+        for rec in records:
+            row = [self.station, _archive_time_str(rec)]
+            row.extend(rec.get(c) for c in ARCHIVE_COLUMNS)
+            self._add(self._archive, row)
+
+    def _add(self, pending, row):
+        pending.append(row)
+        if len(pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        '''
+        Write all pending rows to the database, in a single transaction.
+        '''
+        if not (self._points or self._archive):
+            return
+        with self.conn:
+            if self._points:
+                self.conn.executemany(self._insert_point, self._points)
+            if self._archive:
+                self.conn.executemany(self._insert_archive, self._archive)
+        log.debug('stored %d observations, %d archive records' %
+                  (len(self._points), len(self._archive)))
+        self._points = []
+        self._archive = []
+
+    def close(self):
+        '''
+        Write pending rows and close the database.
+        '''
+        self.flush()
+        self.conn.close()
+
+    def _select(self, table, cols, start, end):
+        sql = 'SELECT time, %s FROM %s WHERE station = ?' % (
+            ', '.join(cols), table)
+        params = [self.station]
+        if start is not None:
+            sql += ' AND time >= ?'
+            params.append(_time_str(start))
+        if end is not None:
+            sql += ' AND time < ?'
+            params.append(_time_str(end))
+        return self.conn.execute(sql + ' ORDER BY time', params)
+
+    def points(self, start=None, end=None):
+        '''
+        Yield the stored WeatherPoints with start <= time < end, in time
+        order. Either limit can be None for an open range.
+        '''
+        from ..stations.station import WeatherPoint
+        for row in self._select('observations', POINT_COLUMNS, start, end):
+            kw = dict(zip(POINT_COLUMNS, row[1:]))
+            yield WeatherPoint(
+                time=datetime.datetime.strptime(row[0], TIME_FMT), **kw)
+
+    def archive(self, start=None, end=None):
+        '''
+        Yield the stored archive records with start <= time < end, in time
+        order, as dicts with a 'time' key and the ARCHIVE_COLUMNS fields.
+        '''
+        for row in self._select('archive', ARCHIVE_COLUMNS, start, end):
+            rec = dict(zip(ARCHIVE_COLUMNS, row[1:]))
+            rec['time'] = datetime.datetime.strptime(row[0], TIME_FMT)
+            yield rec
+
+    def count(self, table='observations'):
+        '''
+        Return the number of rows stored for this station.
+        '''
+        if table not in ('observations', 'archive'):
+            raise ValueError('unknown table: %s' % (table,))
+        return self.conn.execute(
+            'SELECT COUNT(*) FROM %s WHERE station = ?' % table,
+            (self.station,)).fetchone()[0]
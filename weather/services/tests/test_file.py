@@ -1,7 +1,8 @@
 
-import builtins
+
+import os
+import tempfile
 import unittest
-from mock import Mock, patch, mock_open
 
 from ..file import TextFile
 
@@ -10,6 +11,20 @@ class TestPublish(unittest.TestCase):
 
     F = TextFile('output.txt')
 
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'output.txt')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _publish(self, **kw):
+        f = TextFile(self.path)
+        f.set(**kw)
+        f.publish()
+        with open(self.path) as fh:
+            return fh.read()
+
     def test_set(self):
         self.F.set(a=1, b=2, c=3)
         self.assertEqual(self.F.args, {'a': 1, 'b': 2, 'c': 3})
@@ -20,41 +35,67 @@ class TestPublish(unittest.TestCase):
         self.assertRaises(TypeError, self.F.set, 1, 2, 3)
 
     def test_single_value(self):
-        m = mock_open()
-        with patch.object(builtins, 'open', m):
-            self.F.set(a=1)
-            self.F.publish()
-
-            m.assert_called()
-            handle = m()
-            handle.write.assert_called_with('a 1\n')
+        self.assertEqual(self._publish(a=1), 'a 1\n')
 
     def test_string_value(self):
-        m = mock_open()
-        with patch.object(builtins, 'open', m):
-            self.F.set(a='string arg')
-            self.F.publish()
-
-            m.assert_called()
-            handle = m()
-            handle.write.assert_called_with("a 'string arg'\n")
+        self.assertEqual(self._publish(a='string arg'), "a 'string arg'\n")
 
     def test_list_value(self):
-        m = mock_open()
-        with patch.object(builtins, 'open', m):
-            self.F.set(a=[1, 2, 3])
-            self.F.publish()
-
-            m.assert_called()
-            handle = m()
-            handle.write.assert_called_with("a 1 2 3\n")
+        self.assertEqual(self._publish(a=[1, 2, 3]), "a 1 2 3\n")
 
     def test_double_list_value(self):
-        m = mock_open()
-        with patch.object(builtins, 'open', m):
-            self.F.set(a=[['a', 'b', 'c'], 2, 3])
-            self.F.publish()
-
-            m.assert_called()
-            handle = m()
-            handle.write.assert_called_with("a 'a' 'b' 'c' 2 3\n")
+        self.assertEqual(self._publish(a=[['a', 'b', 'c'], 2, 3]),
+                         "a 'a' 'b' 'c' 2 3\n")
+
+    def test_multiple_fields(self):
+        self.assertEqual(self._publish(a=1.5, b=None, c=True),
+                         "a 1.5\nb None\nc True\n")
+
+    def test_replace_leaves_no_temp_files(self):
+        self._publish(a=1)
+        self._publish(a=2)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ['output.txt'])
+
+    def test_replace_keeps_mode(self):
+        self._publish(a=1)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o644)
+        os.chmod(self.path, 0o640)
+        self._publish(a=2)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+
+    def test_append_mode(self):
+        f = TextFile(self.path, mode='append', fsync_every=1)
+        for i in range(3):
+            f.set(a=i, b=[i, 'x'])
+            f.publish()
+        f.close()
+        with open(self.path) as fh:
+            self.assertEqual(fh.read(),
+                             "a 0\tb 0 'x'\na 1\tb 1 'x'\na 2\tb 2 'x'\n")
+
+    def test_ring_mode(self):
+        f = TextFile(self.path, mode='ring', ring_size=3)
+        for i in range(10):
+            f.set(a=i)
+            f.publish()
+        f.close()
+        with open(self.path) as fh:
+            lines = fh.read().splitlines()
+        self.assertLessEqual(len(lines), 6)
+        self.assertEqual(lines[-3:], ['a 7', 'a 8', 'a 9'])
+
+    def test_ring_mode_restart(self):
+        # the lines written before a restart count toward the ring size
+        for start in (0, 5, 10):
+            f = TextFile(self.path, mode='ring', ring_size=3)
+            for i in range(start, start + 5):
+                f.set(a=i)
+                f.publish()
+            f.close()
+            with open(self.path) as fh:
+                lines = fh.read().splitlines()
+            self.assertLessEqual(len(lines), 6)
+        self.assertEqual(lines[-3:], ['a 12', 'a 13', 'a 14'])
+
+    def test_bad_mode(self):
+        self.assertRaises(ValueError, TextFile, self.path, mode='bogus')
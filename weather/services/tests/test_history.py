@@ -0,0 +1,144 @@
+
+import calendar
+import csv
+import datetime
+import gzip
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from ..history import HistoryFile
+from ...stations.station import WeatherPoint
+
+
+class TestHistoryFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'history')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read(self, path=None):
+        with open(path or self.path) as fh:
+            return fh.read()
+
+    def test_jsonl_stable_columns(self):
+        h = HistoryFile(self.path)
+        h.set(b=1, a='x')
+        h.publish()
+        h.set(a='y', c=3)
+        h.publish()
+        h.close()
+        lines = [json.loads(l) for l in self._read().splitlines()]
+        self.assertEqual(lines, [{'b': 1, 'a': 'x'}, {'b': None, 'a': 'y'}])
+        self.assertTrue(self._read().startswith('{"b"'))
+
+    def test_weather_point(self):
+        h = HistoryFile(self.path)
+        h.add(WeatherPoint(time=datetime.datetime(2020, 1, 2, 3, 4, 5),
+                           temperature_f=70.5, humidity=40))
+        h.close()
+        rec = json.loads(self._read())
+        self.assertEqual(tuple(rec), WeatherPoint.FIELDS)
+        self.assertEqual(rec['time'], '2020-01-02T03:04:05')
+        self.assertEqual(rec['temperature_f'], 70.5)
+
+    def test_default_time(self):
+        point = WeatherPoint(temperature_f=70.5)
+        iso = time.strftime('%Y-%m-%dT%H:%M:%S', point.time)
+        for fmt in HistoryFile.FORMATS:
+            path = '%s.%s' % (self.path, fmt)
+            h = HistoryFile(path, format=fmt)
+            h.add(point)
+            h.close()
+            if fmt == 'jsonl':
+                self.assertEqual(json.loads(self._read(path))['time'], iso)
+            else:
+                rows = list(csv.reader(self._read(path).splitlines()))
+                self.assertEqual(rows[1][0], iso)
+
+    def test_csv(self):
+        h = HistoryFile(self.path, format='csv', columns=('a', 'b'))
+        h.add({'a': 1, 'b': (1, 2)})
+        h.add({'a': 'q,r'})
+        h.close()
+        rows = list(csv.reader(self._read().splitlines()))
+        self.assertEqual(rows, [['a', 'b'], ['1', '[1, 2]'], ['q,r', '']])
+
+    def test_buffered(self):
+        h = HistoryFile(self.path, flush_bytes=1000)
+        h.add({'a': 1})
+        self.assertFalse(os.path.exists(self.path))
+        h.flush()
+        self.assertEqual(self._read(), '{"a":1}\n')
+
+    def test_flush_interval(self):
+        h = HistoryFile(self.path, flush_interval=0)
+        h.add({'a': 1})
+        self.assertEqual(self._read(), '{"a":1}\n')
+
+    def test_rotate_size_compress(self):
+        h = HistoryFile(self.path, format='csv', flush_bytes=0,
+                        rotate='size', max_bytes=10, compress=True)
+        for i in range(3):
+            h.add({'value': 10000 + i})
+        h.close()
+        segments = sorted(f for f in os.listdir(self.tmp_dir.name)
+                          if f.endswith('.gz'))
+        closed = []
+        for seg in segments:
+            with gzip.open(os.path.join(self.tmp_dir.name, seg), 'rt') as fh:
+                closed.append(fh.read())
+        self.assertEqual(sorted(closed),
+                         ['value\n10000\n', 'value\n10001\n'])
+        self.assertEqual(self._read(), 'value\n10002\n')
+
+    def test_rotate_day(self):
+        h = HistoryFile(self.path, flush_bytes=0, rotate='day')
+        with mock.patch('time.strftime', return_value='2020-01-01'):
+            h.add({'a': 1})
+        with mock.patch('time.strftime', return_value='2020-01-02'):
+            h.add({'a': 2})
+        self.assertEqual(self._read(self.path + '.2020-01-01'), '{"a":1}\n')
+        self.assertEqual(self._read(), '{"a":2}\n')
+
+    def test_rotate_day_buffered(self):
+        # records buffered over midnight go to the file of their own day
+        times = [datetime.datetime(2020, 1, 1, 12),
+                 datetime.datetime(2020, 1, 2, 12)]
+        days = [time.strftime('%Y-%m-%d', time.localtime(
+            calendar.timegm(t.utctimetuple()))) for t in times]
+        h = HistoryFile(self.path, rotate='day')
+        for i, t in enumerate(times):
+            h.add({'time': t, 'a': i})
+        h.close()
+        self.assertEqual(json.loads(self._read(self.path + '.' + days[0])),
+                         {'time': '2020-01-01T12:00:00', 'a': 0})
+        self.assertEqual(json.loads(self._read())['a'], 1)
+
+    def test_csv_other_columns(self):
+        with open(self.path, 'w') as fh:
+            fh.write('x,y\n1,2\n')
+        h = HistoryFile(self.path, format='csv', columns=('a', 'b'))
+        h.add({'a': 1, 'b': 2})
+        h.close()
+        self.assertEqual(self._read(), 'a,b\n1,2\n')
+        segments = [f for f in os.listdir(self.tmp_dir.name)
+                    if f != 'history']
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(self._read(os.path.join(self.tmp_dir.name,
+                                                 segments[0])), 'x,y\n1,2\n')
+        # the same columns are appended to
+        h = HistoryFile(self.path, format='csv', columns=('a', 'b'))
+        h.add({'a': 3})
+        h.close()
+        self.assertEqual(self._read(), 'a,b\n1,2\n3,\n')
+
+    def test_bad_args(self):
+        self.assertRaises(ValueError, HistoryFile, self.path, format='xml')
+        self.assertRaises(ValueError, HistoryFile, self.path, rotate='week')
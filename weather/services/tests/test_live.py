@@ -0,0 +1,97 @@
+
+import http.client
+import json
+import threading
+import time
+import unittest
+
+from ..live import LiveServer
+from ...stations.station import WeatherPoint
+
+
+class TestLiveServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LiveServer(port=0)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def _get(self, path, headers=None):
+        conn = http.client.HTTPConnection('127.0.0.1', self.server.port,
+                                          timeout=5)
+        conn.request('GET', path, headers=headers or {})
+        resp = conn.getresponse()
+        body = resp.read()
+        conn.close()
+        return resp, body
+
+    def test_documents(self):
+        self.server.update(point=WeatherPoint(time=1, temperature_f=70),
+                           fields={'TempOut': 70.0})
+        resp, body = self._get('/')
+        self.assertEqual(resp.status, 200)
+        doc = json.loads(body)
+        self.assertEqual(doc['seq'], 1)
+        self.assertEqual(doc['point']['temperature_f'], 70)
+        self.assertEqual(doc['fields'], {'TempOut': 70.0})
+        resp, body = self._get('/fields')
+        self.assertEqual(json.loads(body), {'TempOut': 70.0})
+        resp, body = self._get('/missing')
+        self.assertEqual(resp.status, 404)
+
+    def test_default_time(self):
+        point = WeatherPoint(temperature_f=70)
+        self.server.update(point=point)
+        doc = json.loads(self._get('/point')[1])
+        self.assertEqual(doc['time'],
+                         time.strftime('%Y-%m-%dT%H:%M:%S', point.time))
+
+    def test_serialized_once(self):
+        self.server.update(fields={'a': 1})
+        first = self.server.body('/')
+        self.assertIs(self.server.body('/'), first)
+        self.server.update(fields={'a': 2})
+        self.assertIsNot(self.server.body('/'), first)
+
+    def test_etag(self):
+        self.server.set(tempf=50)
+        self.server.publish()
+        resp, _ = self._get('/point')
+        etag = resp.getheader('ETag')
+        resp, body = self._get('/point', {'If-None-Match': etag})
+        self.assertEqual(resp.status, 304)
+        self.assertEqual(body, b'')
+        self.server.update(point={'tempf': 51})
+        resp, body = self._get('/point', {'If-None-Match': etag})
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(json.loads(body), {'tempf': 51})
+
+    def test_long_poll(self):
+        self.server.update(point={'n': 1})
+        etag = self.server.body('/point')[0]
+        timer = threading.Timer(0.1, self.server.update,
+                                kwargs={'point': {'n': 2}})
+        timer.start()
+        resp, body = self._get('/point?wait=5', {'If-None-Match': etag})
+        timer.join()
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(json.loads(body), {'n': 2})
+
+    def test_stream(self):
+        self.server.update(point={'n': 1})
+        conn = http.client.HTTPConnection('127.0.0.1', self.server.port,
+                                          timeout=5)
+        conn.request('GET', '/stream')
+        resp = conn.getresponse()
+        self.assertEqual(resp.getheader('Content-Type'), 'text/event-stream')
+        self.assertTrue(resp.readline().startswith(b'id: '))
+        data = resp.readline()
+        self.assertEqual(json.loads(data[len(b'data: '):])['point'], {'n': 1})
+        self.server.update(point={'n': 2})
+        resp.readline()
+        resp.readline()
+        data = resp.readline()
+        self.assertEqual(json.loads(data[len(b'data: '):])['point'], {'n': 2})
+        conn.close()
@@ -0,0 +1,79 @@
+
+import datetime
+import os
+import tempfile
+import unittest
+
+from ..sqlite import SqliteStore, ARCHIVE_COLUMNS
+from ...stations.station import WeatherPoint
+
+
+def _archive_rec(minute, temp):
+    rec = dict.fromkeys(ARCHIVE_COLUMNS, 0)
+    rec.update(Year=2021, Month=4, Day=3, Hour=10, Min=minute, TempOut=temp)
+    return rec
+
+
+class TestSqliteStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'weather.db')
+        self.store = SqliteStore(self.path, station='home', batch_size=2)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_wal_mode(self):
+        mode = self.store.conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_points_round_trip(self):
+        t = datetime.datetime(2021, 4, 3, 10, 0, 0)
+        for i in range(3):
+            self.store.add_point(WeatherPoint(
+                time=t + datetime.timedelta(minutes=i),
+                temperature_f=60 + i, humidity=50))
+        # batch of 2 is written, third row is pending
+        self.assertEqual(self.store.count(), 2)
+        self.store.flush()
+        points = list(self.store.points(start=t + datetime.timedelta(
+            minutes=1)))
+        self.assertEqual([p.temperature_f for p in points], [61, 62])
+        self.assertEqual(points[0].time, t + datetime.timedelta(minutes=1))
+        self.assertEqual(points[0].humidity, 50)
+
+    def test_archive_dedup(self):
+        self.store.add_archive([_archive_rec(0, 70.0), _archive_rec(5, 71.0)])
+        # overlapping dump
+        self.store.add_archive([_archive_rec(5, 99.0), _archive_rec(10, 72.)])
+        self.store.flush()
+        self.assertEqual(self.store.count('archive'), 3)
+        recs = list(self.store.archive(end='2021-04-03 10:10:00'))
+        self.assertEqual([r['TempOut'] for r in recs], [70.0, 71.0])
+        self.assertEqual(recs[1]['time'], datetime.datetime(2021, 4, 3, 10, 5))
+
+    def test_publish(self):
+        self.store.set(tempf=55.5, humidity='NA',
+                       dateutc='2021-04-03 10:00:00')
+        self.store.publish()
+        self.store.flush()
+        point, = self.store.points()
+        self.assertEqual(point.temperature_f, 55.5)
+        self.assertIsNone(point.humidity)
+
+    def test_time_strings(self):
+        self.store.set(tempf=1, dateutc='NA')
+        self.store.publish()
+        self.store.flush()
+        point, = self.store.points()
+        self.assertIsInstance(point.time, datetime.datetime)
+        with self.assertRaises(ValueError):
+            self.store.add_point(WeatherPoint(time='1617444000'))
+
+    def test_stations_are_separate(self):
+        other = SqliteStore(self.path, station='away')
+        other.add_point(WeatherPoint(temperature_f=1))
+        other.close()
+        self.assertEqual(self.store.count(), 0)
@@ -0,0 +1,221 @@
+"""
+Serial Capture and Replay
+
+Abstract:
+CapturePort wraps an open serial port and records the traffic with the
+console to a binary capture file: every read and write, and every
+'in_waiting' poll, with the monotonic time since the capture started.
+ReplayPort plays a capture back to VantagePro in place of the serial port,
+so a field issue can be reproduced, or the full parse() path benchmarked,
+without the console. The capture file is memory mapped, so traces of any
+size are replayed without loading them.
+
+The file starts with a header, followed by one record per port operation:
+
+    header    magic 4s b'PYWC', version H, capture start time d (epoch)
+    record    time d (seconds since start), kind c, size I, data
+
+Record kinds are READ (data received), WRITE (data sent) and POLL (an
+'in_waiting' poll; 'size' is the value returned, there is no data). All
+values are little endian. A record truncated by a crash is ignored.
+
+ReplayPort returns the recorded data of every kind in the recorded order,
+independently of the other kinds. With 'speed' set, each operation waits
+until its recorded time (1.0 is the recorded speed, 2.0 twice as fast);
+by default the capture is replayed as fast as possible. Reads past the end
+of the capture return short, like a serial read timeout. In 'strict' mode
+(the default) a write that differs from the recorded one raises
+ReplayError, so a replay can't silently diverge from the capture.
+
+Usage:
+>>> station = VantagePro( '/dev/ttyS0', capture='console.cap' )  # record
+
+>>> station = VantagePro( ReplayPort( 'console.cap' ) )            # replay
+>>> station.parse()
+"""
+
+import logging
+import mmap
+import struct
+import time
+
+log = logging.getLogger(__name__)
+
+__all__ = ['CapturePort', 'ReplayPort', 'ReplayError']
+
+MAGIC = b'PYWC'
+VERSION = 1
+
+READ = b'R'
+WRITE = b'W'
+POLL = b'P'
+
+_HEADER = struct.Struct('<4sHd')
+_RECORD = struct.Struct('<dcI')
+
+
+class ReplayError(Exception):
+    """
+    raised when a replay diverges from the capture.
+    """
+
+
+class CapturePort(object):
+    """
+    Serial port wrapper, recording the traffic to a capture file. Other
+    attributes are those of the wrapped port.
+    """
+
+    def __init__(self, port, file_name):
+        self.port = port
+        self.file = open(file_name, 'wb')
+        self.file.write(_HEADER.pack(MAGIC, VERSION, time.time()))
+        self._start = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self.port, name)
+
+    def _record(self, kind, size, data=b''):
+        self.file.write(
+            _RECORD.pack(time.monotonic() - self._start, kind, size))
+        self.file.write(data)
+
+    def read(self, size=1):
+        data = self.port.read(size)
+        self._record(READ, len(data), data)
+        return data
+
+    def write(self, data):
+        res = self.port.write(data)
+        self._record(WRITE, len(data), data)
+        return res
+
+    @property
+    def in_waiting(self):
+        count = getattr(self.port, 'in_waiting', 0)
+        self._record(POLL, count)
+        return count
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+        self.port.close()
+
+
+class _Cursor(object):
+    """
+    Position of the next record of one kind, in the mapped capture.
+    """
+
+    def __init__(self, data, kind):
+        self.data = data
+        self.kind = kind
+        self.pos = _HEADER.size
+
+    def next(self):
+        """
+        Return (time, size, data offset) of the next record of this kind, or
+        None at the end of the capture.
+        """
+        data = self.data
+        end = len(data)
+        pos = self.pos
+        while pos + _RECORD.size <= end:
+            t, kind, size = _RECORD.unpack_from(data, pos)
+            offset = pos + _RECORD.size
+            pos = offset if kind == POLL else offset + size
+            if pos > end:
+                break  # truncated record
+            if kind == self.kind:
+                self.pos = pos
+                return t, size, offset
+        self.pos = end
+        return None
+
+
+class ReplayPort(object):
+    """
+    Serial port replacement, replaying a capture file. See module
+    documentation for additional information.
+    """
+
+    def __init__(self, file_name, speed=None, strict=True):
+        self.speed = speed
+        self.strict = strict
+        with open(file_name, 'rb') as fh:
+            self._data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.start_time = _HEADER.unpack_from(self._data)
+        if magic != MAGIC or version != VERSION:
+            self._data.close()
+            raise ValueError('%s is not a capture file' % file_name)
+        self._reads = _Cursor(self._data, READ)
+        self._writes = _Cursor(self._data, WRITE)
+        self._polls = _Cursor(self._data, POLL)
+        self._pending = b''  # unread data of the last READ record
+        self._origin = time.monotonic()
+
+    def _wait(self, t):
+        if self.speed:
+            delay = self._origin + t / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    def read(self, size=1):
+        chunks = [self._pending[:size]]
+        count = len(chunks[0])
+        self._pending = self._pending[size:]
+        while count < size:
+            rec = self._reads.next()
+            if rec is None:
+                break
+            t, length, offset = rec
+            self._wait(t)
+            take = min(length, size - count)
+            chunks.append(self._data[offset:offset + take])
+            self._pending = self._data[offset + take:offset + length]
+            count += take
+        return b''.join(chunks)
+
+    def write(self, data):
+        rec = self._writes.next()
+        if rec is None:
+            if self.strict:
+                raise ReplayError('write %r after the end of the capture' %
+                                  (data,))
+            return len(data)
+        t, length, offset = rec
+        self._wait(t)
+        if self.strict and self._data[offset:offset + length] != data:
+            raise ReplayError('write %r, captured %r' % (
+                data, self._data[offset:offset + length]))
+        return len(data)
+
+    @property
+    def in_waiting(self):
+        rec = self._polls.next()
+        if rec is None:
+            return 0
+        self._wait(rec[0])
+        return rec[1]
+
+    def reset_input_buffer(self):
+        # the dropped data was never read, so it is not in the capture
+        pass
+
+    @property
+    def exhausted(self):
+        """
+        True when every captured read has been replayed.
+        """
+        if self._pending:
+            return False
+        cursor = _Cursor(self._data, READ)
+        cursor.pos = self._reads.pos
+        return cursor.next() is None
+
+    def close(self):
+        if not self._data.closed:
+            self._data.close()
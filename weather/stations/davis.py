@@ -21,6 +21,7 @@ Date: 2006-03-27
 """
 
 from ._struct import Struct
+from .capture import CapturePort
 from ..units import *
 from .station import *
 
@@ -408,23 +409,40 @@ class VantagePro(Station):
     # archive format type, unknown
     _ARCHIVE_REV_B = None
 
+    # compute the heat index and dew point from precomputed tables
+    # (see weather.units.temp.LookupTable)
+    USE_LOOKUP_TABLES = False
+
+    # LOOP packets requested at once by stream(); the console stops sending
+    # after these, so at most this many packets wait in the serial buffer
+    STREAM_PACKETS = 20
+
     def __init__(
             self,
             device,
             log_interval=5,
             log_start_date=None,
-            clear=False
+            clear=False,
+            capture=None
     ):
         """
         Initialize the serial connection with the console.
-        :param device: /dev/yourConsoleDevice
+        :param device: /dev/yourConsoleDevice, or an open port object (e.g. a
+            weather.stations.capture.ReplayPort)
         :param log_interval: default 5
         :param log_start_date: the datetime.datetime object representing the
             starting log date. Default None aka "all"
         :param clear: boolean, if true clean all the log in the console.
             Default False.
+        :param capture: file name, record the serial traffic to this capture
+            file. Default None.
         """
-        self.port = serial.Serial(device, BAUD, timeout=READ_DELAY)
+        if isinstance(device, str):
+            self.port = serial.Serial(device, BAUD, timeout=READ_DELAY)
+        else:
+            self.port = device
+        if capture:
+            self.port = CapturePort(self.port, capture)
         # set the logging interval to be downloaded. Default all
         if log_start_date is None:
             self._archive_time = (0, 0)
@@ -637,8 +655,8 @@ class VantagePro(Station):
 
         return new_rec
 
-    @staticmethod
-    def _calc_derived_fields(fields):
+    @classmethod
+    def _calc_derived_fields(cls, fields):
         """
         calculates the derived fields (those fields that are calculated)
         """
@@ -647,9 +665,13 @@ class VantagePro(Station):
         hum = fields['HumOut']
         wind_ = fields['WindSpeed']
         wind10min = fields['WindSpeed10Min']
-        fields['HeatIndex'] = calc_heat_index(temp_, hum)
+        if cls.USE_LOOKUP_TABLES:
+            fields['HeatIndex'] = heat_index_table(temp_, hum)
+            fields['DewPoint'] = dewpoint_table(temp_, hum)
+        else:
+            fields['HeatIndex'] = calc_heat_index(temp_, hum)
+            fields['DewPoint'] = calc_dewpoint(temp_, hum)
         fields['WindChill'] = calc_wind_chill(temp_, wind_, wind10min)
-        fields['DewPoint'] = calc_dewpoint(temp_, hum)
         # store current data string
         now = time.localtime()
         fields['DateStamp'] = time.strftime("%Y-%m-%d %H:%M:%S", now)
@@ -681,6 +703,70 @@ class VantagePro(Station):
 
         return self._fields_to_weather_point(self.fields)
 
+    def stream(self, interval: float = None):
+        """
+        Yield a WeatherPoint for every LOOP packet (one every 2 seconds), or
+        at most one every 'interval' seconds. The console sends the packets
+        continuously in bursts of STREAM_PACKETS, instead of one LOOP command
+        per reading. Packets received while the consumer was busy are
+        coalesced: only the newest one is yielded. No archive records are
+        read while streaming, and fields['Archive'] is None.
+        """
+        size = LoopStruct.size
+        remaining = 0  # packets left in the current LOOP burst
+        deadline = time.monotonic()
+        try:
+            while True:
+                if interval:
+                    time.sleep(max(0.0, deadline - time.monotonic()))
+                # coalesce the packets received since the last reading
+                raw = None
+                while remaining and self._in_waiting() >= size:
+                    remaining -= 1
+                    data = self.port.read(size)
+                    if VProCRC.verify(data):
+                        raw = data
+                if raw is None or not remaining:
+                    # the burst ended while the consumer was busy, so the
+                    # packets may be old; start a new one
+                    raw = None
+                    if not remaining:
+                        self._cmd('LOOP', self.STREAM_PACKETS)
+                        remaining = self.STREAM_PACKETS
+                    data = self.port.read(size)
+                    remaining -= 1
+                    if not VProCRC.verify(data):
+                        log.warning('LOOP packet CRC error, restarting')
+                        self._cancel_loop()
+                        remaining = 0
+                        continue
+                    raw = data
+
+                fields = LoopStruct.unpack(raw)
+                fields['Archive'] = None
+                self._calc_derived_fields(fields)
+                self.fields = fields
+                deadline = max(deadline + (interval or 0), time.monotonic())
+                yield self._fields_to_weather_point(fields)
+        finally:
+            if remaining:
+                self._cancel_loop()
+
+    def _in_waiting(self):
+        """
+        return the number of bytes received, but not read yet.
+        """
+        return getattr(self.port, 'in_waiting', 0)
+
+    def _cancel_loop(self):
+        """
+        stop a LOOP command, and drop the packets already received.
+        """
+        self.port.write(b'\n')
+        time.sleep(0.5)
+        if hasattr(self.port, 'reset_input_buffer'):
+            self.port.reset_input_buffer()
+
     @staticmethod
     def _fields_to_weather_point(fields: dict) -> WeatherPoint:
         """Convert VantagePro fields dictionary to WeatherPoint.
@@ -16,23 +16,153 @@ station = NetatmoStation(cliend_id='deadbeef1234567890abcdef',
                          password='correcthorse')
 
 pprint.pprint(station.get_reading())
+
+# every module of every station in the account, from a single API request
+pprint.pprint(station.get_readings())
+
+# measurement history, e.g. to fill the gap of a daemon outage
+for station_name, module_name, points in station.backfill(start, end):
+    store(station_name, module_name, points)
+
+Netatmo modules send a measurement about every 10 minutes. The station and
+module IDs are resolved once, and the API response is cached until the next
+measurement is due: for get_reading(), 'cache_ttl' seconds after the
+'last_message' of its module; for get_readings(), after the oldest
+'last_message' of the modules that are reporting. Modules that are not
+reachable, or that missed STALE measurements (e.g. a rain gauge with a flat
+battery), are ignored. Until then the cached readings are returned without an
+API request. When a measurement is late, the API is polled at most every
+'retry' seconds.
+
+backfill() pages through the measurement history of every module with the
+largest page size the API allows (MAX_MEASURES values), with concurrent
+requests for the different modules. The requests are rate limited to stay
+under the Netatmo API limits.
+
+AsyncNetatmoStation is the asyncio version: the cached readings are returned
+from the event loop, and only the API requests run in an executor. Callers
+that need a new response while a request is in flight wait for that request
+instead of starting another one.
+
+station = AsyncNetatmoStation(...)   # same arguments as NetatmoStation
+point = await station.get_reading()
+async for point in station.stream():
+    ...
 '''
 
+import asyncio
+import concurrent.futures
 import datetime
+import threading
+import time
 
 from weather.stations.station import *
+from weather.units.pressure import mb_to_in32
+from weather.units.temp import calc_dewpoint
+from weather.units.wind import km_hr_to_mph
 
 import pyatmo
 
+MM_PER_INCH = 25.4
+
+# most values returned by one getmeasure request
+MAX_MEASURES = 1024
+# Netatmo API limit: requests per period (seconds), per user
+RATE_LIMIT = (50, 10.0)
+# seconds between rain gauge measurements, used for the first rain rate
+RAIN_INTERVAL = 300
+
+# getmeasure types of each module type, in WeatherPoint order
+MEASURE_TYPES = {
+    'NAMain': ('Temperature', 'Humidity', 'Pressure'),
+    'NAModule1': ('Temperature', 'Humidity'),
+    'NAModule2': ('WindStrength', 'WindAngle'),
+    'NAModule3': ('Rain',),
+    'NAModule4': ('Temperature', 'Humidity'),
+}
+
+
+def _module_point(module):
+    '''Map the dashboard data of any station or module to a WeatherPoint.
+
+    The base station (NAMain) reports indoor temperature, humidity and
+    pressure, the outdoor and indoor modules (NAModule1, NAModule4)
+    temperature and humidity, the rain gauge (NAModule3) rain and the
+    anemometer (NAModule2) wind.
+    '''
+    data = module.get('dashboard_data') or {}
+    last_message = module.get('last_message',
+                              module.get('last_status_store'))
+    point = WeatherPoint(
+        temperature_c=data.get('Temperature'),
+        humidity=data.get('Humidity'),
+        time=datetime.datetime.fromtimestamp(last_message))
+    if point.temperature_f is not None and point.humidity:
+        point.dew_point_f = calc_dewpoint(point.temperature_f,
+                                          point.humidity)
+    if data.get('Pressure') is not None:
+        point.pressure = mb_to_in32(data['Pressure'])
+    if data.get('sum_rain_1') is not None:
+        # rain of the last hour, as a rate per hour
+        point.rain_rate_in = data['sum_rain_1'] / MM_PER_INCH
+    if data.get('sum_rain_24') is not None:
+        point.rain_day_in = data['sum_rain_24'] / MM_PER_INCH
+    if data.get('WindStrength') is not None:
+        point.wind_speed_mph = km_hr_to_mph(data['WindStrength'])
+    if data.get('WindAngle') is not None:
+        point.wind_direction = data['WindAngle']
+    return point
+
+
+def _measure_point(timestamp, types, values, prev_timestamp):
+    '''Map one getmeasure value set to a WeatherPoint.'''
+    data = dict(zip(types, values))
+    if 'Rain' in data and data['Rain'] is not None:
+        # mm since the previous measurement, as a rate per hour
+        interval = timestamp - prev_timestamp if prev_timestamp else \
+            RAIN_INTERVAL
+        data['sum_rain_1'] = data.pop('Rain') * 3600.0 / interval
+    return _module_point({'last_message': timestamp,
+                          'dashboard_data': data})
+
+
+class _RateLimiter(object):
+    '''Allow at most 'count' calls of acquire() per 'period' seconds.'''
+
+    def __init__(self, count, period):
+        self.count = count
+        self.period = period
+        self._calls = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self._calls = [t for t in self._calls
+                               if t > now - self.period]
+                if len(self._calls) < self.count:
+                    self._calls.append(now)
+                    return
+                time.sleep(self._calls[0] + self.period - now)
+
 
 class NetatmoStation(Station):
     '''Netatmo Weather Station support.
 
     Implementes as a relatively thin wrapper on top of pyatmo.
     '''
+    # seconds between two Netatmo measurements
+    CACHE_TTL = 600
+    # seconds between API requests, when a measurement is late
+    RETRY = 60
+    # missed measurements, before a module is no longer waited for
+    STALE = 3
 
     def __init__(self, client_id: str, client_secret: str, username: str,
-                 password: str, module_name: str = 'Outdoor', **kwargs):
+                 password: str, module_name: str = 'Outdoor',
+                 cache_ttl: float = CACHE_TTL, retry: float = RETRY,
+                 **kwargs):
         '''Initialize and auth Netatmo Weatehr station reader.
 
         See module docstring for agrs explanation.
@@ -40,35 +170,271 @@ class NetatmoStation(Station):
         if kwargs:
             raise ValueError("Unknown params: %s" % ",".join(kwargs.keys()))
         self.module_name = module_name
+        self.cache_ttl = float(cache_ttl)
+        self.retry = float(retry)
+        self.api_requests = 0
+        self._station_id = None
+        self._module_id = None
+        self._last_message = None
+        self._point = None
+        self._data = None
+        self._expires = 0.0
+        self._fetched = 0.0
+        self._readings = None
+        self._limiter = _RateLimiter(*RATE_LIMIT)
         self._auth = pyatmo.ClientAuth(
             client_id=client_id,
             client_secret=client_secret,
             username=username,
             password=password)
 
-    def get_reading(self) -> WeatherPoint:
-        '''Return single weather reading.
+    def _fetch(self):
+        '''Return a new WeatherStationData (one API request).'''
+        self.api_requests += 1
+        return pyatmo.WeatherStationData(self._auth)
 
-        Currently only assumes account only has one Netatmo station with
-        one module. Does not support anemometer or rain gauge.
-        '''
-        weatherData = pyatmo.WeatherStationData(self._auth)
+    def _cached_data(self, module=False):
+        '''Return the cached WeatherStationData, or None when it is due; with
+        'module', when the measurement of the 'module_name' module is due.'''
+        if self._data is None or time.time() >= self._due(module):
+            return None
+        return self._data
+
+    def _due(self, module=False):
+        '''Return the time the cached data is due.'''
+        if not module:
+            return self._expires
+        last_message = self._module_data(self._data)['last_message']
+        return max(last_message + self.cache_ttl, self._fetched + self.retry)
+
+    def _set_data(self, weatherData):
+        '''Cache a new WeatherStationData, until the next measurement of the
+        modules that are reporting.'''
+        now = time.time()
+        self._data = weatherData
+        self._fetched = now
+        self._readings = None
+        due = []
+        for station in weatherData.stations.values():
+            for m in [station] + list(station.get('modules', [])):
+                last = m.get('last_message', m.get('last_status_store', 0))
+                if (m.get('reachable', True) and
+                        now < last + self.STALE * self.cache_ttl):
+                    due.append(last + self.cache_ttl)
+        if due:
+            self._expires = max(min(due), now + self.retry)
+        else:
+            self._expires = now + self.cache_ttl
+
+    def _station_data(self, module=False):
+        '''Return the cached WeatherStationData, fetched again when due.'''
+        weatherData = self._cached_data(module)
+        if weatherData is None:
+            weatherData = self._fetch()
+            self._set_data(weatherData)
+        return weatherData
+
+    def _resolve(self, weatherData):
+        '''Find and cache the station and module IDs.'''
         # We assume there is only one station in the account.
         station_id = next(iter(weatherData.stations.values()))['_id']
-        module_id = None
         for module in weatherData.get_modules(station_id).values():
             if module['module_name'] == self.module_name:
-                module_id = module['id']
-                break
-        if module_id is None:
-            raise ValueError(
-                'Module %s not found, found %s' % (
-                    self.module_name,
-                    weatherData.get_module_names(station_id)))
-
-        module_data = weatherData.get_module(module_id)
-
-        return WeatherPoint(
-            temperature_c=module_data['dashboard_data']['Temperature'],
-            humidity=module_data['dashboard_data']['Humidity'],
-            time=datetime.datetime.fromtimestamp(module_data['last_message']))
+                self._station_id = station_id
+                self._module_id = module['id']
+                return
+        raise ValueError(
+            'Module %s not found, found %s' % (
+                self.module_name,
+                weatherData.get_module_names(station_id)))
+
+    def get_reading(self) -> WeatherPoint:
+        '''Return single weather reading.
+
+        Currently only assumes account only has one Netatmo station, and
+        returns the reading of the 'module_name' module. See get_readings()
+        for every station and module.
+        '''
+        return self._module_reading(self._station_data(module=True))
+
+    def _module_data(self, weatherData):
+        '''Return the data of the 'module_name' module.'''
+        if self._module_id is None:
+            self._resolve(weatherData)
+        module_data = weatherData.get_module(self._module_id)
+        if module_data is None:
+            # the module was removed or renamed; resolve it again
+            self._module_id = None
+            self._resolve(weatherData)
+            module_data = weatherData.get_module(self._module_id)
+        return module_data
+
+    def _module_reading(self, weatherData):
+        '''Return the reading of the 'module_name' module.'''
+        module_data = self._module_data(weatherData)
+        last_message = module_data['last_message']
+        if self._point is not None and last_message == self._last_message:
+            return self._point
+
+        self._last_message = last_message
+        self._point = _module_point(module_data)
+        return self._point
+
+    def stream(self, interval: float = None):
+        '''Yield the reading of the 'module_name' module, every time a new
+        measurement arrives. Without 'interval', the API is polled when the
+        next measurement is due.'''
+        if interval is not None:
+            yield from super().stream(interval)
+            return
+        last = None
+        while True:
+            point = self.get_reading()
+            if point is not last:
+                last = point
+                yield point
+            time.sleep(max(0.0, self._due(module=True) - time.time()))
+
+    def get_readings(self) -> dict:
+        '''Return the readings of every station and module in the account.
+
+        Returns a {(station_name, module_name): WeatherPoint} dict; the base
+        station is included with its own module name (usually the indoor
+        module). All readings come from a single API request.
+        '''
+        return self._all_readings(self._station_data())
+
+    def _all_readings(self, weatherData):
+        if self._readings is None:
+            readings = {}
+            for station in weatherData.stations.values():
+                name = station.get('station_name')
+                for module in [station] + list(station.get('modules', [])):
+                    key = (name, module.get('module_name', module['type']))
+                    readings[key] = _module_point(module)
+            self._readings = readings
+        return dict(self._readings)
+
+    def _measures(self, weatherData, station_id, module, begin, end):
+        '''Return one page of (timestamp, values) of a module (one API
+        request).'''
+        self._limiter.acquire()
+        self.api_requests += 1
+        resp = weatherData.get_data(
+            device_id=station_id,
+            scale='max',
+            module_type=','.join(MEASURE_TYPES[module['type']]),
+            module_id=None if module['_id'] == station_id else module['_id'],
+            date_begin=int(begin),
+            date_end=int(end),
+            limit=MAX_MEASURES,
+            optimize=False,
+            real_time=True)
+        return sorted((int(ts), values)
+                      for ts, values in (resp.get('body') or {}).items())
+
+    def backfill(self, start, end, workers: int = 4):
+        '''Generate the measurement history between 'start' and 'end'
+        (datetimes, or seconds since the epoch) of every module.
+
+        Yields (station_name, module_name, [WeatherPoint, ...]) batches, one
+        per API page; the batches of each module are in time order.
+        '''
+        if isinstance(start, datetime.datetime):
+            start = start.timestamp()
+        if isinstance(end, datetime.datetime):
+            end = end.timestamp()
+        weatherData = self._station_data()
+
+        # one paging task per module, run concurrently
+        tasks = []
+        for station in weatherData.stations.values():
+            for module in [station] + list(station.get('modules', [])):
+                if module.get('type') in MEASURE_TYPES:
+                    tasks.append((station, module))
+
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+            def submit(task, begin, prev):
+                future = pool.submit(self._measures, weatherData,
+                                     task[0]['_id'], task[1], begin, end)
+                pending[future] = (task, prev)
+
+            pending = {}
+            for task in tasks:
+                submit(task, start, None)
+            while pending:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    (station, module), prev = pending.pop(future)
+                    page = future.result()
+                    types = MEASURE_TYPES[module['type']]
+                    points = []
+                    for timestamp, values in page:
+                        points.append(
+                            _measure_point(timestamp, types, values, prev))
+                        prev = timestamp
+                    if len(page) == MAX_MEASURES and prev < end:
+                        submit((station, module), prev + 1, prev)
+                    if points:
+                        yield (station.get('station_name'),
+                               module.get('module_name', module['type']),
+                               points)
+
+
+class AsyncNetatmoStation(AsyncStation):
+    '''Netatmo Weather Station support, for asyncio.
+
+    Takes the NetatmoStation arguments, plus an optional 'executor' for the
+    blocking API requests (the loop's default thread pool when None).
+    '''
+
+    def __init__(self, *args, executor=None, **kwargs):
+        self.station = NetatmoStation(*args, **kwargs)
+        self.executor = executor
+        self._fetching = None
+
+    async def _fetch(self):
+        loop = asyncio.get_running_loop()
+        try:
+            weatherData = await loop.run_in_executor(
+                self.executor, self.station._fetch)
+            self.station._set_data(weatherData)
+            return weatherData
+        finally:
+            self._fetching = None
+
+    async def _station_data(self, module=False):
+        weatherData = self.station._cached_data(module)
+        if weatherData is not None:
+            return weatherData
+        if self._fetching is None:
+            self._fetching = asyncio.ensure_future(self._fetch())
+        # a cancelled caller must not cancel the request of the others
+        return await asyncio.shield(self._fetching)
+
+    async def get_reading(self) -> WeatherPoint:
+        '''Return the reading of the 'module_name' module.'''
+        return self.station._module_reading(
+            await self._station_data(module=True))
+
+    async def get_readings(self) -> dict:
+        '''Return the readings of every station and module.'''
+        return self.station._all_readings(await self._station_data())
+
+    async def stream(self, interval: float = None):
+        '''Yield the reading of the 'module_name' module, every time a new
+        measurement arrives. Without 'interval', the API is polled when the
+        next measurement is due.'''
+        if interval is not None:
+            async for point in super().stream(interval):
+                yield point
+            return
+        last = None
+        while True:
+            point = await self.get_reading()
+            if point is not last:
+                last = point
+                yield point
+            await asyncio.sleep(
+                max(0.0, self.station._due(module=True) - time.time()))
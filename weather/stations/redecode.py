@@ -0,0 +1,269 @@
+"""
+Bulk Re-decoder
+
+Abstract:
+Decodes stored raw Davis console data offline, e.g. to re-process years of
+audit files after a decoder change. Input files hold one hex encoded packet
+per line, optionally preceded by a time stamp:
+
+    [time] hex
+
+A line of LoopStruct.size bytes is a LOOP packet, a line of
+DmpPageStruct.size bytes a DMPAFT page of 5 archive records. Every packet is
+CRC verified with VProCRC before it is decoded; lines with a bad CRC, an
+unknown length or invalid hex are reported as errors, with their file
+offset. The time stamp, when present, is parsed into the 'time' field of the
+LOOP fields, as a UTC datetime (archive records have their own date and
+time); it is either seconds since the epoch, or an ISO 8601 date and time
+(e.g. '2021-04-03T10:05:00Z'; without a time zone, UTC is assumed). Lines
+with an invalid time stamp are reported as 'time' errors.
+
+The archive record format (Rev.A or Rev.B) is detected per record from its
+'RecType' field, or forced with 'rev'. Every valid record of a page is
+decoded, including the records before the DMPAFT start offset of the first
+page, so overlapping dumps yield duplicates; SqliteStore drops them.
+
+The files are split into chunks of about 'chunk_size' bytes (at line
+boundaries), and the chunks are decoded in parallel in a
+ProcessPoolExecutor. The decoded chunks are returned in input order; at most
+two chunks per worker are pending at any time, so memory use doesn't grow
+with the input size.
+
+Usage:
+>>> for chunk in decode_files( ['loop.hex', 'dmp.hex'], workers=8 ):
+...     store.add_archive( chunk.archive )
+
+>>> redecode( ['loop.hex'], loop_file='loop.csv', sqlite='weather.db' )
+"""
+
+import collections
+import concurrent.futures
+import datetime
+import itertools
+import logging
+import os
+import struct
+
+from ..units import calc_dewpoint
+from .davis import (ArchiveAStruct, ArchiveBStruct, DmpPageStruct,
+                    LoopStruct, VProCRC)
+from .station import WeatherPoint
+
+log = logging.getLogger(__name__)
+
+__all__ = ['DecodeError', 'Chunk', 'decode_packet', 'decode_files',
+           'redecode']
+
+# default chunk size, in bytes of input
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# records per DMPAFT page
+PAGE_RECORDS = 5
+
+# DateStamp and TimeStamp, at the start of both archive record formats
+_STAMPS = struct.Struct('=HH')
+
+# output columns; fields of packing only (start, end of line, CRC) dropped
+LOOP_COLUMNS = ('time',) + tuple(
+    f for f in LoopStruct.fields if f not in ('LOO', 'EOL', 'CRC'))
+ARCHIVE_COLUMNS = ('Year', 'Month', 'Day', 'Hour', 'Min') + tuple(
+    f for f in ArchiveBStruct.fields if f not in ('DateStamp', 'TimeStamp'))
+
+Chunk = collections.namedtuple(
+    'Chunk', ('file_name', 'offset', 'loop', 'archive', 'errors'))
+
+
+class DecodeError(ValueError):
+    """
+    raised for a packet that can't be decoded; the message is the reason:
+    'crc' or 'length'.
+    """
+
+
+def _page_records(records, rev):
+    res = []
+    for offset in range(0, ArchiveAStruct.size * PAGE_RECORDS,
+                        ArchiveAStruct.size):
+        if 0xffff in _STAMPS.unpack_from(records, offset):
+            continue  # empty record slot
+        rec = ArchiveBStruct.unpack_from(records, offset)
+        if rev == 'A' or (rev is None and rec['RecType'] != 0):
+            rec = ArchiveAStruct.unpack_from(records, offset)
+        res.append(rec)
+    return res
+
+
+def decode_packet(data, rev=None):
+    """
+    Decode a raw LOOP packet or DMPAFT page. Return ('loop', [fields]) or
+    ('archive', [records]); raise DecodeError.
+    """
+    if len(data) not in (LoopStruct.size, DmpPageStruct.size):
+        raise DecodeError('length')
+    if not VProCRC.verify(data):
+        raise DecodeError('crc')
+    if len(data) == LoopStruct.size:
+        return 'loop', [LoopStruct.unpack(data)]
+    return 'archive', _page_records(DmpPageStruct.unpack(data)['Records'],
+                                    rev)
+
+
+def _parse_time(text):
+    """
+    Return the naive UTC datetime of a time stamp; raise ValueError.
+    """
+    try:
+        return datetime.datetime.fromtimestamp(
+            float(text), datetime.timezone.utc).replace(tzinfo=None)
+    except (ValueError, OverflowError, OSError):
+        pass
+    t = datetime.datetime.fromisoformat(text)
+    if t.tzinfo is not None:
+        t = t.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return t
+
+
+def _decode_chunk(file_name, start, end, rev=None):
+    """
+    Decode the lines starting in [start, end) of a file; return a Chunk.
+    """
+    loop, archive, errors = [], [], []
+    with open(file_name, 'rb') as fh:
+        if start:
+            # the line running over 'start' belongs to the previous chunk
+            fh.seek(start - 1)
+            fh.readline()
+        pos = fh.tell()
+        while pos < end:
+            line = fh.readline()
+            if not line:
+                break
+            offset, pos = pos, pos + len(line)
+            parts = line.split()
+            if not parts:
+                continue
+            try:
+                data = bytes.fromhex(parts[-1].decode('ascii'))
+            except ValueError:  # also UnicodeDecodeError
+                errors.append((offset, 'hex'))
+                continue
+            stamp = None
+            if len(parts) > 1:
+                try:
+                    stamp = _parse_time(b' '.join(parts[:-1]).decode())
+                except ValueError:
+                    errors.append((offset, 'time'))
+                    continue
+            try:
+                kind, records = decode_packet(data, rev)
+            except DecodeError as e:
+                errors.append((offset, str(e)))
+                continue
+            if kind == 'archive':
+                archive.extend(records)
+            else:
+                fields = records[0]
+                fields['time'] = stamp
+                loop.append(fields)
+    return Chunk(file_name, start, loop, archive, errors)
+
+
+def _chunks(file_names, chunk_size):
+    for file_name in file_names:
+        size = os.path.getsize(file_name)
+        for start in range(0, size, chunk_size):
+            yield file_name, start, min(start + chunk_size, size)
+
+
+def decode_files(file_names, workers=None, chunk_size=CHUNK_SIZE, rev=None):
+    """
+    Decode raw packet files; yield a Chunk for every 'chunk_size' bytes of
+    input, in input order. 'workers' is the number of processes (defaults to
+    the number of CPUs); 1 decodes in this process. See module documentation
+    for additional information.
+    """
+    tasks = _chunks(file_names, chunk_size)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for task in tasks:
+            yield _decode_chunk(*task, rev=rev)
+        return
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        pending = collections.deque(
+            executor.submit(_decode_chunk, *task, rev=rev)
+            for task in itertools.islice(tasks, workers * 2))
+        while pending:
+            chunk = pending.popleft().result()
+            task = next(tasks, None)
+            if task is not None:
+                pending.append(executor.submit(_decode_chunk, *task, rev=rev))
+            yield chunk
+
+
+def _loop_point(fields):
+    """
+    Return the WeatherPoint of the decoded LOOP fields.
+    """
+    return WeatherPoint(
+        time=fields['time'],
+        temperature_f=fields['TempOut'],
+        pressure=fields['Pressure'],
+        dew_point_f=calc_dewpoint(fields['TempOut'], fields['HumOut']),
+        humidity=fields['HumOut'],
+        rain_rate_in=fields['RainRate'],
+        rain_day_in=fields['RainDay'],
+        wind_speed_mph=fields['WindSpeed10Min'],
+        wind_direction=fields['WindDir'],
+    )
+
+
+def _history(file_name, columns):
+    from ..services.history import HistoryFile
+    fmt = 'csv' if file_name.endswith('.csv') else 'jsonl'
+    return HistoryFile(file_name, fmt, columns, flush_interval=float('inf'))
+
+
+def redecode(file_names, loop_file=None, archive_file=None, sqlite=None,
+             station='default', workers=None, chunk_size=CHUNK_SIZE,
+             rev=None):
+    """
+    Decode raw packet files (see decode_files()), and append the results in
+    input order to:
+
+        loop_file      the LOOP fields, as CSV ('.csv') or JSON Lines
+        archive_file   the archive records, as CSV ('.csv') or JSON Lines
+        sqlite         a SqliteStore database, for 'station'; LOOP packets
+                       are only stored with a time stamp
+
+    Return a Counter of the decoded 'loop' packets, 'archive' records and
+    errors (by reason).
+    """
+    from ..services.sqlite import SqliteStore
+    loop_out = loop_file and _history(loop_file, LOOP_COLUMNS)
+    archive_out = archive_file and _history(archive_file, ARCHIVE_COLUMNS)
+    store = sqlite and SqliteStore(sqlite, station)
+    counts = collections.Counter()
+    try:
+        for chunk in decode_files(file_names, workers, chunk_size, rev):
+            counts['loop'] += len(chunk.loop)
+            counts['archive'] += len(chunk.archive)
+            for offset, reason in chunk.errors:
+                log.warning('%s, offset %d: %s error' %
+                            (chunk.file_name, offset, reason))
+                counts[reason] += 1
+            if loop_out:
+                for fields in chunk.loop:
+                    loop_out.add(fields)
+            if archive_out:
+                for rec in chunk.archive:
+                    archive_out.add(rec)
+            if store:
+                for fields in chunk.loop:
+                    if fields['time']:
+                        store.add_point(_loop_point(fields))
+                store.add_archive(chunk.archive)
+    finally:
+        for out in (loop_out, archive_out, store):
+            if out:
+                out.close()
+    return counts
@@ -0,0 +1,204 @@
+"""
+Shared Memory Reading Segment
+
+Abstract:
+Allows the latest Davis LOOP reading to be shared with other processes on the
+same host, without each process opening its own connection to the console.
+One process (e.g. the publication daemon) owns the station and writes every
+new reading into a named multiprocessing.shared_memory block with
+SharedMemoryWriter. Any number of local processes read it with
+SharedMemoryStation, which implements the common Station interface.
+
+The block has a fixed binary layout:
+
+    magic     4s   b'PYWX'
+    version   H    layout version
+    count     H    number of fields
+    seq       Q    sequence counter
+    time      d    UTC time of the reading (seconds since the epoch)
+    fields    d    one double per SHM_FIELDS entry, NaN when missing
+
+SHM_FIELDS holds the numeric LOOP fields, in LoopStruct order, followed by the
+derived fields. The writer uses a seqlock: 'seq' is odd while the fields are
+being written, and is incremented again once the write is complete. Readers
+copy the fields and retry if 'seq' was odd or changed during the copy, so
+they never see a partial reading and never take a lock.
+
+SharedMemoryStation.read() returns the raw (seq, time, values) tuple, and
+costs one or two microseconds. get_reading() also builds a WeatherPoint (NaN
+fields become None), which takes about 10 microseconds; use read() in tight
+loops.
+
+A writer fails with FileExistsError if the block already exists, as it may
+belong to another running writer; pass reuse=True to take over a block left
+over from a previous run.
+
+Usage:
+>>> writer = SharedMemoryWriter( 'pyweather' )       # daemon process
+>>> writer.update( vantage_pro.fields )
+
+>>> station = SharedMemoryStation( 'pyweather' )     # reader process
+>>> point = station.get_reading()
+"""
+
+import datetime as dt
+import struct
+import time
+from multiprocessing import shared_memory
+
+from .davis import LoopStruct, NoDeviceException
+from .station import *
+
+__all__ = ['SHM_FIELDS', 'SharedMemoryWriter', 'SharedMemoryStation']
+
+MAGIC = b'PYWX'
+VERSION = 1
+
+# LOOP fields that are not stored as numbers after unpacking
+_NON_NUMERIC = ('StormStartDate', 'SunRise', 'SunSet', 'CRC')
+
+SHM_FIELDS = tuple(
+    name for name, fmt in LoopStruct.FMT
+    if fmt in ('B', 'H') and name not in _NON_NUMERIC
+) + ('HeatIndex', 'WindChill', 'DewPoint')
+
+_HEADER = struct.Struct('=4sHHQd')
+_SEQ = struct.Struct('=Q')
+_SEQ_OFFSET = 8
+_DATA = struct.Struct('=%dd' % len(SHM_FIELDS))
+_DATA_OFFSET = _HEADER.size
+_TIME = struct.Struct('=d')
+_TIME_OFFSET = 16
+_NAN = float('nan')
+
+SIZE = _HEADER.size + _DATA.size
+
+# blocks created by the writers of this process; see _attach()
+_created = set()
+
+
+class SharedMemoryWriter(object):
+    """
+    Publishes the latest station fields into a named shared memory block.
+    """
+
+    def __init__(self, name='pyweather', reuse=False):
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=SIZE)
+        except FileExistsError:
+            if not reuse:
+                raise
+            # left over from a previous run
+            self.shm = shared_memory.SharedMemory(name)
+            if self.shm.size < SIZE:
+                raise ValueError('shared memory block %s is too small' % name)
+        _created.add(name)
+        self.name = name
+        self._seq = 0
+        _HEADER.pack_into(
+            self.shm.buf, 0, MAGIC, VERSION, len(SHM_FIELDS), 0, 0.0)
+
+    def update(self, fields, timestamp=None):
+        """
+        Write a new reading, given a VantagePro.fields style dict.
+        """
+        values = [fields.get(f) for f in SHM_FIELDS]
+        data = _DATA.pack(*(_NAN if v is None else v for v in values))
+        buf = self.shm.buf
+        self._seq += 1  # odd, write in progress
+        _SEQ.pack_into(buf, _SEQ_OFFSET, self._seq)
+        _TIME.pack_into(buf, _TIME_OFFSET,
+                        time.time() if timestamp is None else timestamp)
+        buf[_DATA_OFFSET:_DATA_OFFSET + _DATA.size] = data
+        self._seq += 1  # even, write complete
+        _SEQ.pack_into(buf, _SEQ_OFFSET, self._seq)
+
+    def close(self, unlink=True):
+        """
+        Detach from the block, and remove it unless 'unlink' is False.
+        """
+        self.shm.close()
+        _created.discard(self.name)
+        if unlink:
+            self.shm.unlink()
+
+
+def _attach(name):
+    """
+    Attach to an existing block, without registering it with the resource
+    tracker (which would remove the block when this process exits). A block
+    created by a writer of this process stays registered, for its unlink().
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:  # Python < 3.13
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name)
+        if name not in _created:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class SharedMemoryStation(Station):
+    """
+    Reads the latest reading published by a SharedMemoryWriter.
+    """
+
+    def __init__(self, name='pyweather', retries=1000):
+        try:
+            self.shm = _attach(name)
+        except FileNotFoundError:
+            raise NoDeviceException('No shared memory block: %s' % name)
+        self.retries = retries
+        self._buf = self.shm.buf
+        magic, version, count, _, _ = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION or count != len(SHM_FIELDS):
+            raise ValueError('Incompatible shared memory block: %s' % name)
+
+    def read(self):
+        """
+        Return a consistent (seq, time, values) snapshot, where 'values' is
+        ordered as SHM_FIELDS. 'seq' is 0 until the first reading is written.
+        """
+        buf = self._buf
+        for i in range(self.retries):
+            seq = _SEQ.unpack_from(buf, _SEQ_OFFSET)[0]
+            if seq & 1:
+                continue
+            timestamp = _TIME.unpack_from(buf, _TIME_OFFSET)[0]
+            values = _DATA.unpack_from(buf, _DATA_OFFSET)
+            if _SEQ.unpack_from(buf, _SEQ_OFFSET)[0] == seq:
+                return seq, timestamp, values
+        raise NoDeviceException('Shared memory block is not updating')
+
+    def read_fields(self) -> dict:
+        """
+        Return the latest reading as a dict of SHM_FIELDS values (NaN when
+        missing).
+        """
+        seq, timestamp, values = self.read()
+        return dict(zip(SHM_FIELDS, values))
+
+    def get_reading(self) -> WeatherPoint:
+        """Return the latest weather reading; missing fields are None."""
+        seq, timestamp, values = self.read()
+        if not seq:
+            raise NoDeviceException('No reading has been published')
+        fields = {name: None if v != v else v
+                  for name, v in zip(SHM_FIELDS, values)}
+        return WeatherPoint(
+            temperature_f=fields['TempOut'],
+            pressure=fields['Pressure'],
+            dew_point_f=fields['DewPoint'],
+            humidity=fields['HumOut'],
+            rain_rate_in=fields['RainRate'],
+            rain_day_in=fields['RainDay'],
+            time=dt.datetime.fromtimestamp(
+                timestamp, dt.timezone.utc).replace(tzinfo=None),
+            wind_speed_mph=fields['WindSpeed10Min'],
+            wind_direction=fields['WindDir'],
+        )
+
+    def close(self):
+        self._buf.release()
+        self.shm.close()
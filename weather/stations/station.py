@@ -1,17 +1,25 @@
 """Base class for all Weather Station implementations."""
 
+import asyncio
 import datetime
+import threading
 import time as time_module
 
 from ..units.temp import fahrenheit_to_celsius, celsius_to_fahrenheit
 
-__all__ = ['WeatherPoint', 'Station']
+__all__ = ['WeatherPoint', 'Station', 'CachedStation', 'AsyncStation',
+           'ExecutorStation']
 
 
 class WeatherPoint:
     """
     Represents a single weather measurement.
     """
+    # public fields, in a stable order
+    FIELDS = ('time', 'temperature_f', 'humidity', 'dew_point_f', 'pressure',
+              'rain_rate_in', 'rain_day_in', 'wind_speed_mph',
+              'wind_direction')
+
     time: datetime.datetime = None
 
     _temperature_c: float = None  # Temperature in Celsius
@@ -78,6 +86,10 @@ class WeatherPoint:
         self._temperature_f = None
         self._temperature_c = value
 
+    def to_dict(self) -> dict:
+        """Return the public fields as a dict, ordered as in FIELDS."""
+        return {name: getattr(self, name) for name in self.FIELDS}
+
     def __eq__(self, other):
         return (
             self.time == other.time and
@@ -98,7 +110,133 @@ class WeatherPoint:
 
 class Station:
     """Base class for all Weather Station implementations."""
+    # default seconds between readings of stream()
+    INTERVAL = 60
+
+    def get_reading(self) -> WeatherPoint:
+        """Returns a single weather point."""
+        raise NotImplementedError('Not implemented')
+
+    def stream(self, interval: float = None):
+        """Yields weather points, at most one every 'interval' seconds.
+
+        A reading is only taken when the consumer asks for the next point, so
+        a slow consumer gets the newest reading instead of a backlog.
+        """
+        interval = self.INTERVAL if interval is None else interval
+        deadline = time_module.monotonic()
+        while True:
+            yield self.get_reading()
+            now = time_module.monotonic()
+            deadline = max(deadline + interval, now)
+            time_module.sleep(deadline - now)
+
+
+class _Flight:
+    """A reading in progress, shared by the callers waiting for it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.point = None
+        self.error = None
+
+
+class CachedStation(Station):
+    """Read-through cache of the readings of another Station.
+
+    Readings younger than 'ttl' seconds are returned from the cache. When a
+    new reading is needed, only one caller reads the station; concurrent
+    callers wait for that reading instead of starting their own. 'hits'
+    counts the readings served from the cache (or a shared read), 'misses'
+    the readings of the station.
+    """
+
+    def __init__(self, station: Station, ttl: float = 2.0):
+        self.station = station
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._point = None
+        self._time = None
+        self._flight = None
+        self._lock = threading.Lock()
 
     def get_reading(self) -> WeatherPoint:
+        leader = False
+        with self._lock:
+            if (self._point is not None and
+                    time_module.monotonic() - self._time < self.ttl):
+                self.hits += 1
+                return self._point
+            flight = self._flight
+            if flight is not None:
+                self.hits += 1
+            else:
+                flight = self._flight = _Flight()
+                self.misses += 1
+                leader = True
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.point
+
+        try:
+            flight.point = self.station.get_reading()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    self._point = flight.point
+                    self._time = time_module.monotonic()
+                self._flight = None
+            flight.done.set()
+        return flight.point
+
+
+class AsyncStation:
+    """Base class for asyncio Weather Station implementations.
+
+    Many async stations can be polled concurrently from a single event loop.
+    """
+    # default seconds between readings of stream()
+    INTERVAL = 60
+
+    async def get_reading(self) -> WeatherPoint:
         """Returns a single weather point."""
         raise NotImplementedError('Not implemented')
+
+    async def stream(self, interval: float = None):
+        """Yields a weather point every 'interval' seconds."""
+        interval = self.INTERVAL if interval is None else interval
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            yield await self.get_reading()
+            now = loop.time()
+            deadline = max(deadline + interval, now)
+            await asyncio.sleep(deadline - now)
+
+
+class ExecutorStation(AsyncStation):
+    """Runs a blocking Station in an executor (the loop's default thread pool
+    when 'executor' is None), so it doesn't block the event loop.
+
+    The readings of the station are serialized; readings of different
+    stations run concurrently.
+    """
+
+    def __init__(self, station: Station, executor=None):
+        self.station = station
+        self.executor = executor
+        self._lock = None
+
+    async def get_reading(self) -> WeatherPoint:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, self.station.get_reading)
@@ -0,0 +1,72 @@
+'''
+Local stand-in for the parts of the pyatmo client used by the netatmo module.
+The tests set STATIONS to the raw station payload returned by the API.
+'''
+
+import copy
+import threading
+
+# raw station payload, as returned by the getstationsdata API
+STATIONS = []
+# measurement history, {module_id: [(timestamp, [value, ...]), ...]}
+MEASURES = {}
+# number of getstationsdata requests
+requests = 0
+# getmeasure requests, as dicts of the request arguments
+measure_requests = []
+_lock = threading.Lock()
+
+
+def reset(stations, measures=None):
+    global STATIONS, MEASURES, requests
+    STATIONS = stations
+    MEASURES = measures or {}
+    requests = 0
+    del measure_requests[:]
+
+
+class ClientAuth(object):
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+class WeatherStationData(object):
+
+    def __init__(self, auth):
+        global requests
+        requests += 1
+        self.auth = auth
+        self.stations = {s['_id']: copy.deepcopy(s) for s in STATIONS}
+        self.modules = {}
+        for station in self.stations.values():
+            for module in station.get('modules', []):
+                self.modules[module['_id']] = module
+
+    def get_modules(self, station_id):
+        station = self.stations[station_id]
+        return {m['_id']: {'id': m['_id'],
+                           'module_name': m['module_name'],
+                           'station_name': station['station_name']}
+                for m in station.get('modules', [])}
+
+    def get_module(self, module_id):
+        return self.modules.get(module_id)
+
+    def get_module_names(self, station_id):
+        return [m['module_name']
+                for m in self.stations[station_id].get('modules', [])]
+
+    def get_data(self, device_id, scale, module_type, module_id=None,
+                 date_begin=None, date_end=None, limit=None, optimize=False,
+                 real_time=False):
+        with _lock:
+            measure_requests.append(dict(
+                device_id=device_id, module_id=module_id,
+                module_type=module_type, date_begin=date_begin,
+                date_end=date_end, limit=limit))
+        history = MEASURES.get(module_id or device_id, [])
+        page = [(ts, values) for ts, values in history
+                if date_begin <= ts <= date_end][:limit]
+        return {'status': 'ok',
+                'body': {str(ts): values for ts, values in page}}
@@ -0,0 +1,152 @@
+'''Tests for the serial capture and replay ports.'''
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from .. import capture, davis
+from ..capture import CapturePort, ReplayError, ReplayPort
+from ..davis import VantagePro
+from .test_stream import LoopPort
+
+
+class ScriptPort(object):
+    '''
+    Serial port replacement, returning a fixed reply to every read.
+    '''
+
+    def __init__(self, data):
+        self.data = data
+        self.written = []
+
+    def read(self, size):
+        data, self.data = self.data[:size], self.data[size:]
+        return data
+
+    def write(self, data):
+        self.written.append(data)
+        return len(data)
+
+    def close(self):
+        pass
+
+
+def _vantage_pro(port):
+    vp = VantagePro.__new__(VantagePro)
+    vp.port = port
+    vp.fields = {}
+    return vp
+
+
+class CaptureReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.file_name = os.path.join(self.dir, 'console.cap')
+        patcher = mock.patch.object(davis.time, 'sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _capture(self, data):
+        port = CapturePort(ScriptPort(data), self.file_name)
+        port.write(b'LOOP 1 \n')
+        port.read(3)
+        port.read(4)
+        port.close()
+        return port
+
+    def test_read_write(self):
+        self._capture(b'\x06abcdef')
+        port = ReplayPort(self.file_name)
+        self.assertEqual(port.write(b'LOOP 1 \n'), 8)
+        # reads are not bound to the captured read sizes
+        self.assertEqual(port.read(2), b'\x06a')
+        self.assertFalse(port.exhausted)
+        self.assertEqual(port.read(10), b'bcdef')
+        self.assertTrue(port.exhausted)
+        self.assertEqual(port.read(1), b'')
+        port.close()
+
+    def test_strict(self):
+        self._capture(b'\x06abcdef')
+        port = ReplayPort(self.file_name)
+        with self.assertRaises(ReplayError):
+            port.write(b'LOOP 2 \n')
+        port = ReplayPort(self.file_name)
+        port.write(b'LOOP 1 \n')
+        with self.assertRaises(ReplayError):
+            port.write(b'\n')
+        port = ReplayPort(self.file_name, strict=False)
+        port.write(b'LOOP 2 \n')
+        port.write(b'\n')
+        self.assertEqual(port.read(7), b'\x06abcdef')
+
+    def test_truncated(self):
+        self._capture(b'\x06abcdef')
+        with open(self.file_name, 'r+b') as fh:
+            fh.truncate(os.path.getsize(self.file_name) - 1)
+        port = ReplayPort(self.file_name)
+        self.assertEqual(port.read(10), b'\x06ab')
+
+    def test_not_a_capture(self):
+        with open(self.file_name, 'wb') as fh:
+            fh.write(b'\0' * 64)
+        with self.assertRaises(ValueError):
+            ReplayPort(self.file_name)
+
+    def test_speed(self):
+        self._capture(b'\x06abcdef')
+        with open(self.file_name, 'r+b') as fh:
+            data = bytearray(fh.read())
+        # set the record times to 0, 2 and 4 seconds
+        pos = capture._HEADER.size
+        for i, size in enumerate((8, 3, 4)):
+            capture._RECORD.pack_into(data, pos, i * 2.0,
+                                      (capture.WRITE, capture.READ,
+                                       capture.READ)[i], size)
+            pos += capture._RECORD.size + size
+        with open(self.file_name, 'wb') as fh:
+            fh.write(data)
+
+        clock = [100.0]
+        with mock.patch.object(capture.time, 'monotonic',
+                               side_effect=lambda: clock[0]), \
+                mock.patch.object(capture.time, 'sleep') as sleep:
+            port = ReplayPort(self.file_name, speed=2.0)
+            port.write(b'LOOP 1 \n')
+            clock[0] += 0.5
+            port.read(7)
+        self.assertEqual([c[0][0] for c in sleep.call_args_list], [0.5, 1.5])
+
+    def test_vantage_pro(self):
+        reply = b'\n\r' + b'\n\rOK\n\r'
+        vp = VantagePro(ScriptPort(reply), capture=self.file_name)
+        vp.port.close()
+        self.assertIsInstance(vp.port, CapturePort)
+        vp = VantagePro(ReplayPort(self.file_name))
+        self.assertTrue(vp.port.exhausted)
+
+    def test_stream(self):
+        # the replayed stream takes the same code path (polls included)
+        vp = _vantage_pro(CapturePort(LoopPort(), self.file_name))
+        stream = vp.stream()
+        temps = [next(stream).temperature_f]
+        vp.port.port.send(5)
+        temps.append(next(stream).temperature_f)
+        stream.close()
+        vp.port.close()
+        self.assertEqual(temps, [1.0, 6.0])
+
+        vp = _vantage_pro(ReplayPort(self.file_name))
+        stream = vp.stream()
+        self.assertEqual([next(stream).temperature_f for i in range(2)],
+                         temps)
+        stream.close()
+        self.assertTrue(vp.port.exhausted)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+'''Tests for the netatmo module, using a local fake of the pyatmo client.'''
+
+import asyncio
+import sys
+import time
+import unittest
+from unittest import mock
+
+from . import fake_pyatmo
+
+with mock.patch.dict(sys.modules, {'pyatmo': fake_pyatmo}):
+    from .. import netatmo
+
+T0 = 1617444000  # 2021-04-03 10:00 UTC
+
+
+def _outdoor(last_message=T0, temp=12.5, hum=70, id='02:00:00:00:00:01'):
+    return {'_id': id, 'type': 'NAModule1',
+            'module_name': 'Outdoor', 'last_message': last_message,
+            'dashboard_data': {'Temperature': temp, 'Humidity': hum}}
+
+
+def _rain(last_message=T0):
+    return {'_id': '05:00:00:00:00:01', 'type': 'NAModule3',
+            'module_name': 'Rain', 'last_message': last_message,
+            'dashboard_data': {'Rain': 0.101, 'sum_rain_1': 2.54,
+                               'sum_rain_24': 12.7}}
+
+
+def _wind(last_message=T0):
+    return {'_id': '06:00:00:00:00:01', 'type': 'NAModule2',
+            'module_name': 'Wind', 'last_message': last_message,
+            'dashboard_data': {'WindStrength': 16, 'WindAngle': 225,
+                               'GustStrength': 30, 'GustAngle': 230}}
+
+
+def _station(*modules, **kw):
+    return {'_id': kw.get('id', '70:ee:50:00:00:01'), 'type': 'NAMain',
+            'station_name': kw.get('name', 'Home'), 'module_name': 'Indoor',
+            'last_status_store': T0,
+            'dashboard_data': {'Temperature': 21.0, 'Humidity': 45,
+                               'Pressure': 1013.2},
+            'modules': list(modules)}
+
+
+class NetatmoStationTest(unittest.TestCase):
+
+    def setUp(self):
+        fake_pyatmo.reset([_station(_outdoor())])
+        patcher = mock.patch.object(netatmo.time, 'time')
+        self.time = patcher.start()
+        self.time.return_value = T0 + 30
+        self.addCleanup(patcher.stop)
+        self.station = netatmo.NetatmoStation('id', 'secret', 'user', 'pw')
+
+    def test_reading(self):
+        point = self.station.get_reading()
+        self.assertEqual(point.temperature_c, 12.5)
+        self.assertEqual(point.humidity, 70)
+        self.assertEqual(point.time.timestamp(), T0)
+
+    def test_cached_until_next_measurement(self):
+        point = self.station.get_reading()
+        self.time.return_value = T0 + 599
+        self.assertIs(self.station.get_reading(), point)
+        self.assertEqual(fake_pyatmo.requests, 1)
+
+        # due, but nothing new yet: one request, same reading
+        self.time.return_value = T0 + 600
+        self.assertIs(self.station.get_reading(), point)
+        self.assertEqual(fake_pyatmo.requests, 2)
+        # late measurements are polled every 'retry' seconds
+        self.time.return_value = T0 + 630
+        self.station.get_reading()
+        self.assertEqual(fake_pyatmo.requests, 2)
+
+        fake_pyatmo.reset([_station(_outdoor(T0 + 650, temp=13.0))])
+        self.time.return_value = T0 + 660
+        point = self.station.get_reading()
+        self.assertEqual(point.temperature_c, 13.0)
+        self.assertEqual(fake_pyatmo.requests, 1)
+
+    def test_stale_module(self):
+        # a dead rain gauge and an unreachable wind module don't pin the
+        # cache to the retry interval
+        wind = _wind()
+        wind['reachable'] = False
+        fake_pyatmo.reset([_station(_outdoor(), _rain(T0 - 86400), wind)])
+        self.station.get_reading()
+        self.station.get_readings()
+        self.time.return_value = T0 + 599
+        self.station.get_reading()
+        self.station.get_readings()
+        self.assertEqual(fake_pyatmo.requests, 1)
+
+    def test_module_expiry(self):
+        # get_reading() waits for its own module, get_readings() for the
+        # oldest reporting one
+        fake_pyatmo.reset([_station(_outdoor(T0 + 20), _rain(T0 - 300))])
+        self.station.get_reading()
+        self.time.return_value = T0 + 400
+        self.station.get_reading()
+        self.assertEqual(fake_pyatmo.requests, 1)
+        self.station.get_readings()
+        self.assertEqual(fake_pyatmo.requests, 2)
+
+    def test_readings(self):
+        fake_pyatmo.reset([
+            _station(_outdoor(), _rain(), _wind()),
+            _station(_outdoor(temp=3.0, id='02:00:00:00:00:02'),
+                     id='70:ee:50:00:00:02',
+                     name='Cabin')])
+        readings = self.station.get_readings()
+        self.assertEqual(fake_pyatmo.requests, 1)
+        self.assertEqual(sorted(readings), [
+            ('Cabin', 'Indoor'), ('Cabin', 'Outdoor'), ('Home', 'Indoor'),
+            ('Home', 'Outdoor'), ('Home', 'Rain'), ('Home', 'Wind')])
+
+        indoor = readings[('Home', 'Indoor')]
+        self.assertEqual(indoor.temperature_c, 21.0)
+        self.assertAlmostEqual(indoor.pressure, 29.9198, 4)
+        self.assertIsNotNone(indoor.dew_point_f)
+        self.assertEqual(readings[('Cabin', 'Outdoor')].temperature_c, 3.0)
+        rain = readings[('Home', 'Rain')]
+        self.assertAlmostEqual(rain.rain_rate_in, 0.1)
+        self.assertAlmostEqual(rain.rain_day_in, 0.5)
+        self.assertIsNone(rain.temperature_f)
+        wind = readings[('Home', 'Wind')]
+        self.assertAlmostEqual(wind.wind_speed_mph, 9.942, 3)
+        self.assertEqual(wind.wind_direction, 225)
+
+        # get_reading() shares the same API response
+        self.assertEqual(self.station.get_reading().temperature_c, 12.5)
+        self.assertEqual(fake_pyatmo.requests, 1)
+
+    def test_backfill(self):
+        start = T0 - 86400
+        outdoor = [(t, [10.0 + i % 10, 60]) for i, t in
+                   enumerate(range(start, T0, 300))]
+        rain = [(t, [0.254]) for t in range(start, T0, 300)]
+        fake_pyatmo.reset(
+            [_station(_outdoor(), _rain(), _wind())],
+            {'02:00:00:00:00:01': outdoor, '05:00:00:00:00:01': rain})
+        batches = list(self.station.backfill(start, T0))
+
+        points = {}
+        for station_name, module_name, batch in batches:
+            self.assertEqual(station_name, 'Home')
+            points.setdefault(module_name, []).extend(batch)
+        self.assertEqual(sorted(points), ['Outdoor', 'Rain'])
+        self.assertEqual([p.time.timestamp() for p in points['Outdoor']],
+                         [t for t, _ in outdoor])
+        self.assertEqual(points['Outdoor'][3].temperature_c, 13.0)
+        for p in points['Rain']:
+            self.assertAlmostEqual(p.rain_rate_in, 0.12)
+
+        # 288 values per module fit in one page; the indoor and wind
+        # modules have no history
+        self.assertEqual(len(fake_pyatmo.measure_requests), 4)
+        for req in fake_pyatmo.measure_requests:
+            self.assertEqual(req['limit'], netatmo.MAX_MEASURES)
+        indoor, = [r for r in fake_pyatmo.measure_requests
+                   if r['module_id'] is None]
+        self.assertEqual(indoor['module_type'],
+                         'Temperature,Humidity,Pressure')
+
+    def test_backfill_paging(self):
+        start = T0 - 7 * 86400
+        outdoor = [(t, [10.0, 60]) for t in range(start, T0, 300)]
+        fake_pyatmo.reset([_station(_outdoor())],
+                          {'02:00:00:00:00:01': outdoor})
+        with mock.patch.object(netatmo, 'MAX_MEASURES', 500):
+            batches = list(self.station.backfill(start, T0))
+        times = [p.time.timestamp() for _, module_name, batch in batches
+                 if module_name == 'Outdoor' for p in batch]
+        self.assertEqual(times, [t for t, _ in outdoor])
+        self.assertEqual([len(b) for _, name, b in batches
+                          if name == 'Outdoor'], [500] * 4 + [16])
+
+    def test_rate_limit(self):
+        limiter = netatmo._RateLimiter(2, 10.0)
+        with mock.patch.object(netatmo.time, 'sleep') as sleep, \
+                mock.patch.object(netatmo.time, 'monotonic',
+                                  side_effect=[0.0, 1.0, 2.0, 10.5]):
+            for i in range(3):
+                limiter.acquire()
+        sleep.assert_called_once_with(8.0)
+
+    def test_async_single_request(self):
+        station = netatmo.AsyncNetatmoStation('id', 'secret', 'user', 'pw')
+
+        async def main():
+            return await asyncio.gather(
+                station.get_reading(), station.get_reading(),
+                station.get_readings())
+
+        point, other, readings = asyncio.run(main())
+        self.assertIs(point, other)
+        self.assertEqual(point.temperature_c, 12.5)
+        self.assertIn(('Home', 'Indoor'), readings)
+        self.assertEqual(fake_pyatmo.requests, 1)
+
+    def test_async_does_not_block_loop(self):
+        def slow(auth):
+            time.sleep(0.2)
+            return real(auth)
+        real = fake_pyatmo.WeatherStationData
+        station = netatmo.AsyncNetatmoStation('id', 'secret', 'user', 'pw')
+
+        async def main():
+            # the loop keeps running while the API request is in flight
+            task = asyncio.ensure_future(station.get_reading())
+            ticks = 0
+            while not task.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+            await task
+            return ticks
+
+        with mock.patch.object(fake_pyatmo, 'WeatherStationData', slow):
+            self.assertGreater(asyncio.run(main()), 5)
+
+    def test_stream(self):
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            self.time.return_value += seconds
+            if len(sleeps) == 2:
+                # the next measurement arrives late
+                fake_pyatmo.STATIONS = [_station(_outdoor(T0 + 640, 14.0))]
+
+        with mock.patch.object(netatmo.time, 'sleep', side_effect=sleep):
+            stream = self.station.stream()
+            self.assertEqual(next(stream).temperature_c, 12.5)
+            self.assertEqual(next(stream).temperature_c, 14.0)
+        self.assertEqual(sleeps, [570, 60])
+        self.assertEqual(fake_pyatmo.requests, 3)
+
+    def test_module_not_found(self):
+        station = netatmo.NetatmoStation('id', 'secret', 'user', 'pw',
+                                         module_name='Garden')
+        self.assertRaises(ValueError, station.get_reading)
+
+    def test_unknown_param(self):
+        self.assertRaises(ValueError, netatmo.NetatmoStation,
+                          'id', 'secret', 'user', 'pw', foo=1)
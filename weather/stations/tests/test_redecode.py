@@ -0,0 +1,132 @@
+'''Tests for the bulk re-decoder.'''
+
+import datetime
+import json
+import os
+import struct
+import tempfile
+import unittest
+
+from ...services.sqlite import SqliteStore
+from ..davis import ArchiveBStruct, VantagePro, VProCRC
+from ..redecode import DecodeError, decode_files, decode_packet, redecode
+from .test_stream import _packet
+
+
+def _archive_record(i):
+    when = datetime.datetime(2021, 4, 3) + datetime.timedelta(minutes=5 * i)
+    vals = []
+    for name, fmt in ArchiveBStruct.FMT:
+        if fmt.endswith('s'):
+            vals.append(b'\x00' * int(fmt[:-1]))
+        elif name == 'DateStamp':
+            vals.append(VantagePro.calcDateStamp(when))
+        elif name == 'TimeStamp':
+            vals.append(VantagePro.calcTimeStamp(when))
+        elif name == 'RecType':
+            vals.append(0)
+        elif name == 'TempOut':
+            vals.append(700 + i)
+        else:
+            vals.append(1)
+    return ArchiveBStruct.pack(*vals)
+
+
+def _page(index, records=5):
+    data = b''.join(_archive_record(index * 5 + r) for r in range(records))
+    data += b'\xff' * (260 - len(data))  # unused record slots
+    data = struct.pack('=B260s4B', index, data, 0, 0, 0, 0)
+    return data + struct.pack('>H', VProCRC.get(data))
+
+
+class RedecodeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.input = self._path('raw.hex')
+        with open(self.input, 'w') as fh:
+            for i in range(20):
+                fh.write('2021-04-03 10:%02d:00 %s\n' %
+                         (i, _packet(50 + i).hex()))
+            # epoch and ISO time stamps; 2021-04-03 11:00 and 11:05 UTC
+            fh.write('1617447600 %s\n' % _packet(80).hex())
+            fh.write('2021-04-03T12:05:00+01:00 %s\n' % _packet(81).hex())
+            fh.write('yesterday %s\n' % _packet(82).hex())
+            fh.write('\n')
+            fh.write(_page(0).hex() + '\n')
+            fh.write(_page(1, records=3).hex() + '\n')
+            fh.write((b'\xff' + _packet(1.0)[1:]).hex() + '\n')  # bad CRC
+            fh.write('zz\n')
+
+    def _path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_decode_packet(self):
+        kind, records = decode_packet(_packet(72.5))
+        self.assertEqual(kind, 'loop')
+        self.assertEqual(records[0]['TempOut'], 72.5)
+        kind, records = decode_packet(_page(0))
+        self.assertEqual(kind, 'archive')
+        self.assertEqual([r['TempOut'] for r in records],
+                         [70.0, 70.1, 70.2, 70.3, 70.4])
+        self.assertEqual(decode_packet(_page(1, records=2))[1][-1]['Min'], 30)
+        with self.assertRaises(DecodeError):
+            decode_packet(_packet(72.5)[:-1])
+
+    def _check(self, chunks):
+        loop = [f for c in chunks for f in c.loop]
+        archive = [r for c in chunks for r in c.archive]
+        errors = [e[1] for c in chunks for e in c.errors]
+        self.assertEqual([f['TempOut'] for f in loop],
+                         [50.0 + i for i in range(20)] + [80.0, 81.0])
+        self.assertEqual(loop[3]['time'],
+                         datetime.datetime(2021, 4, 3, 10, 3))
+        self.assertEqual(loop[20]['time'], datetime.datetime(2021, 4, 3, 11))
+        self.assertEqual(loop[21]['time'],
+                         datetime.datetime(2021, 4, 3, 11, 5))
+        self.assertEqual(len(archive), 8)
+        self.assertEqual(errors, ['time', 'crc', 'hex'])
+
+    def test_single_process(self):
+        self._check(list(decode_files([self.input], workers=1)))
+
+    def test_chunks_in_order(self):
+        # chunk boundaries fall inside lines
+        chunks = list(decode_files([self.input], workers=1, chunk_size=500))
+        self.assertGreater(len(chunks), 5)
+        self._check(chunks)
+        offsets = [c.offset for c in chunks]
+        self.assertEqual(offsets, sorted(offsets))
+
+    def test_process_pool(self):
+        self._check(list(decode_files([self.input], workers=2,
+                                      chunk_size=1000)))
+
+    def test_redecode(self):
+        db = self._path('weather.db')
+        counts = redecode([self.input], loop_file=self._path('loop.jsonl'),
+                          archive_file=self._path('archive.csv'), sqlite=db,
+                          station='home', workers=1, chunk_size=1000)
+        self.assertEqual(counts, {'loop': 22, 'archive': 8, 'crc': 1,
+                                  'hex': 1, 'time': 1})
+        with open(self._path('loop.jsonl')) as fh:
+            lines = [json.loads(line) for line in fh]
+        self.assertEqual(lines[-1]['TempOut'], 81.0)
+        self.assertEqual(lines[-1]['time'], '2021-04-03T11:05:00')
+        self.assertNotIn('CRC', lines[-1])
+        with open(self._path('archive.csv')) as fh:
+            self.assertEqual(len(fh.readlines()), 9)
+        store = SqliteStore(db, station='home')
+        self.assertEqual(store.count(), 22)
+        self.assertEqual(store.count('archive'), 8)
+        points = list(store.points())
+        self.assertEqual([p.time for p in points[-3:]], [
+            datetime.datetime(2021, 4, 3, 10, 19),
+            datetime.datetime(2021, 4, 3, 11),
+            datetime.datetime(2021, 4, 3, 11, 5)])
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+'''Tests for the shared memory module.'''
+
+import math
+import os
+import struct
+import unittest
+
+from ..shm import SHM_FIELDS, SharedMemoryWriter, SharedMemoryStation
+from ..davis import NoDeviceException
+
+
+class SharedMemoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.name = 'pyweather-test-%d' % os.getpid()
+        self.writer = SharedMemoryWriter(self.name)
+        self.station = SharedMemoryStation(self.name)
+
+    def tearDown(self):
+        self.station.close()
+        self.writer.close()
+
+    def test_fields(self):
+        self.assertIn('TempOut', SHM_FIELDS)
+        self.assertIn('DewPoint', SHM_FIELDS)
+        self.assertNotIn('SunRise', SHM_FIELDS)
+
+    def test_no_reading(self):
+        self.assertEqual(self.station.read()[0], 0)
+        self.assertRaises(NoDeviceException, self.station.get_reading)
+
+    def test_round_trip(self):
+        self.writer.update({'TempOut': 72.1, 'Pressure': 29.985,
+                            'HumOut': 78, 'DewPoint': 64.9, 'WindDir': 355},
+                           timestamp=1600000000.0)
+        seq, timestamp, values = self.station.read()
+        self.assertEqual(seq, 2)
+        fields = self.station.read_fields()
+        self.assertEqual(fields['TempOut'], 72.1)
+        self.assertTrue(math.isnan(fields['RainRate']))
+        point = self.station.get_reading()
+        self.assertEqual(point.temperature_f, 72.1)
+        self.assertEqual(point.humidity, 78)
+        self.assertEqual(point.time.year, 2020)
+        self.assertIsNone(point.rain_rate_in)
+
+    def test_existing_block(self):
+        self.assertRaises(FileExistsError, SharedMemoryWriter, self.name)
+        self.writer.update({'TempOut': 1.0})
+        writer = SharedMemoryWriter(self.name, reuse=True)
+        self.assertEqual(self.station.read()[0], 0)
+        writer.close(unlink=False)
+
+    def test_torn_write_detected(self):
+        self.writer.update({'TempOut': 1.0})
+        self.writer._seq += 1  # simulate a writer stuck mid-update
+        struct.pack_into('=Q', self.writer.shm.buf, 8, self.writer._seq)
+        self.station.retries = 3
+        self.assertRaises(NoDeviceException, self.station.read)
+
+    def test_missing_block(self):
+        self.assertRaises(NoDeviceException, SharedMemoryStation,
+                          self.name + '-missing')
@@ -1,8 +1,12 @@
 '''Tests for the station module.'''
 
+import asyncio
+import threading
+import time
 import unittest
+from unittest import mock
 
-from ..station import WeatherPoint
+from ..station import CachedStation, ExecutorStation, Station, WeatherPoint
 
 
 class WeatherPointTest(unittest.TestCase):
@@ -15,3 +19,101 @@ class WeatherPointTest(unittest.TestCase):
         w_c = WeatherPoint(temperature_c=21)
         self.assertEqual(w_c.temperature_c, 21)
         self.assertAlmostEqual(w_c.temperature_f, 69.8)
+
+    def test_to_dict(self):
+        w = WeatherPoint(time=1, temperature_f=80, humidity=50)
+        d = w.to_dict()
+        self.assertEqual(tuple(d), WeatherPoint.FIELDS)
+        self.assertEqual(d['temperature_f'], 80)
+        self.assertEqual(d['humidity'], 50)
+        self.assertIsNone(d['pressure'])
+
+
+class _SlowStation(Station):
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+
+    def get_reading(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return WeatherPoint(time=self.calls, temperature_f=70)
+
+
+class ExecutorStationTest(unittest.TestCase):
+
+    def test_concurrent_stations(self):
+        stations = [ExecutorStation(_SlowStation(0.2)) for i in range(3)]
+
+        async def main():
+            return await asyncio.gather(
+                *[s.get_reading() for s in stations])
+
+        start = time.monotonic()
+        points = asyncio.run(main())
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual([p.temperature_f for p in points], [70] * 3)
+
+    def test_serialized_readings(self):
+        slow = _SlowStation(0.05)
+        station = ExecutorStation(slow)
+
+        async def main():
+            return await asyncio.gather(
+                station.get_reading(), station.get_reading())
+
+        points = asyncio.run(main())
+        self.assertEqual(sorted(p.time for p in points), [1, 2])
+
+    def test_stream(self):
+        station = ExecutorStation(_SlowStation(0))
+
+        async def main():
+            points = []
+            async for point in station.stream(interval=0.01):
+                points.append(point)
+                if len(points) == 3:
+                    break
+            return points
+
+        self.assertEqual([p.time for p in asyncio.run(main())], [1, 2, 3])
+
+
+class CachedStationTest(unittest.TestCase):
+
+    def test_single_flight(self):
+        slow = _SlowStation(0.1)
+        station = CachedStation(slow, ttl=10)
+        points = []
+        threads = [threading.Thread(
+            target=lambda: points.append(station.get_reading()))
+            for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(slow.calls, 1)
+        self.assertEqual(len(points), 8)
+        self.assertTrue(all(p is points[0] for p in points))
+        self.assertEqual((station.hits, station.misses), (7, 1))
+
+    def test_ttl(self):
+        slow = _SlowStation(0)
+        station = CachedStation(slow, ttl=2)
+        with mock.patch('time.monotonic', return_value=100.0) as now:
+            self.assertEqual(station.get_reading().time, 1)
+            now.return_value = 101.9
+            self.assertEqual(station.get_reading().time, 1)
+            now.return_value = 102.0
+            self.assertEqual(station.get_reading().time, 2)
+        self.assertEqual((station.hits, station.misses), (1, 2))
+
+    def test_error_not_cached(self):
+        slow = _SlowStation(0)
+        station = CachedStation(slow)
+        with mock.patch.object(slow, 'get_reading',
+                               side_effect=IOError('no console')):
+            self.assertRaises(IOError, station.get_reading)
+        self.assertEqual(station.get_reading().time, 1)
+        self.assertEqual(station.misses, 2)
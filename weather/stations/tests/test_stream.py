@@ -0,0 +1,186 @@
+'''Tests for the Station.stream() implementations.'''
+
+import codecs
+import itertools
+import struct
+import unittest
+from unittest import mock
+
+from .. import davis
+from ..davis import VantagePro, VProCRC
+from ..station import Station, WeatherPoint
+
+# a valid LOOP packet, as used by the davis unit tests
+LOOP_DATA = codecs.decode(
+    b"4c4f4f14003e032175da0239d10204056301ffffffffffffffffffff"
+    b"ffffffffff4effffffffffffff0000ffff7f0000ffff000000000000000000000000ffff"
+    b"ffffffffff0000000000000000000000000000000000002703064b26023e070a0d1163",
+    'hex')
+TEMP_OFFSET = 12
+
+
+def _packet(temp_f):
+    data = bytearray(LOOP_DATA[:-2])
+    struct.pack_into('<H', data, TEMP_OFFSET, int(temp_f * 10))
+    return bytes(data) + struct.pack('>H', VProCRC.get(bytes(data)))
+
+
+class LoopPort(object):
+    '''
+    Console replacement, sending numbered LOOP packets (TempOut 1.0, 2.0,
+    ...). send() simulates the packets sent while the consumer is busy.
+    '''
+
+    def __init__(self):
+        self.buffer = b''
+        self.remaining = 0
+        self.loop_cmds = 0
+        self.temps = itertools.count(1)
+
+    @property
+    def in_waiting(self):
+        return len(self.buffer)
+
+    def send(self, count=1):
+        for i in range(min(count, self.remaining)):
+            self.remaining -= 1
+            self.buffer += _packet(next(self.temps))
+
+    def write(self, data):
+        if data == b'\n':
+            self.remaining = 0
+            self.buffer += b'\n\r'
+        elif data.startswith(b'LOOP'):
+            self.loop_cmds += 1
+            self.remaining = int(data.split()[1])
+            self.buffer += b'\x06'
+
+    def read(self, size):
+        if len(self.buffer) < size:
+            self.send()
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def reset_input_buffer(self):
+        self.buffer = b''
+
+    def close(self):
+        pass
+
+
+class _CountingStation(Station):
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_reading(self):
+        self.calls += 1
+        return WeatherPoint(time=self.calls)
+
+
+class StationStreamTest(unittest.TestCase):
+
+    def test_poll(self):
+        clock = [100.0]
+
+        def sleep(seconds):
+            clock[0] += seconds
+
+        station = _CountingStation()
+        with mock.patch('time.sleep', side_effect=sleep) as sleep, \
+                mock.patch('time.monotonic', side_effect=lambda: clock[0]):
+            stream = station.stream(30)
+            self.assertEqual(next(stream).time, 1)
+            self.assertEqual(next(stream).time, 2)
+            # a slow consumer doesn't cause extra readings
+            clock[0] += 95
+            self.assertEqual(next(stream).time, 3)
+            self.assertEqual(next(stream).time, 4)
+        self.assertEqual(station.calls, 4)
+        self.assertEqual([c[0][0] for c in sleep.call_args_list],
+                         [30, 0, 30])
+
+    def test_moving_clock(self):
+        # the clock moves on every read; the consumer is slower than the
+        # interval
+        clock = [100.0]
+
+        def monotonic():
+            clock[0] += 0.001
+            return clock[0]
+
+        def sleep(seconds):
+            if seconds < 0:
+                raise ValueError('sleep length must be non-negative')
+            clock[0] += seconds
+
+        station = _CountingStation()
+        with mock.patch('time.sleep', side_effect=sleep) as sleep, \
+                mock.patch('time.monotonic', side_effect=monotonic):
+            stream = station.stream(0.01)
+            for i in range(5):
+                next(stream)
+                clock[0] += 0.05
+            stream = station.stream(0)
+            for i in range(5):
+                next(stream)
+        self.assertEqual(sleep.call_count, 8)
+        self.assertTrue(all(c[0][0] >= 0 for c in sleep.call_args_list))
+
+
+class VantageProStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.port = LoopPort()
+        self.vp = VantagePro.__new__(VantagePro)
+        self.vp.port = self.port
+        self.vp.fields = {}
+        patcher = mock.patch.object(davis.time, 'sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_every_packet(self):
+        stream = self.vp.stream()
+        temps = [next(stream).temperature_f for i in range(3)]
+        self.assertEqual(temps, [1.0, 2.0, 3.0])
+        self.assertEqual(self.port.loop_cmds, 1)
+        self.assertIsNone(self.vp.fields['Archive'])
+        self.assertIn('HeatIndex', self.vp.fields)
+
+    def test_coalesce(self):
+        stream = self.vp.stream()
+        self.assertEqual(next(stream).temperature_f, 1.0)
+        # slow consumer: only the newest packet is returned
+        self.port.send(5)
+        self.assertEqual(next(stream).temperature_f, 6.0)
+        self.assertEqual(self.port.in_waiting, 0)
+
+    def test_burst_ended(self):
+        stream = self.vp.stream()
+        next(stream)
+        # the whole burst arrived; the packets may be old, start a new one
+        self.port.send(VantagePro.STREAM_PACKETS)
+        self.assertEqual(next(stream).temperature_f,
+                         VantagePro.STREAM_PACKETS + 1)
+        self.assertEqual(self.port.loop_cmds, 2)
+
+    def test_crc_error(self):
+        stream = self.vp.stream()
+        next(stream)
+        # a bad packet among the coalesced ones is skipped
+        self.port.buffer += b'\xff' * len(LOOP_DATA)
+        self.port.remaining -= 1
+        self.assertEqual(next(stream).temperature_f, 2.0)
+        self.assertEqual(self.port.loop_cmds, 1)
+        # a bad packet read while waiting restarts the LOOP command
+        self.port.remaining -= 1
+        self.port.buffer += b'\xff' * len(LOOP_DATA)
+        self.vp._in_waiting = lambda: 0
+        self.assertEqual(next(stream).temperature_f, 3.0)
+        self.assertEqual(self.port.loop_cmds, 2)
+
+    def test_close_cancels_loop(self):
+        stream = self.vp.stream()
+        next(stream)
+        stream.close()
+        self.assertEqual(self.port.remaining, 0)
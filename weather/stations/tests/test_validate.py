@@ -0,0 +1,95 @@
+'''Tests for the validate module.'''
+
+import unittest
+from unittest import mock
+
+from .. import validate
+from ..validate import RULES, Rule, ValidationError, Validator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+requires_numpy = unittest.skipIf(np is None, 'numpy is not installed')
+
+FIELDS = {
+    'HumOut': 78, 'HumIn': 45, 'DewPoint': 64.9, 'TempIn': 70.1,
+    'TempOut': 72.1, 'WindChill': 72.1, 'HeatIndex': 72.0,
+    'RainYear': 10.2, 'RainMonth': 1.5, 'RainDay': 0.1, 'RainStorm': 0.0,
+    'WindSpeed': 5, 'WindSpeed10Min': 4, 'WindDir': 355, 'Pressure': 29.98,
+    'SolarRad': 512, 'UV': 3,
+}
+
+
+class ValidatorTest(unittest.TestCase):
+
+    def test_valid(self):
+        validator = Validator()
+        self.assertEqual(validator.check(FIELDS), 0)
+        self.assertEqual(validator.failures(FIELDS), [])
+        self.assertEqual(sum(validator.rejections.values()), 0)
+        Validator(FIELDS).validate()
+
+    def test_failures(self):
+        validator = Validator()
+        fields = dict(FIELDS, HumOut=101, SolarRad=0x7FFF)
+        del fields['Pressure']
+        mask = validator.check(fields)
+        self.assertEqual(sorted(validator.fields_of(mask)),
+                         ['HumOut', 'Pressure', 'SolarRad'])
+        self.assertEqual(validator.failures(fields), [
+            ('HumOut', 'range', 101), ('Pressure', 'missing', None),
+            ('SolarRad', 'dashed', 0x7FFF)])
+        self.assertEqual(validator.rejections['HumOut'], 1)
+        with self.assertRaises(ValidationError) as cm:
+            validator.validate(fields)
+        self.assertEqual(len(cm.exception.failures), 3)
+
+    def test_optional_and_nan(self):
+        validator = Validator()
+        fields = dict(FIELDS, TempOut=float('nan'), SolarRad=float('nan'))
+        del fields['UV']
+        self.assertEqual(validator.fields_of(validator.check(fields)),
+                         ['TempOut'])
+        self.assertEqual(validator.failures(fields)[0][:2],
+                         ('TempOut', 'missing'))
+
+    def test_custom_rules(self):
+        validator = Validator(rules=[('TempOut', -40, 150)])
+        self.assertEqual(validator.check({'TempOut': 151}), 1)
+        self.assertEqual(validator.check({'TempOut': 150}), 0)
+        self.assertEqual(validator.rules[0], Rule('TempOut', -40, 150))
+
+    def test_check_columns(self):
+        columns = {name: [value] * 4 for name, value in FIELDS.items()}
+        columns['UV'] = [3, 0xFF, None, 4]
+        columns['TempOut'] = [72.1, 300, 72.3, float('nan')]
+        expected = [Validator().check(
+            {name: col[i] for name, col in columns.items()})
+            for i in range(4)]
+        self.assertEqual(expected[0], 0)
+        self.assertNotEqual(expected[1], 0)
+
+        validator = Validator()
+        masks = validator.check_columns(columns)
+        self.assertEqual(list(masks), expected)
+        self.assertEqual(validator.rejections['UV'], 1)
+        self.assertEqual(validator.rejections['TempOut'], 2)
+
+        with mock.patch.object(validate, 'np', None):
+            self.assertEqual(Validator().check_columns(columns), expected)
+
+    @requires_numpy
+    def test_check_columns_missing_column(self):
+        validator = Validator()
+        columns = {name: [value] * 3 for name, value in FIELDS.items()}
+        del columns['Pressure']
+        masks = validator.check_columns(columns)
+        self.assertEqual(validator.fields_of(int(masks[0])), ['Pressure'])
+        self.assertEqual(validator.rejections['Pressure'], 3)
+
+    def test_default_rules(self):
+        names = [r.field for r in RULES]
+        self.assertIn('SolarRad', names)
+        self.assertEqual(len(names), len(set(names)))
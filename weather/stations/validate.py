@@ -1,28 +1,180 @@
+"""
+Station Field Validation
 
-class Validator:
-    def __init__(self, fields):
+Abstract:
+Range checks of the LOOP (or archive) fields of a station. Each rule names a
+field, its valid range and the sentinel values the console uses for a dashed
+(missing) value, e.g. 0x7FFF for SolarRad and 0xFF for UV. The rule table is
+compiled once per Validator into a tuple of (field, min, max, sentinels,
+bit) checks.
+
+check() returns a bitmask with the bit of every failed rule set, so a packet
+is valid when the mask is 0; failures() lists the failed fields with the
+reason ('missing', 'dashed' or 'range'). check_columns() runs the rules over
+whole columns of values (e.g. archive history), returning one mask per row.
+Every failure is counted per rule in 'rejections'.
+
+Usage:
+>>> validator = Validator()
+>>> mask = validator.check( vantage_pro.fields )
+>>> if mask:
+...     log.warning( validator.failures( vantage_pro.fields ) )
+>>> validator.rejections
+"""
+
+import collections
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ['Rule', 'RULES', 'ValidationError', 'Validator']
+
+Rule = collections.namedtuple(
+    'Rule', ('field', 'min', 'max', 'sentinels', 'required'))
+Rule.__new__.__defaults__ = ((), True)
+
+# default rules; optional sensors (solar, UV) may be absent
+RULES = (
+    Rule('HumOut', 0, 100, (0xFF,)),
+    Rule('HumIn', 0, 100, (0xFF,)),
+    Rule('DewPoint', -120, 254),
+    Rule('TempIn', -20, 254),
+    Rule('TempOut', -120, 254),
+    Rule('WindChill', -254, 254),
+    Rule('HeatIndex', -120, 254),
+    Rule('RainYear', 0, 254),
+    Rule('RainMonth', 0, 254),
+    Rule('RainDay', 0, 254),
+    Rule('RainStorm', 0, 254),
+    Rule('WindSpeed', 0, 200, (0xFF,)),
+    Rule('WindSpeed10Min', 0, 200, (0xFF,)),
+    Rule('WindDir', 0, 359, (0x7FFF,)),
+    Rule('Pressure', 26.00, 34.00),
+    Rule('SolarRad', 0, 1800, (0x7FFF,), False),
+    Rule('UV', 0, 16, (0xFF,), False),
+)
+
+
+class ValidationError(ValueError):
+    """
+    raised by Validator.validate(); 'failures' lists the failed rules.
+    """
+
+    def __init__(self, failures):
+        super(ValidationError, self).__init__(
+            ', '.join('%s %s (%r)' % f for f in failures))
+        self.failures = failures
+
+
+class Validator(object):
+    """
+    Checks station fields against a rule table. See module documentation for
+    additional information.
+    """
+
+    def __init__(self, fields=None, rules=RULES):
+        if len(rules) > 63:
+            raise ValueError('too many rules')
         self.fields = fields
+        self.rules = tuple(Rule(*r) for r in rules)
+        self._checks = tuple(
+            (r.field, r.min, r.max, frozenset(r.sentinels), r.required,
+             1 << i) for i, r in enumerate(self.rules))
+        self.rejections = collections.Counter()
 
     def get_value(self, field, default):
         return self.fields.get(field, default)
 
-    def validate(self):
-        assert 0 <= self.get_value('HumOut', -1) <= 100
-        assert 0 <= self.get_value('HumIn', -1) <= 100
-        assert -120 <= self.get_value('DewPoint', -1) <= 254
-        
-        assert -20 <= self.get_value('TempIn', -255) <= 254
-        assert -120 <= self.get_value('TempOut', -255) <= 254
-        assert -254 <= self.get_value('WindChill', -255) <= 254
-        assert -120 <= self.get_value('HeatIndex', -255) <= 254
-        
-        assert 0 <= self.get_value('RainYear', -1) <= 254
-        assert 0 <= self.get_value('RainMonth', -1) <= 254
-        assert 0 <= self.get_value('RainDay', -1) <= 254
-        assert 0 <= self.get_value('RainStorm', -1) <= 254
-
-        assert 0 <= self.get_value('WindSpeed', -1) <= 200
-        assert 0 <= self.get_value('WindSpeed10Min', -1) <= 200
-        assert 0 <= self.get_value('WindDir', -1) <= 359
-
-        assert 26.00 <= self.get_value('Pressure', -1) <= 34.00
+    def check(self, fields):
+        """
+        Return the bitmask of the failed rules (0 when all rules pass), and
+        count the failures.
+        """
+        mask = 0
+        get = fields.get
+        for field, lo, hi, sentinels, required, bit in self._checks:
+            value = get(field)
+            if value is None or value != value:  # missing, or NaN
+                if required:
+                    mask |= bit
+            elif value in sentinels or not lo <= value <= hi:
+                mask |= bit
+        if mask:
+            self._count(mask)
+        return mask
+
+    def _count(self, mask):
+        for field, lo, hi, sentinels, required, bit in self._checks:
+            if mask & bit:
+                self.rejections[field] += 1
+
+    def _reason(self, rule, value):
+        if value is None or value != value:
+            return 'missing'
+        if value in rule.sentinels:
+            return 'dashed'
+        return 'range'
+
+    def failures(self, fields):
+        """
+        Return the failed rules, as a list of (field, reason, value).
+        """
+        res = []
+        for rule in self.rules:
+            value = fields.get(rule.field)
+            missing = value is None or value != value
+            if missing and not rule.required:
+                continue
+            if (missing or value in rule.sentinels or
+                    not rule.min <= value <= rule.max):
+                res.append((rule.field, self._reason(rule, value), value))
+        return res
+
+    def fields_of(self, mask):
+        """
+        Return the names of the fields with a failed rule in 'mask'.
+        """
+        return [check[0] for check in self._checks if mask & check[5]]
+
+    def check_columns(self, columns):
+        """
+        Check columns of values, {field: sequence}; return one mask per row
+        (a NumPy int64 array, or a list without NumPy). Missing values are
+        None or NaN; missing columns fail their required rules.
+        """
+        length = max(len(c) for c in columns.values())
+        if np is None:
+            rows = [{} for i in range(length)]
+            for field, column in columns.items():
+                for row, value in zip(rows, column):
+                    row[field] = value
+            return [self.check(row) for row in rows]
+
+        masks = np.zeros(length, dtype=np.int64)
+        for field, lo, hi, sentinels, required, bit in self._checks:
+            if field not in columns:
+                if required:
+                    masks |= bit
+                    self.rejections[field] += length
+                continue
+            # None converts to NaN
+            values = np.asarray(columns[field], dtype=np.float64)
+            missing = np.isnan(values)
+            with np.errstate(invalid='ignore'):
+                bad = (values < lo) | (values > hi)
+            if sentinels:
+                bad |= np.isin(values, list(sentinels))
+            bad = np.where(missing, required, bad)
+            masks[bad] |= bit
+            self.rejections[field] += int(bad.sum())
+        return masks
+
+    def validate(self, fields=None):
+        """
+        Raise ValidationError when a rule fails.
+        """
+        fields = self.fields if fields is None else fields
+        if self.check(fields):
+            raise ValidationError(self.failures(fields))
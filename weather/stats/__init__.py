@@ -0,0 +1,8 @@
+'''
+Streaming statistics of weather observations.
+'''
+
+from .rolling import *
+from .rain import *
+from .wind import *
+from .qc import *
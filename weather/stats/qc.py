@@ -0,0 +1,267 @@
+"""
+Streaming Quality Control
+
+Abstract:
+Detects sensor faults in a stream of observations, before they are
+published. For every configured field, FieldQC keeps O(1) state: the last
+accepted value, an exponentially weighted moving average (EWMA) and variance,
+and the length of the current run of identical values. Each new value is
+flagged as:
+
+   SPIKE  further than 'spike' standard deviations (and at least 'spike_min')
+          from the EWMA, once 'WARMUP' values have been seen
+   STEP   changed by more than 'step' since the last accepted value
+   STUCK  repeated 'stuck' times in a row; restricted to 'stuck_values' when
+          given (e.g. an anemometer stuck at 0, humidity pinned at 100)
+
+Spikes and steps are not added to the EWMA, so a single bad value does not
+disturb the statistics. After MAX_REJECTS suspect values in a row the new
+level is accepted, so a genuine change is only flagged briefly.
+
+The thresholds are per sample; tune them to the sampling interval. A None
+threshold disables the check. The defaults (THRESHOLDS) use the WeatherPoint
+field names, and assume one sample every SAMPLE_INTERVAL (60) seconds; at
+other rates, pass thresholds tuned to that rate. check_columns() re-checks history with NumPy array
+operations: stuck runs are found as in streaming mode, steps against the
+previous value, and spikes against the mean and standard deviation of a
+trailing window of 2 / alpha - 1 samples (the span of the EWMA).
+
+Usage:
+>>> qc = QualityControl()
+>>> point, flags = qc.filter_point( point )   # suspect values are None
+>>> qc.flagged
+"""
+
+import collections
+import copy
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ['SPIKE', 'STEP', 'STUCK', 'flag_names', 'Thresholds', 'THRESHOLDS',
+           'SAMPLE_INTERVAL', 'FieldQC', 'QualityControl']
+
+SPIKE = 1
+STEP = 2
+STUCK = 4
+
+FLAG_NAMES = {SPIKE: 'spike', STEP: 'step', STUCK: 'stuck'}
+
+# values needed before spikes are detected
+WARMUP = 10
+# suspect values in a row, before the new level is accepted
+MAX_REJECTS = 3
+
+
+def flag_names(flags):
+    """
+    Return the names of the flags set in 'flags', e.g. ['spike', 'step'].
+    """
+    return [name for flag, name in sorted(FLAG_NAMES.items()) if flags & flag]
+
+
+Thresholds = collections.namedtuple(
+    'Thresholds',
+    ('spike', 'spike_min', 'step', 'stuck', 'stuck_values', 'alpha'))
+Thresholds.__new__.__defaults__ = (None, 0.0, None, None, None, 0.1)
+
+# seconds between the samples THRESHOLDS are tuned for
+SAMPLE_INTERVAL = 60
+
+THRESHOLDS = {
+    'temperature_f': Thresholds(spike=6, spike_min=5.0, step=10.0,
+                                stuck=240),
+    'dew_point_f': Thresholds(spike=6, spike_min=5.0, step=10.0),
+    'humidity': Thresholds(step=25, stuck=720, stuck_values=(100,)),
+    'pressure': Thresholds(spike=6, spike_min=0.05, step=0.1),
+    'wind_speed_mph': Thresholds(stuck=1440, stuck_values=(0,)),
+}
+
+
+class FieldQC(object):
+    """
+    Streaming quality control state of a single field.
+    """
+
+    def __init__(self, thresholds):
+        self.thresholds = Thresholds(*thresholds)
+        self.count = 0
+        self.last = None
+        self.mean = 0.0
+        self.var = 0.0
+        self.run = 0
+        self._prev = None
+        self._rejects = 0
+
+    def update(self, value):
+        """
+        Add a value; return its flags (0 when the value looks valid). None
+        and NaN values are ignored.
+        """
+        if value is None or value != value:
+            return 0
+        th = self.thresholds
+        flags = 0
+        self.run = self.run + 1 if value == self._prev else 1
+        self._prev = value
+        if th.stuck and self.run >= th.stuck and (
+                th.stuck_values is None or value in th.stuck_values):
+            flags |= STUCK
+        if self.count:
+            if th.step is not None and abs(value - self.last) > th.step:
+                flags |= STEP
+            if th.spike is not None and self.count >= WARMUP:
+                limit = max(th.spike * math.sqrt(self.var), th.spike_min)
+                if abs(value - self.mean) > limit:
+                    flags |= SPIKE
+
+        if flags & (SPIKE | STEP):
+            self._rejects += 1
+            if self._rejects < MAX_REJECTS:
+                return flags
+            # a new level; restart the average from here
+            self.mean = value
+        self._rejects = 0
+        if not self.count:
+            self.mean = value
+        diff = value - self.mean
+        self.mean += th.alpha * diff
+        self.var = (1 - th.alpha) * (self.var + th.alpha * diff * diff)
+        self.last = value
+        self.count += 1
+        return flags
+
+
+class QualityControl(object):
+    """
+    Streaming quality control of the fields in 'thresholds' ({field:
+    Thresholds}). 'flagged' counts the flags, per (field, flag name).
+    """
+
+    def __init__(self, thresholds=None):
+        self.thresholds = dict(THRESHOLDS if thresholds is None
+                               else thresholds)
+        self._fields = {name: FieldQC(th)
+                        for name, th in self.thresholds.items()}
+        self.flagged = collections.Counter()
+
+    def _count(self, field, flags):
+        for flag, name in FLAG_NAMES.items():
+            if flags & flag:
+                self.flagged[(field, name)] += 1
+
+    def check(self, fields):
+        """
+        Add the values of a dict of fields; return {field: flags} of the
+        suspect values.
+        """
+        res = {}
+        for name, qc in self._fields.items():
+            flags = qc.update(fields.get(name))
+            if flags:
+                res[name] = flags
+                self._count(name, flags)
+        return res
+
+    def filter(self, fields, suppress=SPIKE | STEP | STUCK):
+        """
+        Like check(), but also return a copy of 'fields' where the values
+        with one of the 'suppress' flags are None: (fields, flags).
+        """
+        flags = self.check(fields)
+        fields = dict(fields)
+        for name, flag in flags.items():
+            if flag & suppress:
+                fields[name] = None
+        return fields, flags
+
+    def filter_point(self, point, suppress=SPIKE | STEP | STUCK):
+        """
+        Like filter(), for a WeatherPoint: return (point, flags), where
+        'point' is a copy if a value was suppressed. The input point is not
+        changed, as it may be shared (e.g. the reading of a CachedStation).
+        """
+        flags = self.check(point.to_dict())
+        suppressed = [name for name, flag in flags.items() if flag & suppress]
+        if suppressed:
+            point = copy.copy(point)
+            for name in suppressed:
+                setattr(point, name, None)
+        return point, flags
+
+    def check_columns(self, columns):
+        """
+        Check columns of history, {field: sequence}; return {field: flags}
+        with one flag value per row (NumPy arrays, or lists without NumPy).
+        Doesn't change the streaming state.
+        """
+        res = {}
+        for name, values in columns.items():
+            if name not in self.thresholds:
+                continue
+            if np is None:
+                qc = FieldQC(self.thresholds[name])
+                flags = [qc.update(v) for v in values]
+            else:
+                flags = _check_column(
+                    np.asarray(values, dtype=np.float64),
+                    Thresholds(*self.thresholds[name]))
+            for flag, flag_name in FLAG_NAMES.items():
+                if np is None:
+                    count = sum(1 for f in flags if f & flag)
+                else:
+                    count = int(np.count_nonzero(flags & flag))
+                if count:
+                    self.flagged[(name, flag_name)] += count
+            res[name] = flags
+        return res
+
+
+def _check_column(values, th):
+    """
+    Vectorized check of one column; see module documentation.
+    """
+    n = len(values)
+    flags = np.zeros(n, dtype=np.int8)
+    valid = ~np.isnan(values)
+    idx = np.flatnonzero(valid)
+    x = values[idx]
+    if not len(x):
+        return flags
+    out = np.zeros(len(x), dtype=np.int8)
+
+    if th.step is not None:
+        out[1:] |= np.where(np.abs(np.diff(x)) > th.step, STEP, 0).astype(
+            np.int8)
+
+    if th.stuck:
+        # run length of identical values, ending at each sample
+        new_run = np.concatenate(([True], x[1:] != x[:-1]))
+        starts = np.flatnonzero(new_run)
+        pos = np.arange(len(x))
+        run = pos - starts[np.cumsum(new_run) - 1] + 1
+        stuck = run >= th.stuck
+        if th.stuck_values is not None:
+            stuck &= np.isin(x, list(th.stuck_values))
+        out |= np.where(stuck, STUCK, 0).astype(np.int8)
+
+    if th.spike is not None and len(x) > WARMUP:
+        window = max(int(round(2 / th.alpha - 1)), WARMUP)
+        csum = np.concatenate(([0.0], np.cumsum(x)))
+        csum2 = np.concatenate(([0.0], np.cumsum(x * x)))
+        end = np.arange(len(x))
+        start = np.maximum(end - window, 0)
+        count = end - start
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (csum[end] - csum[start]) / count
+            var = (csum2[end] - csum2[start]) / count - mean * mean
+        std = np.sqrt(np.maximum(var, 0.0))
+        limit = np.maximum(th.spike * std, th.spike_min)
+        spike = (count >= WARMUP) & (np.abs(x - mean) > limit)
+        out |= np.where(spike, SPIKE, 0).astype(np.int8)
+
+    flags[idx] = out
+    return flags
@@ -0,0 +1,241 @@
+"""
+Rain and Evapotranspiration Accumulator
+
+Abstract:
+RainAccumulator keeps running rain and ET (evapotranspiration) totals over
+rolling windows (e.g. the last hour or 24 hours) and calendar periods (the
+local day, month or year). Every new record updates all totals in O(1)
+(amortized) time, so the totals never need to be recomputed from the
+archive history.
+
+The accumulator is fed with either archive records or LOOP packets:
+
+ * add_archive() counts the rain clicks of an archive record ('RainRate' is
+   the number of clicks in the archive period) and the 'ETHour' value of the
+   hourly records. Records at or before the newest added record are skipped,
+   so overlapping DMPAFT downloads are not counted twice.
+ * add_loop() takes the increments of the console 'RainDay' and 'ETDay'
+   counters between packets. When a counter decreases, the console has reset
+   it (e.g. at midnight), and the new value is the increment.
+
+The console counts rain in collector clicks; 'collector' is the size of one
+click, in inches or as one of the COLLECTOR_SIZES names. All totals are in
+inches.
+
+The state can be saved to a JSON file and restored after a restart.
+
+Usage:
+>>> acc = RainAccumulator(collector='0.2mm')
+>>> acc.add_loop(vantage_pro.fields)   # after every parse()
+>>> acc.rain('1h'), acc.rain('day'), acc.et('24h')
+>>> acc.save('rain.json')
+>>> acc = RainAccumulator.load('rain.json')
+"""
+
+import collections
+import json
+import os
+import tempfile
+import time
+
+__all__ = ['COLLECTOR_SIZES', 'RainAccumulator']
+
+# rain collector sizes, in inches per click
+COLLECTOR_SIZES = {
+    '0.01in': 0.01,
+    '0.2mm': 0.2 / 25.4,
+    '0.1mm': 0.1 / 25.4,
+}
+
+# default windows; rolling windows in seconds, or a calendar period name
+WINDOWS = {'1h': 3600, '24h': 86400, 'day': 'day'}
+
+# time.localtime() fields that identify a calendar period
+_PERIODS = {'day': 3, 'month': 2, 'year': 1}
+
+
+class _Rolling(object):
+    """
+    Rain and ET sums of the increments added in the last 'seconds'.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.items = collections.deque()  # (time, rain, et)
+        self.rain = 0.0
+        self.et = 0.0
+
+    def add(self, t, rain, et):
+        self.items.append((t, rain, et))
+        self.rain += rain
+        self.et += et
+        self.expire(t)
+
+    def expire(self, now):
+        limit = now - self.seconds
+        items = self.items
+        while items and items[0][0] <= limit:
+            _, rain, et = items.popleft()
+            self.rain -= rain
+            self.et -= et
+        if not items:
+            self.rain = self.et = 0.0  # reset accumulated rounding errors
+
+    def totals(self, now):
+        self.expire(now)
+        return self.rain, self.et
+
+    def state(self):
+        return [list(item) for item in self.items]
+
+    def restore(self, state):
+        for t, rain, et in state:
+            self.add(t, rain, et)
+
+
+class _Calendar(object):
+    """
+    Rain and ET sums of the increments added in the current calendar period.
+    """
+
+    def __init__(self, period):
+        self.size = _PERIODS[period]
+        self.key = None
+        self.rain = 0.0
+        self.et = 0.0
+
+    def _key(self, t):
+        return list(time.localtime(t)[:self.size])
+
+    def add(self, t, rain, et):
+        key = self._key(t)
+        if key != self.key:
+            self.key = key
+            self.rain = self.et = 0.0
+        self.rain += rain
+        self.et += et
+
+    def totals(self, now):
+        if self._key(now) != self.key:
+            return 0.0, 0.0
+        return self.rain, self.et
+
+    def state(self):
+        return [self.key, self.rain, self.et]
+
+    def restore(self, state):
+        self.key, self.rain, self.et = state
+
+
+class RainAccumulator(object):
+    """
+    Rain and ET totals over rolling windows and calendar periods. 'windows'
+    maps the window names to a length in seconds, or to 'day', 'month' or
+    'year'. See module documentation for additional information.
+    """
+
+    def __init__(self, collector=0.01, windows=None):
+        self.collector = COLLECTOR_SIZES.get(collector, collector)
+        self.windows = dict(WINDOWS if windows is None else windows)
+        self._totals = {}
+        for name, length in self.windows.items():
+            if length in _PERIODS:
+                self._totals[name] = _Calendar(length)
+            else:
+                self._totals[name] = _Rolling(length)
+        # newest archive record time, and the last LOOP counter values
+        self.archive_time = None
+        self.counters = None
+
+    def add(self, t, rain=0.0, et=0.0):
+        """
+        Add the rain and ET (inches) that fell at time 't' (seconds since the
+        epoch). Times must not decrease.
+        """
+        for total in self._totals.values():
+            total.add(t, rain, et)
+
+    def add_archive(self, record):
+        """
+        Add the rain clicks and ET of a Davis archive record.
+        """
+        t = time.mktime((record['Year'], record['Month'], record['Day'],
+                         record['Hour'], record['Min'], 0, 0, 0, -1))
+        if self.archive_time is not None and t <= self.archive_time:
+            return
+        self.archive_time = t
+        self.add(t, record['RainRate'] * self.collector, record['ETHour'])
+
+    def add_loop(self, fields, t=None):
+        """
+        Add the increments of the RainDay and ETDay counters of a LOOP
+        packet, received at time 't' (defaults to now). The first packet only
+        sets the initial counter values.
+        """
+        if t is None:
+            t = time.time()
+        # LOOP rain values are scaled for a 0.01 in collector; use clicks
+        counters = (int(round(fields['RainDay'] * 100)), fields['ETDay'])
+        last, self.counters = self.counters, counters
+        if last is None:
+            return
+        clicks, et = [new - old if new >= old else new
+                      for new, old in zip(counters, last)]
+        if clicks or et:
+            self.add(t, clicks * self.collector, et)
+
+    def totals(self, name, now=None):
+        """
+        Return the (rain, et) totals of a window, at time 'now' (defaults to
+        now).
+        """
+        return self._totals[name].totals(time.time() if now is None else now)
+
+    def rain(self, name, now=None):
+        return self.totals(name, now)[0]
+
+    def et(self, name, now=None):
+        return self.totals(name, now)[1]
+
+    def state(self):
+        """
+        Return the accumulator state, as JSON serializable values.
+        """
+        return {'collector': self.collector,
+                'windows': self.windows,
+                'archive_time': self.archive_time,
+                'counters': self.counters,
+                'totals': {name: total.state()
+                           for name, total in self._totals.items()}}
+
+    @classmethod
+    def from_state(cls, state):
+        acc = cls(state['collector'], state['windows'])
+        acc.archive_time = state['archive_time']
+        if state['counters'] is not None:
+            acc.counters = tuple(state['counters'])
+        for name, total in state['totals'].items():
+            acc._totals[name].restore(total)
+        return acc
+
+    def save(self, file_name):
+        """
+        Write the state to a JSON file; the file is replaced atomically.
+        """
+        dir_name = os.path.dirname(os.path.abspath(file_name))
+        fd, tmp_name = tempfile.mkstemp(dir=dir_name)
+        try:
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(self.state(), fh)
+            os.replace(tmp_name, file_name)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    @classmethod
+    def load(cls, file_name):
+        """
+        Return the accumulator saved in a JSON file.
+        """
+        with open(file_name) as fh:
+            return cls.from_state(json.load(fh))
@@ -0,0 +1,203 @@
+"""
+Rolling Window Statistics
+
+Abstract:
+Streaming statistics over a sliding time window. Samples are added with a
+timestamp (in seconds), and samples older than the window length are dropped
+as new samples arrive. Every operation is O(1) (amortized): the mean uses a
+running sum, and the max/min use monotonic deques.
+
+WindStats combines these to derive the values reported by weather services
+from a stream of LOOP packets: 2 and 10 minute average wind speed and
+direction, and the 10 minute gust speed and direction. Because the windows
+are defined in time, not in samples, the results don't depend on the polling
+interval. Use one WindStats instance per station.
+
+Usage:
+>>> stats = WindStats()
+>>> stats.update_fields( vantage_pro.fields )   # after every parse()
+>>> stats.speed_10min, stats.gust_10min, stats.gust_dir_10min
+"""
+
+import collections
+import math
+import time
+
+__all__ = ['RollingWindow', 'RollingDirection', 'WindStats']
+
+
+class RollingWindow(object):
+    """
+    Count, mean, max and min of the samples added in the last 'seconds'.
+    Each sample can carry 'data' (e.g. the wind direction of a speed
+    sample), which is returned for the max and min samples.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._samples = collections.deque()  # (time, value)
+        self._max = collections.deque()  # (time, value, data), decreasing
+        self._min = collections.deque()  # (time, value, data), increasing
+        self._sum = 0.0
+
+    def add(self, t, value, data=None):
+        """
+        Add a sample 'value' taken at time 't'. Times must not decrease.
+        """
+        self._samples.append((t, value))
+        self._sum += value
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((t, value, data))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((t, value, data))
+        self.expire(t)
+
+    def expire(self, now):
+        """
+        Drop the samples taken at or before 'now - seconds'.
+        """
+        limit = now - self.seconds
+        samples = self._samples
+        while samples and samples[0][0] <= limit:
+            self._sum -= samples.popleft()[1]
+        while self._max and self._max[0][0] <= limit:
+            self._max.popleft()
+        while self._min and self._min[0][0] <= limit:
+            self._min.popleft()
+        if not samples:
+            self._sum = 0.0  # reset accumulated rounding errors
+
+    def __len__(self):
+        return len(self._samples)
+
+    @property
+    def mean(self):
+        if not self._samples:
+            return None
+        return self._sum / len(self._samples)
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+    @property
+    def max_data(self):
+        """
+        The data of the (newest) max sample.
+        """
+        return self._max[0][2] if self._max else None
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+    @property
+    def min_data(self):
+        return self._min[0][2] if self._min else None
+
+
+class RollingDirection(object):
+    """
+    Circular mean of the directions (degrees) added in the last 'seconds'.
+    Each direction is added as a u/v vector, with an optional weight (e.g.
+    the wind speed, for a speed weighted vector mean).
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._samples = collections.deque()  # (time, u, v)
+        self._u = 0.0
+        self._v = 0.0
+
+    def add(self, t, direction, weight=1.0):
+        rad = math.radians(direction)
+        u = weight * math.sin(rad)
+        v = weight * math.cos(rad)
+        self._samples.append((t, u, v))
+        self._u += u
+        self._v += v
+        self.expire(t)
+
+    def expire(self, now):
+        limit = now - self.seconds
+        samples = self._samples
+        while samples and samples[0][0] <= limit:
+            _, u, v = samples.popleft()
+            self._u -= u
+            self._v -= v
+        if not samples:
+            self._u = self._v = 0.0
+
+    def __len__(self):
+        return len(self._samples)
+
+    @property
+    def mean(self):
+        """
+        Mean direction in degrees [0, 360), or None without a mean vector
+        (no samples, calm, or directions that cancel out).
+        """
+        if abs(self._u) < 1e-9 and abs(self._v) < 1e-9:
+            return None
+        return math.degrees(math.atan2(self._u, self._v)) % 360
+
+
+class WindStats(object):
+    """
+    Wind speed/direction averages and gusts, from a stream of samples.
+    """
+
+    def __init__(self, avg_short=120, avg_long=600, gust=600):
+        self._speed_short = RollingWindow(avg_short)
+        self._speed_long = RollingWindow(avg_long)
+        self._dir_short = RollingDirection(avg_short)
+        self._dir_long = RollingDirection(avg_long)
+        self._gust = RollingWindow(gust)
+
+    def update(self, speed, direction, t=None):
+        """
+        Add a wind sample; speed in mph, direction in degrees. 't' defaults
+        to time.monotonic().
+        """
+        if t is None:
+            t = time.monotonic()
+        self._speed_short.add(t, speed)
+        self._speed_long.add(t, speed)
+        self._gust.add(t, speed, direction)
+        if direction is not None and speed > 0:
+            self._dir_short.add(t, direction, speed)
+            self._dir_long.add(t, direction, speed)
+
+    def update_fields(self, fields, t=None):
+        """
+        Add the wind sample from a VantagePro LOOP fields dict. A 'WindDir'
+        of 0 means no direction data (north is 360), so only the speed is
+        added.
+        """
+        self.update(fields['WindSpeed'], fields['WindDir'] or None, t)
+
+    @property
+    def speed_2min(self):
+        return self._speed_short.mean
+
+    @property
+    def speed_10min(self):
+        return self._speed_long.mean
+
+    @property
+    def dir_2min(self):
+        return self._dir_short.mean
+
+    @property
+    def dir_10min(self):
+        return self._dir_long.mean
+
+    @property
+    def gust_10min(self):
+        return self._gust.max
+
+    @property
+    def gust_dir_10min(self):
+        return self._gust.max_data
@@ -0,0 +1,127 @@
+'''Tests for the streaming quality control.'''
+
+import math
+import unittest
+
+from ...stations.station import CachedStation, Station, WeatherPoint
+from ..qc import (SPIKE, STEP, STUCK, FieldQC, QualityControl, Thresholds,
+                  flag_names)
+
+
+def _noisy(n, base=70.0):
+    return [base + 0.5 * math.sin(i) for i in range(n)]
+
+
+class FieldQCTest(unittest.TestCase):
+
+    def test_spike_not_added_to_average(self):
+        qc = FieldQC(Thresholds(spike=6, spike_min=2.0))
+        for value in _noisy(30):
+            self.assertEqual(qc.update(value), 0)
+        mean = qc.mean
+        self.assertEqual(qc.update(95.0), SPIKE)
+        self.assertEqual(qc.mean, mean)
+        self.assertEqual(qc.update(70.2), 0)
+
+    def test_no_spike_during_warmup(self):
+        qc = FieldQC(Thresholds(spike=6))
+        self.assertEqual(qc.update(70.0), 0)
+        self.assertEqual(qc.update(95.0), 0)
+
+    def test_step_against_last_accepted(self):
+        qc = FieldQC(Thresholds(step=10))
+        self.assertEqual(qc.update(70.0), 0)
+        self.assertEqual(qc.update(85.0), STEP)
+        self.assertEqual(qc.update(75.0), 0)
+        self.assertEqual(qc.last, 75.0)
+
+    def test_new_level_accepted(self):
+        qc = FieldQC(Thresholds(step=10))
+        qc.update(70.0)
+        self.assertEqual([qc.update(90.0) for i in range(4)],
+                         [STEP, STEP, STEP, 0])
+        self.assertEqual(qc.last, 90.0)
+
+    def test_stuck(self):
+        qc = FieldQC(Thresholds(stuck=3, stuck_values=(0,)))
+        self.assertEqual([qc.update(0) for i in range(4)],
+                         [0, 0, STUCK, STUCK])
+        self.assertEqual(qc.update(1), 0)
+        qc = FieldQC(Thresholds(stuck=2, stuck_values=(0,)))
+        self.assertEqual([qc.update(5) for i in range(3)], [0, 0, 0])
+
+    def test_missing_ignored(self):
+        qc = FieldQC(Thresholds(step=1, stuck=2))
+        qc.update(1.0)
+        self.assertEqual(qc.update(None), 0)
+        self.assertEqual(qc.update(float('nan')), 0)
+        self.assertEqual(qc.update(1.0), STUCK)
+
+
+class QualityControlTest(unittest.TestCase):
+
+    def test_filter(self):
+        qc = QualityControl({'tempf': Thresholds(step=10),
+                             'humidity': Thresholds(step=20)})
+        qc.filter({'tempf': 70.0, 'humidity': 50})
+        fields, flags = qc.filter({'tempf': 90.0, 'humidity': 55})
+        self.assertEqual(fields, {'tempf': None, 'humidity': 55})
+        self.assertEqual(flags, {'tempf': STEP})
+        self.assertEqual(qc.flagged[('tempf', 'step')], 1)
+
+    def test_filter_point(self):
+        qc = QualityControl()
+        qc.filter_point(WeatherPoint(temperature_f=70.0, pressure=30.0))
+        point = WeatherPoint(temperature_f=70.5, pressure=29.5)
+        filtered, flags = qc.filter_point(point)
+        self.assertEqual(flags, {'pressure': STEP})
+        self.assertIsNone(filtered.pressure)
+        self.assertEqual(filtered.temperature_f, 70.5)
+        self.assertEqual(point.pressure, 29.5)
+
+    def test_filter_cached_point(self):
+        class _Station(Station):
+            def get_reading(self):
+                return WeatherPoint(temperature_f=70.0 + self.step)
+
+        source = _Station()
+        source.step = 0
+        station = CachedStation(source, ttl=60)
+        qc = QualityControl()
+        qc.filter_point(station.get_reading())
+        source.step = 30
+        station._time -= 60  # the cached reading expired
+        point = station.get_reading()
+        filtered, flags = qc.filter_point(point)
+        self.assertIsNone(filtered.temperature_f)
+        # the cached reading is unchanged
+        self.assertEqual(station.get_reading().temperature_f, 100.0)
+
+    def test_flag_names(self):
+        self.assertEqual(flag_names(SPIKE | STUCK), ['spike', 'stuck'])
+        self.assertEqual(flag_names(0), [])
+
+    def test_check_columns(self):
+        thresholds = Thresholds(spike=6, spike_min=2.0, step=10, stuck=5,
+                                alpha=0.2)
+        qc = QualityControl({'tempf': thresholds})
+        values = _noisy(40)
+        values[20] = 95.0
+        values[30:] = [55.0] * 10
+        values[5] = None
+        flags = qc.check_columns({'tempf': values, 'other': [1] * 40})
+        self.assertNotIn('other', flags)
+        flags = list(flags['tempf'])
+        self.assertEqual(flags[5], 0)
+        self.assertEqual(flags[20], SPIKE | STEP)
+        self.assertEqual(flags[21], STEP)
+        self.assertTrue(flags[30] & STEP)
+        self.assertEqual([f & STUCK for f in flags[30:]],
+                         [0] * 4 + [STUCK] * 6)
+        self.assertEqual(qc.flagged[('tempf', 'stuck')], 6)
+        # the streaming state is unchanged
+        self.assertEqual(qc._fields['tempf'].count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+'''Tests for the rain and ET accumulator.'''
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ..rain import RainAccumulator
+
+# 2021-04-03 10:00, local time
+T0 = time.mktime((2021, 4, 3, 10, 0, 0, 0, 0, -1))
+
+
+def _record(minutes, clicks, et=0.0):
+    t = time.localtime(T0 + minutes * 60)
+    return {'Year': t.tm_year, 'Month': t.tm_mon, 'Day': t.tm_mday,
+            'Hour': t.tm_hour, 'Min': t.tm_min, 'RainRate': clicks,
+            'ETHour': et}
+
+
+class RainAccumulatorTest(unittest.TestCase):
+
+    def test_rolling_windows(self):
+        acc = RainAccumulator()
+        acc.add(T0, rain=0.1)
+        acc.add(T0 + 1800, rain=0.2, et=0.01)
+        acc.add(T0 + 3600, rain=0.3)
+        self.assertAlmostEqual(acc.rain('1h', T0 + 3600), 0.5)
+        self.assertAlmostEqual(acc.rain('24h', T0 + 3600), 0.6)
+        self.assertAlmostEqual(acc.et('1h', T0 + 3600), 0.01)
+        self.assertAlmostEqual(acc.rain('1h', T0 + 5400), 0.3)
+        self.assertEqual(acc.totals('1h', T0 + 7200), (0.0, 0.0))
+
+    def test_calendar_day(self):
+        acc = RainAccumulator()
+        acc.add(T0, rain=0.1)
+        acc.add(T0 + 3600, rain=0.2)
+        self.assertAlmostEqual(acc.rain('day', T0 + 3600), 0.3)
+        # next day, without new samples
+        self.assertEqual(acc.rain('day', T0 + 86400), 0.0)
+        acc.add(T0 + 86400, rain=0.05)
+        self.assertAlmostEqual(acc.rain('day', T0 + 86400), 0.05)
+
+    def test_archive_records(self):
+        acc = RainAccumulator(collector='0.2mm')
+        acc.add_archive(_record(0, 5))
+        acc.add_archive(_record(10, 5, et=0.02))
+        acc.add_archive(_record(10, 5, et=0.02))  # downloaded twice
+        self.assertAlmostEqual(acc.rain('1h', T0 + 600), 10 * 0.2 / 25.4)
+        self.assertAlmostEqual(acc.et('day', T0 + 600), 0.02)
+
+    def test_loop_counter_reset(self):
+        acc = RainAccumulator()
+        acc.add_loop({'RainDay': 0.50, 'ETDay': 0.100}, T0)
+        self.assertEqual(acc.rain('day', T0), 0.0)
+        acc.add_loop({'RainDay': 0.53, 'ETDay': 0.102}, T0 + 60)
+        acc.add_loop({'RainDay': 0.02, 'ETDay': 0.001}, T0 + 120)  # reset
+        self.assertAlmostEqual(acc.rain('1h', T0 + 120), 0.05)
+        self.assertAlmostEqual(acc.et('1h', T0 + 120), 0.003)
+
+    def test_loop_metric_collector(self):
+        acc = RainAccumulator(collector=0.2 / 25.4)
+        acc.add_loop({'RainDay': 0.10, 'ETDay': 0.0}, T0)
+        acc.add_loop({'RainDay': 0.13, 'ETDay': 0.0}, T0 + 60)
+        self.assertAlmostEqual(acc.rain('1h', T0 + 60), 3 * 0.2 / 25.4)
+
+    def test_save_load(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        file_name = os.path.join(tmp_dir, 'rain.json')
+        acc = RainAccumulator(windows={'1h': 3600, 'month': 'month'})
+        acc.add_archive(_record(0, 3))
+        acc.add_loop({'RainDay': 0.03, 'ETDay': 0.0}, T0)
+        acc.save(file_name)
+
+        acc = RainAccumulator.load(file_name)
+        self.assertAlmostEqual(acc.rain('month', T0), 0.03)
+        acc.add_archive(_record(0, 3))  # already counted
+        acc.add_loop({'RainDay': 0.04, 'ETDay': 0.0}, T0 + 60)
+        self.assertAlmostEqual(acc.rain('1h', T0 + 60), 0.04)
+        self.assertEqual(os.listdir(tmp_dir), ['rain.json'])
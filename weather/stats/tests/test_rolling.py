@@ -0,0 +1,96 @@
+'''Tests for the rolling window statistics.'''
+
+import random
+import unittest
+
+from ..rolling import RollingDirection, RollingWindow, WindStats
+
+
+class RollingWindowTest(unittest.TestCase):
+
+    def test_against_brute_force(self):
+        rnd = random.Random(1)
+        win = RollingWindow(60)
+        samples = []
+        t = 0
+        for i in range(500):
+            t += rnd.choice((1, 2, 5, 30))
+            v = rnd.randint(0, 40)
+            win.add(t, v)
+            samples.append((t, v))
+            live = [s for ts, s in samples if ts > t - 60]
+            self.assertEqual(len(win), len(live))
+            self.assertEqual(win.max, max(live))
+            self.assertEqual(win.min, min(live))
+            self.assertAlmostEqual(win.mean, sum(live) / len(live))
+
+    def test_empty(self):
+        win = RollingWindow(10)
+        self.assertIsNone(win.mean)
+        self.assertIsNone(win.max)
+        win.add(0, 5)
+        win.expire(10)
+        self.assertEqual(len(win), 0)
+        self.assertIsNone(win.min)
+
+    def test_max_data(self):
+        win = RollingWindow(10)
+        win.add(0, 5, 'a')
+        win.add(1, 3, 'b')
+        win.add(2, 5, 'c')
+        self.assertEqual(win.max_data, 'c')
+        self.assertEqual(win.min_data, 'b')
+
+
+class RollingDirectionTest(unittest.TestCase):
+
+    def test_wrap_around(self):
+        d = RollingDirection(60)
+        d.add(0, 350)
+        d.add(1, 10)
+        self.assertAlmostEqual(d.mean % 360, 0.0, places=6)
+
+    def test_weighted(self):
+        d = RollingDirection(60)
+        d.add(0, 90, weight=3)
+        d.add(1, 180, weight=1)
+        self.assertAlmostEqual(d.mean, 90 + 18.434948, places=5)
+
+    def test_cancel_out(self):
+        d = RollingDirection(60)
+        d.add(0, 0)
+        d.add(1, 180)
+        self.assertIsNone(d.mean)
+
+
+class WindStatsTest(unittest.TestCase):
+
+    def test_time_windows(self):
+        stats = WindStats()
+        # one sample every 2.5 seconds for 15 minutes
+        for i in range(360):
+            t = i * 2.5
+            speed = 20 if i == 200 else 5
+            stats.update(speed, 270 if i == 200 else 90, t)
+        self.assertEqual(stats.speed_2min, 5)
+        self.assertAlmostEqual(stats.speed_10min, 5 + 15 / 240.)
+        self.assertEqual(stats.gust_10min, 20)
+        self.assertEqual(stats.gust_dir_10min, 270)
+        self.assertAlmostEqual(stats.dir_2min, 90)
+
+    def test_update_fields(self):
+        stats = WindStats()
+        stats.update_fields({'WindSpeed': 4, 'WindDir': 355}, t=0)
+        self.assertEqual(stats.gust_10min, 4)
+        self.assertAlmostEqual(stats.dir_10min, 355)
+        # no direction data; the speed still counts
+        stats.update_fields({'WindSpeed': 6, 'WindDir': 0}, t=1)
+        self.assertEqual(stats.gust_10min, 6)
+        self.assertIsNone(stats.gust_dir_10min)
+        self.assertAlmostEqual(stats.dir_10min, 355)
+
+    def test_calm(self):
+        stats = WindStats()
+        stats.update(0, 0, t=0)
+        self.assertIsNone(stats.dir_2min)
+        self.assertEqual(stats.speed_2min, 0)
@@ -0,0 +1,96 @@
+'''Tests for the wind direction and wind rose helpers.'''
+
+import math
+import unittest
+
+from ..wind import (WindRose, code_to_degrees, codes_to_degrees, vector_mean,
+                    vector_mean_windows)
+
+
+class DirectionCodeTest(unittest.TestCase):
+
+    def test_scalar(self):
+        self.assertEqual(code_to_degrees(0), 0.0)
+        self.assertEqual(code_to_degrees(4), 90.0)
+        self.assertEqual(code_to_degrees(15), 337.5)
+        self.assertIsNone(code_to_degrees(255))
+        self.assertIsNone(code_to_degrees(16))
+
+    def test_sequence(self):
+        res = list(codes_to_degrees([0, 1, 8, 255]))
+        self.assertEqual(res[:3], [0.0, 22.5, 180.0])
+        self.assertTrue(math.isnan(res[3]))
+
+
+class VectorMeanTest(unittest.TestCase):
+
+    def test_wrap_around(self):
+        speed, direction = vector_mean([4, 4], [350, 10])
+        self.assertEqual(speed, 4)
+        self.assertAlmostEqual(direction % 360, 0.0, places=6)
+
+    def test_speed_weighted(self):
+        _, direction = vector_mean([10, 1], [90, 180])
+        self.assertAlmostEqual(direction, 90 + math.degrees(math.atan(0.1)))
+
+    def test_missing_and_calm(self):
+        self.assertEqual(vector_mean([], []), (None, None))
+        self.assertEqual(vector_mean([0, 0], [90, 180]), (0, None))
+        speed, direction = vector_mean([2, 4], [None, 45])
+        self.assertEqual(speed, 3)
+        self.assertAlmostEqual(direction, 45)
+
+    def test_windows(self):
+        res = vector_mean_windows([0, 100, 600, 700, 1300],
+                                  [2, 4, 5, 5, 0],
+                                  [350, 10, 90, float('nan'), 90], 600)
+        self.assertEqual(list(res['start']), [0, 600, 1200])
+        self.assertEqual(list(res['speed']), [3, 5, 0])
+        direction = list(res['direction'])
+        expected = math.degrees(math.atan(math.tan(math.radians(10)) / 3))
+        self.assertAlmostEqual(direction[0], expected)
+        self.assertAlmostEqual(direction[1], 90)
+        self.assertTrue(math.isnan(direction[2]))
+
+
+class WindRoseTest(unittest.TestCase):
+
+    def test_add(self):
+        rose = WindRose(sectors=4, speed_bins=(1, 10))
+        rose.add(5, 350)   # N, low
+        rose.add(15, 44)   # N, high
+        rose.add(15, 46)   # E, high
+        rose.add(0, 180)   # calm
+        rose.add(5, None)  # missing
+        self.assertEqual(rose.counts(), [[1, 1], [0, 1], [0, 0], [0, 0]])
+        self.assertEqual((rose.calm, rose.missing, rose.total), (1, 1, 5))
+        rows, calm = rose.frequencies()
+        self.assertEqual(rows[0], [25.0, 25.0])
+        self.assertEqual(calm, 25.0)
+
+    def test_add_archive(self):
+        rose = WindRose()
+        rose.add_archive({'WindAvg': 6, 'WindAvgDir': 4})
+        rose.add_archive({'WindAvg': 6, 'WindAvgDir': 255})
+        self.assertEqual(rose.counts()[4], [0, 1, 0, 0, 0, 0])
+        self.assertEqual(rose.missing, 1)
+
+    def test_add_many_matches_add(self):
+        speeds = [0, 2, 5, 9, 14, 30, 7, 3]
+        directions = [0, 11, 12, 95, 181, 359, float('nan'), 270]
+        one, many = WindRose(), WindRose()
+        for s, d in zip(speeds, directions):
+            one.add(s, d)
+        many.add_many(speeds, directions)
+        self.assertEqual(one.counts(), many.counts())
+        self.assertEqual((one.calm, one.missing), (many.calm, many.missing))
+
+    def test_merge(self):
+        a, b = WindRose(), WindRose()
+        a.add(5, 90)
+        b.add(5, 90)
+        b.add(0, 0)
+        a.merge(b)
+        self.assertEqual(a.counts()[4][1], 2)
+        self.assertEqual(a.calm, 1)
+        self.assertRaises(ValueError, a.merge, WindRose(sectors=8))
@@ -0,0 +1,264 @@
+"""
+Wind Direction and Wind Rose
+
+Abstract:
+Helpers for the wind fields of the archive records. The archive stores wind
+directions as 16 point compass codes (0 = N, 1 = NNE, ... 15 = NNW, 255 =
+dashed); these are mapped to degrees through a precomputed 256 entry table,
+so a whole column of codes is converted in a single lookup.
+
+vector_mean() and vector_mean_windows() compute the speed weighted vector
+mean of wind directions (an arithmetic mean of 350 and 10 degrees is 180,
+the vector mean is 0), for a set of samples or for consecutive time windows.
+
+WindRose counts samples in (direction sector, speed bin) cells. Samples are
+added as they arrive, so a long running process keeps a live wind rose
+without rescanning the archive history.
+
+With NumPy installed, the sequence functions accept any array-like and
+return NumPy arrays; otherwise they fall back to plain Python.
+
+Usage:
+>>> rose = WindRose()
+>>> for rec in archive_records:
+...     rose.add_archive(rec)
+>>> rose.frequencies()
+"""
+
+import array
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ['COMPASS_POINTS', 'code_to_degrees', 'codes_to_degrees',
+           'vector_mean', 'vector_mean_windows', 'WindRose']
+
+# names of the 16 point direction codes
+COMPASS_POINTS = ('N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+                  'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW')
+
+# degrees of every possible (byte) direction code, NaN for invalid codes
+_DEGREES = array.array(
+    'd', [i * 22.5 if i < 16 else float('nan') for i in range(256)])
+
+
+def code_to_degrees(code):
+    """
+    Return the degrees of a direction code, or None for a dashed (or
+    invalid) code.
+    """
+    if 0 <= code < 16:
+        return _DEGREES[code]
+    return None
+
+
+def codes_to_degrees(codes):
+    """
+    Return the degrees of a sequence of direction codes; dashed (or invalid)
+    codes are NaN.
+    """
+    if np is not None:
+        table = np.frombuffer(_DEGREES, dtype=np.float64)
+        codes = np.asarray(codes, dtype=np.intp)
+        valid = (codes >= 0) & (codes < 256)
+        return np.where(valid, table[np.where(valid, codes, 255)], np.nan)
+    return array.array(
+        'd', (_DEGREES[c] if 0 <= c < 256 else float('nan') for c in codes))
+
+
+def _uv(speeds, directions):
+    """
+    Return the speed weighted (u, v) components; NaN directions give 0.
+    """
+    rad = np.radians(np.asarray(directions, dtype=np.float64))
+    speeds = np.asarray(speeds, dtype=np.float64)
+    valid = ~np.isnan(rad)
+    rad = np.where(valid, rad, 0.0)
+    weight = np.where(valid, speeds, 0.0)
+    return weight * np.sin(rad), weight * np.cos(rad)
+
+
+def _direction(u, v):
+    if abs(u) < 1e-9 and abs(v) < 1e-9:
+        return None
+    return math.degrees(math.atan2(u, v)) % 360
+
+
+def vector_mean(speeds, directions):
+    """
+    Return (mean speed, vector mean direction) of wind samples; directions in
+    degrees. The direction is None when the vectors cancel out, the wind is
+    calm, or every direction is missing (None or NaN).
+    """
+    if np is not None:
+        speeds = np.asarray(speeds, dtype=np.float64)
+        if not len(speeds):
+            return None, None
+        u, v = _uv(speeds, [np.nan if d is None else d for d in directions])
+        return float(speeds.mean()), _direction(u.sum(), v.sum())
+    total = u = v = 0.0
+    count = 0
+    for speed, direction in zip(speeds, directions):
+        total += speed
+        count += 1
+        if direction is None or direction != direction:  # NaN
+            continue
+        rad = math.radians(direction)
+        u += speed * math.sin(rad)
+        v += speed * math.cos(rad)
+    if not count:
+        return None, None
+    return total / count, _direction(u, v)
+
+
+def vector_mean_windows(times, speeds, directions, window):
+    """
+    Return the vector means of consecutive time windows, as a dict of
+    'start', 'speed' and 'direction' sequences (one value per window with
+    samples, in time order). 'times' and 'window' are in seconds; windows
+    start at multiples of 'window'. Directions without a mean are NaN.
+    """
+    if np is not None:
+        times = np.asarray(times, dtype=np.float64)
+        starts = np.floor(times / window) * window
+        start, index = np.unique(starts, return_inverse=True)
+        u, v = _uv(speeds, directions)
+        count = np.bincount(index, minlength=len(start))
+        speed = np.bincount(index, np.asarray(speeds, dtype=np.float64),
+                            len(start)) / count
+        u = np.bincount(index, u, len(start))
+        v = np.bincount(index, v, len(start))
+        direction = np.degrees(np.arctan2(u, v)) % 360
+        calm = (np.abs(u) < 1e-9) & (np.abs(v) < 1e-9)
+        direction[calm] = np.nan
+        return {'start': start, 'speed': speed, 'direction': direction}
+
+    groups = {}
+    for t, speed, direction in zip(times, speeds, directions):
+        group = groups.setdefault(math.floor(t / window) * window, ([], []))
+        group[0].append(speed)
+        group[1].append(direction)
+    res = {'start': [], 'speed': [], 'direction': []}
+    for start in sorted(groups):
+        speed, direction = vector_mean(*groups[start])
+        res['start'].append(start)
+        res['speed'].append(speed)
+        res['direction'].append(
+            float('nan') if direction is None else direction)
+    return res
+
+
+class WindRose(object):
+    """
+    Incremental wind rose histogram. Samples with a speed below 'calm' are
+    counted as calm; the others are counted in one of 'sectors' direction
+    sectors (centered on north) and in one of the speed bins. 'speed_bins'
+    are the lower edges of the bins; the last bin is open ended. Samples
+    without a direction are counted as missing.
+    """
+
+    def __init__(self, sectors=16, speed_bins=(1, 4, 8, 13, 19, 25),
+                 calm=1):
+        self.sectors = sectors
+        self.speed_bins = tuple(speed_bins)
+        self.calm_limit = calm
+        self._width = 360.0 / sectors
+        self._counts = array.array('q', [0] * (sectors * len(speed_bins)))
+        self.calm = 0
+        self.missing = 0
+
+    def _cell(self, speed, direction):
+        sector = int((direction + self._width / 2) // self._width)
+        sector %= self.sectors
+        bin_ = 0
+        while (bin_ + 1 < len(self.speed_bins) and
+               speed >= self.speed_bins[bin_ + 1]):
+            bin_ += 1
+        return sector * len(self.speed_bins) + bin_
+
+    def add(self, speed, direction):
+        """
+        Add a sample; direction in degrees, or None.
+        """
+        if speed < self.calm_limit:
+            self.calm += 1
+        elif direction is None or direction != direction:  # NaN
+            self.missing += 1
+        else:
+            self._counts[self._cell(speed, direction)] += 1
+
+    def add_code(self, speed, code):
+        """
+        Add a sample with a direction code.
+        """
+        self.add(speed, code_to_degrees(code))
+
+    def add_archive(self, record):
+        """
+        Add the average wind of an archive record.
+        """
+        self.add_code(record['WindAvg'], record['WindAvgDir'])
+
+    def add_many(self, speeds, directions):
+        """
+        Add a sequence of samples; directions in degrees (NaN for missing).
+        """
+        if np is None:
+            for speed, direction in zip(speeds, directions):
+                self.add(speed, direction)
+            return
+        speeds = np.asarray(speeds, dtype=np.float64)
+        directions = np.asarray(directions, dtype=np.float64)
+        calm = speeds < self.calm_limit
+        missing = ~calm & np.isnan(directions)
+        self.calm += int(calm.sum())
+        self.missing += int(missing.sum())
+        valid = ~(calm | missing)
+        speeds, directions = speeds[valid], directions[valid]
+        sector = np.floor_divide(directions + self._width / 2, self._width)
+        sector = sector.astype(np.intp) % self.sectors
+        bin_ = np.searchsorted(self.speed_bins, speeds, side='right') - 1
+        bin_ = np.maximum(bin_, 0)
+        cells = np.bincount(sector * len(self.speed_bins) + bin_,
+                            minlength=len(self._counts))
+        counts = np.frombuffer(self._counts, dtype=np.int64)
+        counts += cells.astype(np.int64)
+
+    def merge(self, other):
+        """
+        Add the counts of another WindRose with the same bins.
+        """
+        if (other.sectors, other.speed_bins) != (self.sectors,
+                                                 self.speed_bins):
+            raise ValueError('wind rose bins do not match')
+        for i, count in enumerate(other._counts):
+            self._counts[i] += count
+        self.calm += other.calm
+        self.missing += other.missing
+
+    @property
+    def total(self):
+        return sum(self._counts) + self.calm + self.missing
+
+    def counts(self):
+        """
+        Return the counts as a list of rows, one row per sector (starting at
+        north), one column per speed bin.
+        """
+        n = len(self.speed_bins)
+        return [list(self._counts[i * n:(i + 1) * n])
+                for i in range(self.sectors)]
+
+    def frequencies(self):
+        """
+        Return the counts() as percentages of the samples with a speed and
+        direction (or calm), and the calm percentage: (rows, calm).
+        """
+        total = self.total - self.missing
+        if not total:
+            return self.counts(), 0.0
+        return ([[100.0 * c / total for c in row] for row in self.counts()],
+                100.0 * self.calm / total)
@@ -2,3 +2,5 @@ from .temp import *
 from .precip import *
 from .wind import *
 from .pressure import *
+from .convert import *
+from .astro import *
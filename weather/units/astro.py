@@ -1,100 +1,171 @@
 #! /usr/bin/env python
 
-from math import *
+#
+# Sunrise / sunset calculations, using the algorithm from the Almanac for
+# Computers (1990), published by the US Naval Observatory.
+#
 
-# 90 degrees 50 minutes
-zenith = -0.01454
+import collections
+import datetime
+import functools
+import math
 
+__doc__ = '''
+astronomical calculation functions
 
-def radians_to_degrees(radians):
-    return radians * (180 / pi)
+All times are returned in hours (e.g. 6.5 is 06:30) in the time zone given by
+the 'tz' offset (hours east of UTC). Sunrise and sunset are None (NaN for
+sun_events_range) on days when the sun does not rise or set.
+'''
+__usage__ = 'this module should not be run via the command line'
 
-def degrees_to_radians(degrees):
-    return (degrees * pi) / 180
+__all__ = ['SolarEvents', 'sun_events', 'sun_events_range', 'daylight',
+           'hours_to_hhmm']
 
+# cos() of the official zenith for sunrise/sunset: 90 degrees 50 minutes
+zenith = -0.01454
 
-def _daylight(n, t, lat, long, tz, day, month, year, rise=1):
-    lngHour = int / 15.0
+SolarEvents = collections.namedtuple(
+    'SolarEvents', ('sunrise', 'sunset', 'noon', 'day_length'))
 
-    # calculate the Sun's mean anomaly
-    m = (0.9856 * t) - 3.289
 
-    # calculate the Sun's true longitude
-    opA = 1.916 * sin(radians(m))
-    opB = 0.020 * sin(2 * radians(m))
-    l = m + opA + opB + 282.634
-    if l > 360:
-        l = l - 360
-    if l < 0:
-        l = l + 360
-
-    # calculate the Sun's right ascension
-    foo = 0.91764 * tan(degrees_to_radians(l))
-    ra = radians_to_degrees(atan(foo))
-
-    # right ascension value needs to be in the same quadrant as l
-    lQuandrant = (floor(l / 90)) * 90
-    raQuandrant = (floor(ra / 90)) * 90
-    ra = ra + (lQuandrant - raQuandrant)
-
-    # right ascension value needs to converted to hours
-    ra = ra / 15
+def radians_to_degrees(radians):
+    return radians * (180 / math.pi)
 
-    # calculate the Sun's declination
-    sinDec = 0.39782 * sin(radians(l))
-    cosDec = cos(asin(sinDec))
 
-    # calculate the Sun's local hour angle
-    numerator = sinDec * sin(radians(lat))
-    denomenator = cosDec * cos(radians(lat))
-    cosH = (zenith - numerator) / denomenator
+def degrees_to_radians(degrees):
+    return (degrees * math.pi) / 180
+
+
+class _ScalarMath(object):
+    '''
+    The subset of the numpy interface used by _solar_time(), for floats.
+    '''
+    sin = staticmethod(math.sin)
+    cos = staticmethod(math.cos)
+    tan = staticmethod(math.tan)
+    arctan = staticmethod(math.atan)
+    arcsin = staticmethod(math.asin)
+    floor = staticmethod(math.floor)
+    radians = staticmethod(math.radians)
+    degrees = staticmethod(math.degrees)
+
+    @staticmethod
+    def arccos(x):
+        return math.acos(x) if -1 <= x <= 1 else float('nan')
+
+
+def _solar_time(xp, n, lat, lon, tz, rise):
+    '''
+    Return the local time (hours) of sunrise, or sunset if 'rise' is False,
+    on day of year 'n'. 'xp' is the numpy module, or _ScalarMath.
+    '''
+    lng_hour = lon / 15.0
+    t = n + (((6 if rise else 18) - lng_hour) / 24.0)
+
+    # the Sun's mean anomaly and true longitude
+    m = (0.9856 * t) - 3.289
+    l = (m + 1.916 * xp.sin(xp.radians(m)) +
+         0.020 * xp.sin(2 * xp.radians(m)) + 282.634) % 360
 
-    if (cosH > 1) or (cosH < -1):
-        # the sun don't shine here son (on the specified date)
-        return None
+    # the Sun's right ascension, in the same quadrant as l, in hours
+    ra = xp.degrees(xp.arctan(0.91764 * xp.tan(xp.radians(l)))) % 360
+    ra = ra + (xp.floor(l / 90) * 90 - xp.floor(ra / 90) * 90)
+    ra = ra / 15
 
-    # finish calulating h and convert into hours
+    # the Sun's declination and local hour angle
+    sin_dec = 0.39782 * xp.sin(xp.radians(l))
+    cos_dec = xp.cos(xp.arcsin(sin_dec))
+    cos_h = ((zenith - sin_dec * xp.sin(xp.radians(lat))) /
+             (cos_dec * xp.cos(xp.radians(lat))))
+    h = xp.degrees(xp.arccos(cos_h))
     if rise:
-        h = 360 - radians_to_degrees(acos(cosH))
-    else:
-        h = radians_to_degrees(acos(cosH))
+        h = 360 - h
     h = h / 15
-    
-    # calculate local mean time of rising / setting
-    T = h + ra - (0.06571 * t) - 6.622
-
-    # adjust back to UTC
-    UT = T - lngHour
-    
-    # convert UT value to local time zone of lat/long
-    localT = UT + tz
-
-    hour = int(localT)
-    min = 60 * (localT % hour)
-    if hour < 0:
-        hour = 24 + hour - 1
-    if min < 0:
-        min = 60 + min
-    return (year, month, day, hour, min, 0, 0, 0, 0)
-
-    
+
+    # local mean time of rising / setting, in UTC and then local time
+    ut = (h + ra - (0.06571 * t) - 6.622 - lng_hour) % 24
+    return (ut + tz) % 24
+
+
+def _events(rise, set_):
+    '''
+    Return (noon, day length) from sunrise and sunset times.
+    '''
+    length = (set_ - rise) % 24
+    return (rise + length / 2) % 24, length
+
+
+@functools.lru_cache(maxsize=4096)
+def sun_events(lat, lon, date, tz=0.0):
+    '''
+    Return the SolarEvents for 'date' (a datetime.date) at a location. The
+    results are cached per (lat, lon, date, tz).
+    '''
+    n = date.timetuple().tm_yday
+    rise = _solar_time(_ScalarMath, n, lat, lon, tz, True)
+    set_ = _solar_time(_ScalarMath, n, lat, lon, tz, False)
+    if math.isnan(rise) or math.isnan(set_):
+        return SolarEvents(None, None, None, None)
+    return SolarEvents(rise, set_, *_events(rise, set_))
+
+
+def sun_events_range(lat, lon, start, end, tz=0.0):
+    '''
+    Return the solar events for every date from 'start' up to (but not
+    including) 'end', as a dict of 'date', 'sunrise', 'sunset', 'noon' and
+    'day_length' sequences. With numpy, all days are computed in one
+    vectorized pass and the sequences are numpy arrays.
+    '''
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is None:
+        days = [start + datetime.timedelta(days=i)
+                for i in range((end - start).days)]
+        events = [sun_events(lat, lon, d, tz) for d in days]
+        res = {'date': days}
+        for i, name in enumerate(SolarEvents._fields):
+            res[name] = [float('nan') if e[i] is None else e[i]
+                         for e in events]
+        return res
+
+    days = np.arange(start, end, dtype='datetime64[D]')
+    n = (days - days.astype('datetime64[Y]')).astype(int) + 1
+    with np.errstate(invalid='ignore'):
+        rise = _solar_time(np, n, lat, lon, tz, True)
+        set_ = _solar_time(np, n, lat, lon, tz, False)
+        valid = ~(np.isnan(rise) | np.isnan(set_))
+        rise = np.where(valid, rise, np.nan)
+        set_ = np.where(valid, set_, np.nan)
+    noon, length = _events(rise, set_)
+    return {'date': days, 'sunrise': rise, 'sunset': set_, 'noon': noon,
+            'day_length': length}
+
+
+def hours_to_hhmm(hours):
+    '''
+    Format a time in hours as "HH:MM", like the VantagePro SunRise and
+    SunSet fields.
+    '''
+    return '%02d:%02d' % divmod(int(round(hours * 60)) % 1440, 60)
+
+
 def daylight(lat, long, tz, day, month, year):
-    # calc the day of the year
-    n1 = floor(275 * month / 9)
-    n2 = floor((month + 9) / 12)
-    n3 = (1 + floor((year - 4 * floor(year / 4) + 2) / 3))
-    n = n1 - (n2 * n3) + day - 30
-
-    # convert the long to hour value and calc an approximate time
-    lngHour = int / 15.0
-    
-    t = n + ((6 - lngHour) / 24.0)
-    sunrise = _daylight(n, t, lat, int, tz, day, month, year, 1)
-    
-    t = n + ((18 - lngHour) / 24.0)
-    sunset = _daylight(n, t, lat, int, tz, day, month, year, 0)
-
-    return (sunrise, sunset)
+    '''
+    Return the (sunrise, sunset) times as time tuples, or None for each event
+    that does not occur on the date.
+    '''
+    events = sun_events(lat, long, datetime.date(year, month, day), tz)
+
+    def _tuple(hours):
+        if hours is None:
+            return None
+        hour, min_ = divmod(int(round(hours * 60)) % 1440, 60)
+        return (year, month, day, hour, min_, 0, 0, 0, 0)
+
+    return (_tuple(events.sunrise), _tuple(events.sunset))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+#
+# See __doc__ for an explanation of what this module does
+#
+
+from . import pressure, temp, wind
+
+__doc__ = '''
+composable unit converter registry
+
+Every '<unit>_to_<unit>' function of the temp, pressure and wind modules is
+registered as an edge of a unit graph. converter(src, dst) finds the path
+between any two connected units and fuses it into a single affine converter
+(value * scale + offset). Converters are cached by (src, dst), so each path
+is resolved only once:
+
+>>> from weather.units import converter
+>>> in60_to_kpa = converter('in60', 'kpa')
+>>> in60_to_kpa(29.92)
+101.0353...
+
+Direct conversion functions are preferred over chains. When no chain of
+existing functions leads from src to dst, inverted functions are used (e.g.
+after register('mb', 'bar', func), bar -> mb uses the inverse of 'func').
+
+Unit names are taken from the function names, and are case insensitive. See
+ALIASES for the alternative names that are accepted.
+'''
+__usage__ = 'this module should not be run via the command line'
+
+__all__ = ['Converter', 'converter', 'convert', 'register', 'units']
+
+# alternative unit names
+ALIASES = {
+    'c': 'celsius', 'f': 'fahrenheit', 'k': 'kelvin', 'r': 'rankine',
+    'inhg': 'in', 'inches': 'in', 'incconv': 'in',
+    'inhg32': 'in32', 'inhg60': 'in60',
+    'lbs': 'lb_sqin', 'psi': 'lb_sqin', 'psf': 'lb_sqft',
+    'mmhg': 'mm32', 'mmhg32': 'mm32', 'mmhg60': 'mm60',
+    'kt': 'knots', 'kts': 'knots', 'kph': 'km_hr', 'mps': 'm_sec',
+}
+
+# functions where the name does not describe the conversion, with the
+# (src, dst) units that match the coefficients
+OVERRIDES = {
+    # the coefficients convert to inches, not millimeters, of mercury
+    'lb_sqin_to_mm32': ('lb_sqin', 'in32'),
+    'lb_sqin_to_mm60': ('lb_sqin', 'in60'),
+    # 3.386389 is the kPa/inHg coefficient, and kPa * 1000 is Pa
+    'incConv_to_Pa': ('in', 'kpa'),
+    'incConv_to_kPa': ('in', 'pa'),
+}
+
+# registered edges, {src: {dst: (scale, offset)}}
+_EDGES = {}
+# resolved converters, {(src, dst): Converter}
+_CACHE = {}
+
+
+def _affine(func):
+    '''
+    Return the (scale, offset) coefficients of an affine conversion function.
+    '''
+    offset = func(0.0)
+    scale = func(1.0) - offset
+    for x in (-40.0, 100.0, 1013.25):
+        if abs(func(x) - (x * scale + offset)) > 1e-9 * max(1.0, abs(func(x))):
+            raise ValueError('%s is not affine' % func.__name__)
+    return scale, offset
+
+
+def _unit(name):
+    name = name.lower()
+    return ALIASES.get(name, name)
+
+
+class Converter(object):
+    '''
+    Fused affine unit conversion: value * scale + offset.
+    '''
+    __slots__ = ('src', 'dst', 'scale', 'offset')
+
+    def __init__(self, src, dst, scale, offset):
+        self.src = src
+        self.dst = dst
+        self.scale = scale
+        self.offset = offset
+
+    def __call__(self, value):
+        return value * self.scale + self.offset
+
+    def __repr__(self):
+        return 'Converter(%r, %r, scale=%r, offset=%r)' % (
+            self.src, self.dst, self.scale, self.offset)
+
+
+def register(src, dst, func):
+    '''
+    Register the affine conversion function 'func' from 'src' to 'dst' units.
+    '''
+    src, dst = _unit(src), _unit(dst)
+    _EDGES.setdefault(src, {})[dst] = _affine(func)
+    _EDGES.setdefault(dst, {})
+    _CACHE.clear()
+
+
+def units():
+    '''
+    Return the sorted list of known unit names.
+    '''
+    return sorted(_EDGES)
+
+
+def _edges(unit, inverse):
+    for dst, coef in _EDGES[unit].items():
+        yield dst, coef
+    if inverse:
+        for src, edges in _EDGES.items():
+            if unit in edges and src not in _EDGES[unit]:
+                scale, offset = edges[unit]
+                yield src, (1.0 / scale, -offset / scale)
+
+
+def _find_path(src, dst, inverse):
+    '''
+    Breadth first search; return the list of (scale, offset) edge
+    coefficients from 'src' to 'dst', or None.
+    '''
+    prev = {src: None}
+    queue = [src]
+    for unit in queue:
+        if unit == dst:
+            path = []
+            while prev[unit] is not None:
+                unit, coef = prev[unit]
+                path.append(coef)
+            return path[::-1]
+        for nxt, coef in _edges(unit, inverse):
+            if nxt not in prev:
+                prev[nxt] = (unit, coef)
+                queue.append(nxt)
+    return None
+
+
+def converter(src, dst):
+    '''
+    Return the fused Converter from 'src' to 'dst' units.
+    '''
+    key = (src, dst)
+    conv = _CACHE.get(key)
+    if conv is not None:
+        return conv
+    s, d = _unit(src), _unit(dst)
+    if s not in _EDGES or d not in _EDGES:
+        raise ValueError('unknown unit: %s' % (d if s in _EDGES else s,))
+    path = _find_path(s, d, False)
+    if path is None:
+        path = _find_path(s, d, True)
+    if path is None:
+        raise ValueError('no conversion from %s to %s' % (src, dst))
+    scale, offset = 1.0, 0.0
+    for s_, o_ in path:
+        scale, offset = scale * s_, offset * s_ + o_
+    conv = _CACHE[key] = Converter(s, d, scale, offset)
+    return conv
+
+
+def convert(value, src, dst):
+    '''
+    Convert a single value from 'src' to 'dst' units.
+    '''
+    return converter(src, dst)(value)
+
+
+def _register_module(module):
+    for name, func in sorted(vars(module).items()):
+        if (callable(func) and '_to_' in name and not name.startswith('_')
+                and getattr(func, '__module__', None) == module.__name__):
+            src, dst = OVERRIDES.get(name) or name.split('_to_')
+            register(src, dst, func)
+
+
+for _module in (temp, pressure, wind):
+    _register_module(_module)
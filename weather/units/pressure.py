@@ -13,9 +13,49 @@ __author__ = 'Christopher Blunck'
 __email__ = 'chris@wxnet.org'
 __revision__ = '$Revision: 1.6 $'
 
-__doc__ = 'pressure related conversion functions'
+import functools
+import math
+
+__doc__ = '''
+pressure related conversion functions
+
+The station pressure / sea level pressure / altimeter setting functions use
+millibars (hPa), an elevation in meters and a temperature in Celsius. The
+sea level reduction uses the hypsometric equation, with the mean temperature
+of the air column between the station and sea level estimated from the
+station temperature and the standard lapse rate:
+
+   p0 = p * e ** (g * h / (Rd * (T + 273.15 + 0.0065 * h / 2)))
+
+The altimeter setting uses the NWS (ASOS) formula, which assumes a standard
+atmosphere and no temperature; as published, it uses a sea level temperature
+of 288 K (not 288.15 K):
+
+   A = ((p - 0.3) ** n + 1013.25 ** n * 0.0065 / 288 * h) ** (1 / n)
+
+with n = 0.190284.
+
+The elevation dependent constants are computed once per elevation (see
+PressureReduction). The formulas only use arithmetic operators, so the
+PressureReduction methods accept NumPy arrays as well; see the vec module for
+the vectorized functions.
+'''
 __usage__ = 'this module should not be run via the command line'
 
+__all__ = ['atm_to_in32', 'atm_to_in60', 'atm_to_mb', 'atm_to_pa',
+           'atm_to_lb_sqin', 'in32_to_mb', 'in32_to_atm', 'in32_to_lbs',
+           'in60_to_mb', 'in60_to_atm', 'in60_to_lbs', 'incConv_to_Pa',
+           'incConv_to_kPa', 'mb_to_atm', 'mb_to_hpa', 'mb_to_in32',
+           'mb_to_in60', 'mb_to_kpa', 'mb_to_mm32', 'mb_to_mm60',
+           'mb_to_n_sqm', 'mb_to_pa', 'mb_to_lb_sqft', 'mb_to_lb_sqin',
+           'mm32_to_mb', 'mm60_to_mb', 'n_sqm_to_mb', 'pa_to_atm', 'pa_to_mb',
+           'hpa_to_mb', 'kpa_to_mb', 'lb_sqft_to_mb', 'lb_sqin_to_atm',
+           'lb_sqin_to_mm32', 'lb_sqin_to_mm60', 'lb_sqin_to_mb',
+           'hpa_to_inches', 'GRAVITY', 'GAS_CONSTANT', 'LAPSE_RATE',
+           'STD_PRESSURE', 'STD_TEMP', 'PressureReduction',
+           'pressure_reduction', 'sea_level_pressure', 'station_pressure',
+           'altimeter_setting']
+
 
 def atm_to_in32(atm):
     """Atmospheres (atm) to inches of mercury @32F (inHg32)"""
@@ -207,3 +247,61 @@ def lb_sqin_to_mb(lbs):
 
 def hpa_to_inches(hpa):
     return hpa / 33.87
+
+
+# gravity (m/s**2), gas constant of dry air (J/(kg K)), and the standard
+# atmosphere lapse rate (K/m), sea level pressure (mb) and temperature (K)
+GRAVITY = 9.80665
+GAS_CONSTANT = 287.05
+LAPSE_RATE = 0.0065
+STD_PRESSURE = 1013.25
+STD_TEMP = 288.15
+# exponent and sea level temperature (K) of the NWS altimeter setting formula
+_ALT_N = 0.190284
+_ALT_TEMP = 288.0
+
+
+class PressureReduction(object):
+    """
+    Pressure reduction constants for a station 'elevation' (meters).
+    """
+
+    def __init__(self, elevation):
+        self.elevation = elevation
+        self._k = GRAVITY * elevation / GAS_CONSTANT
+        self._t = 273.15 + LAPSE_RATE * elevation / 2
+        self._alt = (STD_PRESSURE ** _ALT_N * LAPSE_RATE / _ALT_TEMP *
+                     elevation)
+
+    def sea_level(self, station_mb, temp_c):
+        """Station pressure (mb) to sea level pressure (mb)"""
+        return station_mb * math.e ** (self._k / (temp_c + self._t))
+
+    def station(self, sea_level_mb, temp_c):
+        """Sea level pressure (mb) to station pressure (mb)"""
+        return sea_level_mb * math.e ** (-self._k / (temp_c + self._t))
+
+    def altimeter(self, station_mb):
+        """Station pressure (mb) to altimeter setting (mb)"""
+        return ((station_mb - 0.3) ** _ALT_N + self._alt) ** (1 / _ALT_N)
+
+
+@functools.lru_cache(maxsize=64)
+def pressure_reduction(elevation):
+    """Return the (cached) PressureReduction of an elevation (meters)"""
+    return PressureReduction(elevation)
+
+
+def sea_level_pressure(station_mb, elevation, temp_c):
+    """Station pressure (mb) to sea level pressure (mb)"""
+    return pressure_reduction(elevation).sea_level(station_mb, temp_c)
+
+
+def station_pressure(sea_level_mb, elevation, temp_c):
+    """Sea level pressure (mb) to station pressure (mb)"""
+    return pressure_reduction(elevation).station(sea_level_mb, temp_c)
+
+
+def altimeter_setting(station_mb, elevation):
+    """Station pressure (mb) to altimeter setting (mb)"""
+    return pressure_reduction(elevation).altimeter(station_mb)
@@ -8,8 +8,13 @@
 # -Christopher Blunck
 #
 
+import array
 import math
+import mmap
+import os
+import struct
 import sys
+import zlib
 
 __author__ = 'Christopher Blunck'
 __email__ = 'chris@wxnet.org'
@@ -18,6 +23,15 @@ __revision__ = '$Revision: 1.6 $'
 __doc__ = 'temperature related conversion functions'
 __usage__ = 'this module should not be run via the command line'
 
+__all__ = ['celsius_to_fahrenheit', 'celsius_to_kelvin', 'celsius_to_rankine',
+           'fahrenheit_to_celsius', 'fahrenheit_to_kelvin',
+           'fahrenheit_to_rankine', 'kelvin_to_celsius',
+           'kelvin_to_fahrenheit', 'kelvin_to_rankine', 'rankine_to_celsius',
+           'rankine_to_fahrenheit', 'rankine_to_kelvin', 'calc_heat_index',
+           'calc_wind_chill', 'calc_humidity', 'calc_dewpoint',
+           'calc_dewpoint_davis', 'LookupTable', 'dewpoint_table',
+           'heat_index_table']
+
 
 def celsius_to_fahrenheit(c):
     """Degrees Celsius (C) to degrees Fahrenheit (F)"""
@@ -156,3 +170,121 @@ def calc_dewpoint_davis(temp, hum):
     n = 243.12 * (math.log(v)) - 440.1
     d = 19.43 - math.log(v)
     return n / d
+
+
+class LookupTable(object):
+    """
+    Precomputed values of a (temp, hum) function over the Davis input grid:
+    temperature from -40 to 150 F in 0.1 F steps, and humidity from 0 to 100
+    percent in 1 percent steps. The table is stored as array('d') (so the
+    values are those of the function), and is built on first use. If
+    'cache_file' is given, the table is read from (and, the first time,
+    written to) that file, and memory-mapped; close() unmaps it. The file
+    header identifies the function (name and a checksum of its code), so a
+    cache of another function, or of an older version, is rebuilt.
+
+    Calling the table returns the precomputed value for inputs on the grid,
+    and falls back to the original function for all other inputs.
+    """
+    TEMP_MIN = -400  # in 0.1 F steps
+    TEMP_MAX = 1500
+    HUM_MAX = 100
+    # magic, version, grid size, checksum and name of the function
+    HEADER = struct.Struct('<4sIIII64s')
+    MAGIC = b'PWLT'
+    VERSION = 2
+
+    def __init__(self, func, cache_file=None):
+        self.func = func
+        self.cache_file = cache_file
+        self.n_temp = self.TEMP_MAX - self.TEMP_MIN + 1
+        self.n_hum = self.HUM_MAX + 1
+        self._table = None
+        self._mmap = None
+
+    @property
+    def table(self):
+        if self._table is None:
+            if self.cache_file:
+                self._table = self._load()
+            else:
+                self._table = self._build()
+        return self._table
+
+    def _build(self):
+        func, n_hum = self.func, self.n_hum
+        table = array.array('d', bytes(8 * self.n_temp * n_hum))
+        i = 0
+        for t in range(self.TEMP_MIN, self.TEMP_MAX + 1):
+            temp = t / 10.0
+            for hum in range(n_hum):
+                try:
+                    table[i] = func(temp, hum)
+                except (ValueError, ZeroDivisionError):
+                    table[i] = float('nan')
+                i += 1
+        return table
+
+    def _header(self):
+        func = self.func
+        code = getattr(func, '__code__', None)
+        checksum = zlib.crc32(code.co_code) if code else 0
+        name = '%s.%s' % (getattr(func, '__module__', ''),
+                          getattr(func, '__qualname__', repr(func)))
+        return self.HEADER.pack(self.MAGIC, self.VERSION, self.n_temp,
+                                self.n_hum, checksum, name.encode()[:64])
+
+    def _load(self):
+        header = self._header()
+        size = len(header) + 8 * self.n_temp * self.n_hum
+        try:
+            with open(self.cache_file, 'rb') as fh:
+                valid = (fh.read(len(header)) == header and
+                         os.fstat(fh.fileno()).st_size == size)
+        except FileNotFoundError:
+            valid = False
+        if not valid:
+            tmp_name = '%s.%d.tmp' % (self.cache_file, os.getpid())
+            with open(tmp_name, 'wb') as fh:
+                fh.write(header)
+                self._build().tofile(fh)
+            os.replace(tmp_name, self.cache_file)
+        with open(self.cache_file, 'rb') as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mmap)[len(header):].cast('d')
+
+    def close(self):
+        """
+        Release the table, and unmap the cache file; the table is loaded
+        again on the next use.
+        """
+        if isinstance(self._table, memoryview):
+            self._table.release()
+        self._table = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def index(self, temp, hum):
+        """
+        Return the table index of (temp, hum), or None when off the grid.
+        """
+        t = round(temp * 10)
+        if (self.TEMP_MIN <= t <= self.TEMP_MAX and 0 <= hum <= self.HUM_MAX
+                and hum == int(hum) and abs(temp * 10 - t) < 1e-6):
+            return (t - self.TEMP_MIN) * self.n_hum + int(hum)
+        return None
+
+    def __call__(self, temp, hum):
+        try:
+            i = self.index(temp, hum)
+        except TypeError:
+            i = None
+        if i is None:
+            return self.func(temp, hum)
+        return self.table[i]
+
+
+# lookup tables for the derived values computed from every LOOP reading
+dewpoint_table = LookupTable(calc_dewpoint)
+heat_index_table = LookupTable(calc_heat_index)
@@ -0,0 +1,62 @@
+'''Tests for the astro module.'''
+
+import datetime
+import sys
+import unittest
+from unittest import mock
+
+from ..astro import daylight, hours_to_hhmm, sun_events, sun_events_range
+
+
+class TestAstro(unittest.TestCase):
+
+    def test_daylight(self):
+        # Morris County, NJ; EDT
+        sunrise, sunset = daylight(40.9, -74.3, -4, 14, 4, 2003)
+        self.assertEqual(sunrise[:3], (2003, 4, 14))
+        self.assertAlmostEqual(sunrise[3] * 60 + sunrise[4], 6 * 60 + 22,
+                               delta=5)
+        self.assertAlmostEqual(sunset[3] * 60 + sunset[4], 19 * 60 + 36,
+                               delta=5)
+
+    def test_southern_hemisphere(self):
+        # Sydney, AEDT
+        ev = sun_events(-33.9, 151.2, datetime.date(2003, 1, 1), 11)
+        self.assertAlmostEqual(ev.sunrise, 5 + 47 / 60., delta=3 / 60.)
+        self.assertAlmostEqual(ev.sunset, 20 + 9 / 60., delta=3 / 60.)
+        self.assertAlmostEqual(ev.day_length, ev.sunset - ev.sunrise)
+        self.assertAlmostEqual(ev.noon, 12.97, places=1)
+
+    def test_polar_day(self):
+        ev = sun_events(78.2, 15.6, datetime.date(2003, 6, 21))
+        self.assertIsNone(ev.sunrise)
+        self.assertIsNone(ev.sunset)
+        self.assertEqual(daylight(78.2, 15.6, 0, 21, 6, 2003), (None, None))
+
+    def test_cached(self):
+        sun_events.cache_clear()
+        sun_events(10.0, 20.0, datetime.date(2020, 1, 1))
+        sun_events(10.0, 20.0, datetime.date(2020, 1, 1))
+        self.assertEqual(sun_events.cache_info().hits, 1)
+
+    def _check_range(self):
+        start = datetime.date(2003, 12, 30)
+        res = sun_events_range(40.9, -74.3, start, datetime.date(2004, 1, 3),
+                               -5)
+        self.assertEqual(len(res['sunrise']), 4)
+        for i in range(4):
+            ev = sun_events(40.9, -74.3, start + datetime.timedelta(days=i),
+                            -5)
+            for name in ('sunrise', 'sunset', 'noon', 'day_length'):
+                self.assertAlmostEqual(res[name][i], getattr(ev, name))
+
+    def test_range(self):
+        self._check_range()
+
+    def test_range_without_numpy(self):
+        with mock.patch.dict(sys.modules, {'numpy': None}):
+            self._check_range()
+
+    def test_hhmm(self):
+        self.assertEqual(hours_to_hhmm(6.0 + 59.9 / 60), '07:00')
+        self.assertEqual(hours_to_hhmm(23.999), '00:00')
@@ -0,0 +1,56 @@
+'''Tests for the unit converter registry.'''
+
+import unittest
+
+from ..convert import _CACHE, _EDGES, converter, convert, register
+from ..pressure import *
+from ..temp import *
+from ..wind import *
+
+
+class TestConverter(unittest.TestCase):
+
+    def assertClose(self, a, b):
+        self.assertAlmostEqual(a, b, delta=1e-9 * max(1.0, abs(b)))
+
+    def test_direct_functions(self):
+        for src, dst, func in (
+                ('in32', 'mb', in32_to_mb),
+                ('mb', 'kpa', mb_to_kpa),
+                ('fahrenheit', 'celsius', fahrenheit_to_celsius),
+                ('kelvin', 'fahrenheit', kelvin_to_fahrenheit),
+                ('mph', 'knots', mph_to_knots)):
+            for v in (-40.0, 0.0, 29.92, 1013.25):
+                self.assertClose(convert(v, src, dst), func(v))
+
+    def test_chained(self):
+        for v in (26.58, 29.92, 31.01):
+            self.assertClose(converter('in60', 'kpa')(v),
+                             mb_to_kpa(in60_to_mb(v)))
+            self.assertClose(converter('inHg60', 'kPa')(v),
+                             mb_to_kpa(in60_to_mb(v)))
+        self.assertClose(convert(20, 'mph', 'm_sec'), mph_to_m_sec(20))
+
+    def test_name_overrides(self):
+        self.assertClose(convert(14.696, 'psi', 'in32'),
+                         lb_sqin_to_mm32(14.696))
+        self.assertClose(convert(1.0, 'in', 'kpa'), incConv_to_Pa(1.0))
+
+    def test_cached(self):
+        self.assertIs(converter('mb', 'in32'), converter('mb', 'in32'))
+
+    def test_errors(self):
+        self.assertRaises(ValueError, converter, 'mb', 'celsius')
+        self.assertRaises(ValueError, converter, 'furlongs', 'mb')
+
+    def test_register(self):
+        register('mb', 'bar', lambda mb: mb * 0.001)
+        try:
+            self.assertClose(convert(29.92, 'in32', 'bar'),
+                             in32_to_mb(29.92) * 0.001)
+            # only reachable through the inverse of the new function
+            self.assertClose(convert(1.0, 'bar', 'in32'), mb_to_in32(1000.0))
+        finally:
+            del _EDGES['bar']
+            del _EDGES['mb']['bar']
+            _CACHE.clear()
@@ -0,0 +1,48 @@
+'''Tests for the temperature lookup tables.'''
+
+import os
+import tempfile
+import unittest
+
+from ..temp import (LookupTable, calc_dewpoint, calc_heat_index,
+                    dewpoint_table, heat_index_table)
+
+
+class TestLookupTable(unittest.TestCase):
+
+    def test_grid_values(self):
+        for temp in (-40.0, -12.3, 0.0, 72.1, 79.9, 80.0, 101.7, 150.0):
+            for hum in (1, 35, 78, 100):
+                # double precision; the same values as the functions
+                self.assertEqual(dewpoint_table(temp, hum),
+                                 calc_dewpoint(temp, hum))
+                self.assertEqual(heat_index_table(temp, hum),
+                                 calc_heat_index(temp, hum))
+
+    def test_off_grid_fallback(self):
+        for temp, hum in ((72.15, 50), (72.1, 50.5), (-50.0, 10),
+                          (151.0, 10), (70.0, 101)):
+            self.assertIsNone(dewpoint_table.index(temp, hum))
+            self.assertEqual(dewpoint_table(temp, hum),
+                             calc_dewpoint(temp, hum))
+
+    def test_cache_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'dewpoint.lut')
+            table = LookupTable(calc_dewpoint, cache_file=path)
+            self.assertEqual(table(72.1, 78), calc_dewpoint(72.1, 78))
+            self.assertTrue(os.path.exists(path))
+            # second table maps the existing file
+            mapped = LookupTable(calc_dewpoint, cache_file=path)
+            self.assertEqual(mapped(72.1, 78), table(72.1, 78))
+            self.assertEqual(len(mapped.table), 1901 * 101)
+            mapped.close()
+            table.close()
+            self.assertIsNone(table._mmap)
+            # a cache of another function is rebuilt
+            other = LookupTable(calc_heat_index, cache_file=path)
+            self.assertEqual(other(90.0, 50), calc_heat_index(90.0, 50))
+            other.close()
+            mapped = LookupTable(calc_dewpoint, cache_file=path)
+            self.assertEqual(mapped(72.1, 78), calc_dewpoint(72.1, 78))
+            mapped.close()
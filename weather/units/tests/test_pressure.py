@@ -291,6 +291,34 @@ class TestCase(unittest.TestCase):
         assert round(lb_sqin_to_mb(13.0545), 4) == 900.0745, \
             "value not correct"
 
+    def test__sea_level_pressure(self):
+        # ~12 mb per 100 m near sea level
+        self.assertAlmostEqual(sea_level_pressure(1000, 100, 15), 1011.913, 3)
+        self.assertEqual(sea_level_pressure(1000, 0, 15), 1000)
+        # colder air columns are denser
+        self.assertGreater(sea_level_pressure(850, 1500, -10),
+                           sea_level_pressure(850, 1500, 20))
+
+    def test__station_pressure(self):
+        for elevation in (0, 250, 1609):
+            slp = sea_level_pressure(900, elevation, 4.5)
+            self.assertAlmostEqual(
+                station_pressure(slp, elevation, 4.5), 900, 9)
+
+    def test__altimeter_setting(self):
+        # standard atmosphere: 1013.25 mb at sea level, 898.76 mb at 1000 m
+        self.assertAlmostEqual(altimeter_setting(898.76 + 0.3, 1000),
+                               1013.25, 0)
+        self.assertAlmostEqual(altimeter_setting(1013.25, 0), 1012.95, 6)
+        # the NWS formula, as published
+        n = 0.190284
+        p = 900 - 0.3
+        nws = p * (1 + 1013.25 ** n * 0.0065 / 288 * 1000 / p ** n) ** (1 / n)
+        self.assertAlmostEqual(altimeter_setting(900, 1000), nws, 9)
+
+    def test__pressure_reduction_cached(self):
+        self.assertIs(pressure_reduction(321), pressure_reduction(321))
+
 
 def main():
     suite = unittest.makeSuite(TestCase, 'test')
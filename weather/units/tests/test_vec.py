@@ -0,0 +1,142 @@
+'''Tests for the vectorized unit conversion module.'''
+
+import array
+import unittest
+from unittest import mock
+
+from .. import pressure, temp, vec, wind
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+requires_numpy = unittest.skipIf(np is None, 'numpy is not installed')
+
+
+class TestVec(unittest.TestCase):
+
+    VALUES = [-40.0, 0.0, 32.0, 72.1, 1013.25]
+
+    def test_all_exported(self):
+        for module in (temp, pressure, wind):
+            for name in dir(module):
+                if '_to_' in name and not name.startswith('_'):
+                    self.assertIn(name, vec.__all__)
+        self.assertIn('calc_dewpoint', vec.__all__)
+
+    @requires_numpy
+    def test_matches_scalar(self):
+        for name in vec.__all__:
+            if '_to_' not in name:
+                continue
+            func = getattr(temp, name, None) or getattr(
+                pressure, name, None) or getattr(wind, name)
+            expected = [func(v) for v in self.VALUES]
+            result = getattr(vec, name)(np.array(self.VALUES))
+            np.testing.assert_allclose(result, expected, rtol=1e-12,
+                                       atol=1e-9, err_msg=name)
+
+    @requires_numpy
+    def test_out_ndarray(self):
+        values = np.array(self.VALUES)
+        out = np.empty_like(values)
+        res = vec.fahrenheit_to_celsius(values, out=out)
+        self.assertIs(res, out)
+        self.assertAlmostEqual(out[2], 0.0, places=4)
+
+    @requires_numpy
+    def test_out_array(self):
+        values = array.array('d', self.VALUES)
+        out = array.array('d', bytes(8 * len(values)))
+        res = vec.mb_to_in32(values, out=out)
+        self.assertIs(res, out)
+        self.assertAlmostEqual(out[4], pressure.mb_to_in32(1013.25))
+
+    def test_fallback(self):
+        with mock.patch.object(vec, 'np', None):
+            res = vec.celsius_to_fahrenheit([0.0, 100.0])
+            self.assertIsInstance(res, array.array)
+            self.assertEqual(list(res), [32.0, 212.0])
+            out = [None, None]
+            self.assertIs(vec.mph_to_knots([1, 2], out=out), out)
+            self.assertAlmostEqual(out[1], wind.mph_to_knots(2))
+
+
+class TestVecDerived(unittest.TestCase):
+
+    TEMPS = [-20.0, 0.0, 32.0, 50.5, 72.1, 79.9, 80.0, 95.0, 110.0]
+    HUMS = [5, 20, 35, 50, 78, 90, 100, 40, 60]
+    WINDS = [0, 3, 5, 10, 25, 0, 7, 15, 40]
+    WINDS10 = [float('nan'), 4, 2, 12, 20, 0, 7, 20, 30]
+
+    def _check(self, func, *cols):
+        scalar = getattr(temp, func)
+        expected = [scalar(*args) for args in zip(*cols)]
+        if np is not None:
+            result = getattr(vec, func)(*[np.array(c) for c in cols])
+            np.testing.assert_allclose(result, expected, rtol=1e-12,
+                                       err_msg=func)
+        with mock.patch.object(vec, 'np', None):
+            result = getattr(vec, func)(*cols)
+            self.assertEqual(list(result), expected)
+
+    def test_heat_index(self):
+        self._check('calc_heat_index', self.TEMPS, self.HUMS)
+
+    def test_wind_chill(self):
+        self._check('calc_wind_chill', self.TEMPS, self.WINDS)
+        winds10 = [w if w == w else None for w in self.WINDS10]
+        expected = [temp.calc_wind_chill(*args) for args in
+                    zip(self.TEMPS, self.WINDS, winds10)]
+        if np is not None:
+            result = vec.calc_wind_chill(self.TEMPS, self.WINDS,
+                                         self.WINDS10)
+            np.testing.assert_allclose(result, expected, rtol=1e-12)
+
+    def test_dewpoint(self):
+        self._check('calc_dewpoint', self.TEMPS, self.HUMS)
+        self._check('calc_dewpoint_davis', self.TEMPS, self.HUMS)
+
+    def test_humidity(self):
+        dewpoints = [t - 10 for t in self.TEMPS]
+        self._check('calc_humidity', self.TEMPS, dewpoints)
+
+    @requires_numpy
+    def test_dewpoint_davis_zero_humidity(self):
+        self.assertTrue(np.isnan(vec.calc_dewpoint_davis([70.0], [0])[0]))
+
+    @requires_numpy
+    def test_out(self):
+        out = array.array('d', bytes(8 * len(self.TEMPS)))
+        self.assertIs(vec.calc_heat_index(self.TEMPS, self.HUMS, out=out), out)
+        self.assertAlmostEqual(out[-1], temp.calc_heat_index(110.0, 60))
+
+
+class TestVecPressure(unittest.TestCase):
+
+    PRESSURES = [850.0, 900.5, 1000.0, 1013.25, 1040.0]
+    TEMPS = [-30.0, 0.0, 12.5, 15.0, 40.0]
+
+    def _check(self, func, scalar, *cols):
+        expected = [scalar(*args) for args in zip(*cols)]
+        if np is not None:
+            np.testing.assert_allclose(func(*cols), expected, rtol=1e-12)
+        with mock.patch.object(vec, 'np', None):
+            result = func(*cols)
+            self.assertEqual(list(result), expected)
+
+    def test_sea_level_pressure(self):
+        self._check(lambda p, t: vec.sea_level_pressure(p, 350, t),
+                    lambda p, t: pressure.sea_level_pressure(p, 350, t),
+                    self.PRESSURES, self.TEMPS)
+
+    def test_station_pressure(self):
+        self._check(lambda p, t: vec.station_pressure(p, 350, t),
+                    lambda p, t: pressure.station_pressure(p, 350, t),
+                    self.PRESSURES, self.TEMPS)
+
+    def test_altimeter_setting(self):
+        self._check(lambda p: vec.altimeter_setting(p, 350),
+                    lambda p: pressure.altimeter_setting(p, 350),
+                    self.PRESSURES)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+
+#
+# See __doc__ for an explanation of what this module does
+#
+
+import array
+
+from . import pressure, temp, wind
+from .convert import _affine
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__doc__ = '''
+vectorized unit conversion and derived value functions
+
+Every conversion function of the temp, pressure and wind modules (named
+'<unit>_to_<unit>') is available here with the same name, but takes a
+sequence of values instead of a single value:
+
+>>> from weather.units import vec
+>>> vec.fahrenheit_to_celsius(numpy.array([32.0, 212.0]))
+array([  0., 100.])
+
+All of these conversions are affine (value * scale + offset); the scale and
+offset are taken from the scalar functions when this module is imported, so
+both APIs use the same coefficients.
+
+When NumPy is installed, the values can be any array-like, and the result is
+a NumPy array. An optional 'out' argument (a float64 NumPy array, or a
+writable buffer such as array('d')) receives the result in place. Without
+NumPy, each value is converted with the scalar function, and the result is an
+array('d') (or 'out', when given).
+
+The derived value functions of the temp module (calc_heat_index,
+calc_wind_chill, calc_humidity, calc_dewpoint and calc_dewpoint_davis) are
+available with the same name and arguments, taking sequences of values. The
+piecewise parts of the formulas are evaluated with masks, so the results
+match the scalar functions element by element.
+
+The pressure reduction functions of the pressure module (sea_level_pressure,
+station_pressure and altimeter_setting) are also available, with a single
+elevation for all values.
+'''
+__usage__ = 'this module should not be run via the command line'
+
+__all__ = []
+
+
+def _as_out(out):
+    if isinstance(out, np.ndarray):
+        return out
+    return np.frombuffer(out, dtype=np.float64)
+
+
+def _vectorize(func):
+    scale, offset = _affine(func)
+
+    def convert(values, out=None):
+        if np is not None:
+            if isinstance(values, array.array):
+                values = np.frombuffer(values, dtype=values.typecode)
+            res = np.multiply(values, scale,
+                              out=None if out is None else _as_out(out))
+            if offset:
+                np.add(res, offset, out=res)
+            return res if out is None else out
+        # pure python fallback
+        if out is None:
+            return array.array('d', (func(v) for v in values))
+        for i, v in enumerate(values):
+            out[i] = func(v)
+        return out
+
+    convert.__name__ = func.__name__
+    convert.__qualname__ = func.__name__
+    convert.__doc__ = func.__doc__
+    convert.scale = scale
+    convert.offset = offset
+    return convert
+
+
+def _export(module):
+    for name, func in sorted(vars(module).items()):
+        if (callable(func) and '_to_' in name and not name.startswith('_')
+                and getattr(func, '__module__', None) == module.__name__):
+            globals()[name] = _vectorize(func)
+            __all__.append(name)
+
+
+for _module in (temp, pressure, wind):
+    _export(_module)
+
+
+# --------------------------------------------------------------------------- #
+# derived values
+
+def _floats(*values):
+    return [np.asarray(v, dtype=np.float64) for v in values]
+
+
+def _result(res, out):
+    if out is None:
+        return res
+    _as_out(out)[...] = res
+    return out
+
+
+def _scalar_map(func, out, *columns):
+    '''
+    Pure python fallback; apply the scalar 'func' to each set of values.
+    '''
+    values = (func(*args) for args in zip(*columns))
+    if out is None:
+        return array.array('d', values)
+    for i, v in enumerate(values):
+        out[i] = v
+    return out
+
+
+def calc_heat_index(temp_, hum, out=None):
+    """
+    calculates the heat index based upon temperature (in F) and humidity.
+    see temp.calc_heat_index.
+    """
+    if np is None:
+        return _scalar_map(temp.calc_heat_index, out, temp_, hum)
+    t, h = _floats(temp_, hum)
+    hi = -42.379 + 2.04901523 * t + 10.14333127 * h - 0.22475541 * \
+        t * h - 6.83783 * (10 ** -3) * (t ** 2) - 5.481717 * \
+        (10 ** -2) * (h ** 2) + 1.22874 * (10 ** -3) * (t ** 2) * \
+        h + 8.5282 * (10 ** -4) * t * (h ** 2) - 1.99 * \
+        (10 ** -6) * (t ** 2) * (h ** 2)
+    return _result(np.where(t < 80, t, hi), out)
+
+
+def calc_wind_chill(t, windspeed, windspeed10min=None, out=None):
+    """
+    calculates the wind chill value based upon the temperature (F) and
+    wind. see temp.calc_wind_chill.
+    """
+    if np is None:
+        if windspeed10min is None:
+            return _scalar_map(temp.calc_wind_chill, out, t, windspeed)
+        return _scalar_map(temp.calc_wind_chill, out, t, windspeed,
+                           windspeed10min)
+    t, w = _floats(t, windspeed)
+    if windspeed10min is not None:
+        # 'windspeed10min or 0'; missing values don't count
+        w10, = _floats(windspeed10min)
+        w = np.fmax(np.nan_to_num(w10, nan=0.0), w)
+    w16 = w ** 0.16
+    return _result(35.74 + 0.6215 * t - 35.75 * w16 + 0.4275 * t * w16, out)
+
+
+def calc_humidity(temp_, dewpoint, out=None):
+    """
+    calculates the humidity via the formula from weatherwise.org.
+    see temp.calc_humidity.
+    """
+    if np is None:
+        return _scalar_map(temp.calc_humidity, out, temp_, dewpoint)
+    t, td = _floats(temp_, dewpoint)
+    t = temp.fahrenheit_to_celsius(t)
+    td = temp.fahrenheit_to_celsius(td)
+    return _result(((112 - (0.1 * t) + td) / (112 + (0.9 * t))) ** 8, out)
+
+
+def calc_dewpoint(temp_, hum, out=None):
+    """
+    calculates the dewpoint via the formula from weatherwise.org.
+    see temp.calc_dewpoint.
+    """
+    if np is None:
+        return _scalar_map(temp.calc_dewpoint, out, temp_, hum)
+    # the scalar formula only uses arithmetic operators
+    return _result(temp.calc_dewpoint(*_floats(temp_, hum)), out)
+
+
+def calc_dewpoint_davis(temp_, hum, out=None):
+    """
+    calculate the dewpoint via the formula used by Davis.
+    see temp.calc_dewpoint_davis. Zero humidity gives NaN.
+    """
+    if np is None:
+        return _scalar_map(temp.calc_dewpoint_davis, out, temp_, hum)
+    t, h = _floats(temp_, hum)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_v = np.log(h * 0.01 * 6.112 * np.exp((17.62 * t) / (t + 243.12)))
+        res = (243.12 * log_v - 440.1) / (19.43 - log_v)
+    return _result(np.where(np.isfinite(log_v), res, np.nan), out)
+
+
+def sea_level_pressure(station_mb, elevation, temp_c, out=None):
+    """
+    Station pressure (mb) to sea level pressure (mb).
+    see pressure.sea_level_pressure.
+    """
+    red = pressure.pressure_reduction(elevation)
+    if np is None:
+        return _scalar_map(red.sea_level, out, station_mb, temp_c)
+    return _result(red.sea_level(*_floats(station_mb, temp_c)), out)
+
+
+def station_pressure(sea_level_mb, elevation, temp_c, out=None):
+    """
+    Sea level pressure (mb) to station pressure (mb).
+    see pressure.station_pressure.
+    """
+    red = pressure.pressure_reduction(elevation)
+    if np is None:
+        return _scalar_map(red.station, out, sea_level_mb, temp_c)
+    return _result(red.station(*_floats(sea_level_mb, temp_c)), out)
+
+
+def altimeter_setting(station_mb, elevation, out=None):
+    """
+    Station pressure (mb) to altimeter setting (mb).
+    see pressure.altimeter_setting.
+    """
+    red = pressure.pressure_reduction(elevation)
+    if np is None:
+        return _scalar_map(red.altimeter, out, station_mb)
+    return _result(red.altimeter(*_floats(station_mb)), out)
+
+
+__all__ += ['calc_heat_index', 'calc_wind_chill', 'calc_humidity',
+            'calc_dewpoint', 'calc_dewpoint_davis', 'sea_level_pressure',
+            'station_pressure', 'altimeter_setting']